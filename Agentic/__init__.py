@@ -6,10 +6,11 @@ This module contains the agentic database schema, templates, and connection util
 
 # Only import the working modules to avoid import errors
 from .templates import populate_template_libraries
-from .database_utils import get_agentic_database_info, check_agentic_data_exists
+from .database_utils import get_agentic_database_info, check_agentic_data_exists, get_database_stats
 
 __all__ = [
     'populate_template_libraries',
     'get_agentic_database_info',
-    'check_agentic_data_exists'
+    'check_agentic_data_exists',
+    'get_database_stats'
 ]
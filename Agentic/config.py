@@ -1,41 +1,73 @@
 # config/config.py
 import logging
-import os
+from functools import lru_cache
 from pathlib import Path
 
-import yaml
+# Nothing happens at import time: the YAML file is read on first use of
+# ``get_config()`` (or ``CONFIG``) and logging is configured only by entry points
+# that call ``setup_logging()``. Importing Agentic stays cheap for short CLIs.
 
 # ── Configuration loading ────────────────────────────────
 
 
 def load_config(path="config.yaml"):
+    import yaml  # only needed when the config is actually read
+
     # Get the directory where this config.py file is located
     config_dir = Path(__file__).parent
     config_path = config_dir / path
-    
+
     with open(config_path, "r") as f:
         return yaml.safe_load(f)
 
 
-CONFIG = load_config()
+@lru_cache(maxsize=None)
+def get_config():
+    """The parsed config.yaml, loaded once per process."""
+    return load_config()
 
 
 # ── Centralized logger ─────────────────────────────
 
-LOG_DIR = Path(CONFIG.get("log_dir", "project_saab/logs"))
-LOG_FILE = CONFIG.get("log_file", "project.log")
-LOG_DIR.mkdir(parents=True, exist_ok=True)
-LOG_LEVEL = CONFIG.get("log_level", "INFO").upper()
-
-logging.basicConfig(
-    level=logging.INFO,
-    # level=logging.DEBUG,  # Uncomment for debug level
-    # format="[%(asctime)s] %(levelname)s - %(name)s - %(message)s",
-    format="%(levelname)s - %(name)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_DIR / LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
-)
+_logging_ready = False
+
+
+def setup_logging(config=None, level=None):
+    """Start the project's non-blocking console and rotating-file logging (idempotent).
+
+    Called explicitly by entry points; library imports never touch logging.
+    Levels, rotation and per-logger overrides come from config.yaml (``logging:``).
+    """
+    global _logging_ready
+    if _logging_ready:
+        return
+    from .logs import start_logging
+
+    config = config if config is not None else get_config()
+    section = config.get("logging") or {}
+    log_dir = Path(config.get("log_dir", "project_saab/logs"))
+    start_logging(
+        level=level or config.get("log_level", "INFO"),
+        fmt=section.get("format", "%(levelname)s - %(name)s - %(message)s"),
+        log_file=log_dir / config.get("log_file", "project.log"),
+        max_bytes=int(section.get("max_bytes", 10 << 20)),
+        backup_count=int(section.get("backup_count", 5)),
+        levels=section.get("levels"),
+    )
+    _logging_ready = True
+
 
 logger = logging.getLogger("project_hallins")
+
+
+def __getattr__(name):
+    # Backwards compatible module attributes, resolved lazily (PEP 562)
+    if name == "CONFIG":
+        return get_config()
+    if name == "LOG_DIR":
+        return Path(get_config().get("log_dir", "project_saab/logs"))
+    if name == "LOG_FILE":
+        return get_config().get("log_file", "project.log")
+    if name == "LOG_LEVEL":
+        return get_config().get("log_level", "INFO").upper()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
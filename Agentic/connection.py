@@ -5,7 +5,10 @@ import sqlite3
 from contextlib import contextmanager
 from pathlib import Path
 
-from config import CONFIG
+try:
+    from .config import get_config, setup_logging
+except ImportError:  # run as a script from inside Agentic/
+    from config import get_config, setup_logging
 
 logger = logging.getLogger("CONNECTION")
 
@@ -16,31 +19,33 @@ logger = logging.getLogger("CONNECTION")
 @contextmanager
 def get_output_connection():
     """Context-managed connection to the output database."""
-    with get_db_connection(CONFIG["output_db"]) as conn:
+    with get_db_connection(get_config()["output_db"]) as conn:
         yield conn
 
 
 @contextmanager
 def get_agentic_connection():
     """Context-managed connection to the agentic database."""
-    with get_db_connection(CONFIG["agentic_db"]) as conn:
+    with get_db_connection(get_config()["agentic_db"]) as conn:
         yield conn
 
 
 @contextmanager
 def get_temp_connection():
     """Context-managed connection to the temporary database."""
-    with get_db_connection(CONFIG["temp_db"]) as conn:
+    with get_db_connection(get_config()["temp_db"]) as conn:
         yield conn
 
 
 @contextmanager
-def get_db_connection(db):
+def get_db_connection(db, row_factory=sqlite3.Row):
+    """Rows come back as ``sqlite3.Row`` by default; pass ``Agentic.records.row_factory(cls)``
+    for compact records, or ``None`` for plain tuples."""
     db_path = Path(db)
     db_path.parent.mkdir(parents=True, exist_ok=True)  # Ensure parent folders exist
-    logger.debug(f"Connecting to database: {db_path}")
+    logger.debug("Connecting to database: %s", db_path)
     conn = sqlite3.connect(db, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    conn.row_factory = row_factory
     conn.execute("PRAGMA foreign_keys = ON")
     try:
         yield conn
@@ -51,9 +56,10 @@ def get_db_connection(db):
 
 # ─── Database Initialization (sanity check)──────────────────────────────────────────
 if __name__ == "__main__":
+    setup_logging()
     with get_output_connection() as conn:
         rows = conn.execute(
             "SELECT name FROM sqlite_master WHERE type='table';"
         ).fetchall()
         table_names = [row["name"] for row in rows]
-        logger.info(f"Tables in database: {table_names}")
+        logger.info("Tables in database: %s", table_names)
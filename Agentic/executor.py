@@ -0,0 +1,616 @@
+"""
+Concurrent executor for strategy plans.
+
+``StrategyLibrary.PlanSteps`` holds each strategy's plan as a DAG of core-action
+steps (see ``Agentic.templates.plans``)::
+
+    [{"id": "search_steps", "action": "SEARCH", "inputs": {"Target Table": "harvested_steps_ultramin"}},
+     {"id": "extract", "action": "EXTRACT", "inputs": {"Target Elements": "$search_steps.Search Results"}}]
+
+A ``"$step.Output Name"`` input binds one of the action's declared parameters
+(``FunctionParametersLibrary``) to a declared output of an upstream step
+(``FunctionOutputLibrary``); those bindings are the edges of the DAG. Plans are
+validated against the library before anything runs: unknown actions,
+parameters or outputs, type mismatches and cycles raise ``PlanError``.
+
+``run_plans`` schedules the steps of any number of plans on one pool. A step is
+submitted as soon as the steps it depends on have finished, so independent
+steps, and independent strategies, run side by side. Every step is recorded as
+a ``FunctionInstance`` with its ``FunctionParametersInstance`` and
+``FunctionOutputInstance`` rows, written by the calling thread only (one
+transaction per step), so workers never contend for the SQLite write lock.
+
+SEARCH and ANALYZE only read, so their results are memoized in a
+``ResultCache`` (see ``Agentic.result_cache``), whichever implementation is
+registered. A successful POPULATE invalidates the table it wrote.
+
+Action implementations are looked up in ``ACTIONS``; agents register their own
+with ``@register_action("ANALYZE")``. The built-in ones are deterministic
+reference implementations over lists of row dicts: SEARCH reads knowledge.db,
+POPULATE only reports what it would write.
+
+    python -m Agentic.executor --strategy "Declarative KC" --strategy "Procedural KC"
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import telemetry
+from .result_cache import ResultCache, shared_cache
+from .snapshots import reader_connection, thread_reader
+
+logger = logging.getLogger("EXECUTOR")
+
+REF_PREFIX = "$"
+SEARCH_LIMIT = 1000  # rows returned by the built-in SEARCH unless "Search Filters" sets "limit"
+
+# Read-only actions whose results are memoized -> parameter naming the knowledge
+# table they read (None: the result depends on the inputs alone)
+CACHED_ACTIONS = {"SEARCH": "Target Table", "ANALYZE": None}
+
+
+class PlanError(ValueError):
+    """Raised when a plan does not match the action library or is not a DAG."""
+
+
+@dataclass(frozen=True)
+class Signature:
+    """Declared parameters (name -> (default, type)) and outputs (name -> type) of an action."""
+
+    params: Dict[str, Tuple[Any, str]]
+    outputs: Dict[str, str]
+
+
+@dataclass
+class Step:
+    id: str
+    action: str
+    inputs: Dict[str, Any]
+    deps: Tuple[str, ...] = ()
+
+
+@dataclass
+class Plan:
+    strategy: str
+    target: Optional[str]
+    description: Optional[str]
+    steps: List[Step]
+
+
+@dataclass(frozen=True)
+class StepContext:
+    """What an action implementation gets besides its inputs."""
+
+    strategy: str
+    step_id: str
+    action: str
+    knowledge_db: str
+    cache: Optional[ResultCache] = None
+    # Set for memoized reads: the knowledge.db connection the cached result is keyed on
+    knowledge_conn: Optional[sqlite3.Connection] = None
+
+
+@dataclass
+class StepResult:
+    strategy: str
+    step_id: str
+    action: str
+    status: str  # ok | failed | skipped
+    inputs: Dict[str, Any] = field(default_factory=dict)
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    seconds: float = 0.0
+    cached: bool = False
+
+
+ActionFn = Callable[[Dict[str, Any], StepContext], Dict[str, Any]]
+ACTIONS: Dict[str, ActionFn] = {}
+
+
+def register_action(name: str):
+    """Decorator: use ``func(inputs, ctx) -> {output name: value}`` for action ``name``."""
+    def deco(func: ActionFn) -> ActionFn:
+        ACTIONS[name] = func
+        return func
+    return deco
+
+
+# ─── Plans ───────────────────────────────────────────────────────────────
+
+
+def load_signatures(conn: sqlite3.Connection) -> Dict[str, Signature]:
+    signatures: Dict[str, Signature] = {}
+    for fid, fname in conn.execute("SELECT FunctionTemplateID, FunctionName FROM FunctionTemplateLibrary"):
+        params = {n: (v, t) for n, v, t in conn.execute(
+            "SELECT ParameterName, ParameterValue, Type FROM FunctionParametersLibrary WHERE FunctionTemplateID = ?",
+            (fid,))}
+        outputs = dict(conn.execute(
+            "SELECT OutputName, Type FROM FunctionOutputLibrary WHERE FunctionTemplateID = ?", (fid,)).fetchall())
+        signatures[fname] = Signature(params, outputs)
+    return signatures
+
+
+def parse_ref(value: Any) -> Optional[Tuple[str, str]]:
+    """``"$step.Output Name"`` -> ``("step", "Output Name")``; None for literals."""
+    if isinstance(value, str) and value.startswith(REF_PREFIX) and "." in value:
+        step_id, output = value[len(REF_PREFIX):].split(".", 1)
+        return step_id, output
+    return None
+
+
+def parse_plan(strategy: str, steps_json: Any, signatures: Dict[str, Signature],
+               target: Optional[str] = None, description: Optional[str] = None) -> Plan:
+    """Build and validate a plan; ``steps_json`` is the PlanSteps text or its parsed list."""
+    raw = json.loads(steps_json) if isinstance(steps_json, str) else steps_json
+    if not isinstance(raw, list) or not raw:
+        raise PlanError(f"{strategy}: PlanSteps must be a non-empty list")
+
+    by_id: Dict[str, dict] = {}
+    for node in raw:
+        sid = node.get("id")
+        if not sid or sid in by_id:
+            raise PlanError(f"{strategy}: missing or duplicate step id {sid!r}")
+        by_id[sid] = node
+
+    steps = []
+    for sid, node in by_id.items():
+        action = node.get("action")
+        sig = signatures.get(action)
+        if sig is None:
+            raise PlanError(f"{strategy}.{sid}: unknown action {action!r}")
+        inputs = dict(node.get("inputs") or {})
+        deps = []
+        for pname, value in inputs.items():
+            if pname not in sig.params:
+                raise PlanError(f"{strategy}.{sid}: {action} has no parameter {pname!r}")
+            ref = parse_ref(value)
+            if ref is None:
+                continue
+            up_id, oname = ref
+            up = by_id.get(up_id)
+            if up is None:
+                raise PlanError(f"{strategy}.{sid}: {pname!r} refers to unknown step {up_id!r}")
+            up_sig = signatures.get(up.get("action"))
+            if up_sig is None or oname not in up_sig.outputs:
+                raise PlanError(f"{strategy}.{sid}: step {up_id!r} has no output {oname!r}")
+            ptype, otype = sig.params[pname][1], up_sig.outputs[oname]
+            if ptype != otype:
+                raise PlanError(f"{strategy}.{sid}: {pname!r} is {ptype}, {up_id}.{oname} is {otype}")
+            if up_id not in deps:
+                deps.append(up_id)
+        steps.append(Step(sid, action, inputs, tuple(deps)))
+
+    _check_acyclic(strategy, steps)
+    return Plan(strategy, target, description, steps)
+
+
+def _check_acyclic(strategy: str, steps: List[Step]):
+    indegree = {s.id: len(s.deps) for s in steps}
+    dependents: Dict[str, List[str]] = {s.id: [] for s in steps}
+    for s in steps:
+        for d in s.deps:
+            dependents[d].append(s.id)
+    ready = [sid for sid, n in indegree.items() if n == 0]
+    seen = 0
+    while ready:
+        sid = ready.pop()
+        seen += 1
+        for child in dependents[sid]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+    if seen != len(steps):
+        cycle = sorted(sid for sid, n in indegree.items() if n)
+        raise PlanError(f"{strategy}: plan has a cycle through {', '.join(cycle)}")
+
+
+def load_plans(conn: sqlite3.Connection, names: Optional[Iterable[str]] = None,
+               signatures: Optional[Dict[str, Signature]] = None) -> List[Plan]:
+    """Validated plans from StrategyLibrary (all strategies with PlanSteps, or ``names``)."""
+    signatures = signatures if signatures is not None else load_signatures(conn)
+    rows = {r[0]: r for r in conn.execute(
+        "SELECT StrategyName, StrategyTarget, StrategyDescription, PlanSteps FROM StrategyLibrary")}
+    if names is None:
+        names = [n for n, r in rows.items() if r[3]]
+    plans = []
+    for name in names:
+        row = rows.get(name)
+        if row is None:
+            raise PlanError(f"Unknown strategy {name!r}")
+        if not row[3]:
+            raise PlanError(f"{name}: no PlanSteps (re-populate the template libraries)")
+        plans.append(parse_plan(name, row[3], signatures, target=row[1], description=row[2]))
+    return plans
+
+
+# ─── Execution ───────────────────────────────────────────────────────────
+
+
+def _default(value: Any, typ: str) -> Any:
+    """Library default (stored as text) for an unbound parameter."""
+    if value in (None, ""):
+        return None
+    try:
+        if typ == "json":
+            return json.loads(value)
+        if typ == "integer":
+            return int(value)
+        if typ == "float":
+            return float(value)
+        if typ == "boolean":
+            return str(value).lower() in ("1", "true", "yes")
+    except ValueError:
+        pass
+    return value
+
+
+def _encode(value: Any, typ: str) -> Optional[str]:
+    if value is None:
+        return None
+    if typ == "json" or not isinstance(value, (str, int, float, bool)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+def _call_step(func: ActionFn, inputs: Dict[str, Any], ctx: StepContext,
+               parent_id: Optional[str]) -> Tuple[Dict[str, Any], float, bool]:
+    with telemetry.span(f"plan.{ctx.action}", parent_id, strategy=ctx.strategy, step=ctx.step_id) as s:
+        t0 = time.perf_counter()
+        if ctx.cache is not None and ctx.action in CACHED_ACTIONS:
+            table_param = CACHED_ACTIONS[ctx.action]
+            table = inputs.get(table_param) if table_param else None
+            key, db_path = inputs, None
+            if table_param and os.path.exists(ctx.knowledge_db):
+                # Pin the snapshot (or live file) the action reads and key the result on it:
+                # a snapshot never changes, so its version identifies the data
+                reader = thread_reader(ctx.knowledge_db)
+                ctx = replace(ctx, knowledge_conn=reader.connection())
+                key = {"inputs": inputs, "db": os.path.abspath(ctx.knowledge_db), "version": reader.version}
+                db_path = ctx.knowledge_db if reader.version is None else None
+            result, hit = ctx.cache.memoize(ctx.action, lambda: func(inputs, ctx) or {}, key,
+                                            db_path=db_path, tables=[table] if table else ())
+            s.set(cached=hit)
+        else:
+            result, hit = func(inputs, ctx) or {}, False
+        seconds = time.perf_counter() - t0
+        if hit and "Query Execution Time" in result:
+            # Report what this call cost, not what the original query did
+            result = dict(result, **{"Query Execution Time": round(seconds, 6)})
+        return result, seconds, hit
+
+
+def _record_strategy(conn: sqlite3.Connection, plan: Plan, goal_id: Optional[int]) -> int:
+    cur = conn.execute(
+        """INSERT INTO StrategyInstance (GoalID, StrategyName, StrategyTarget, StrategyDescription)
+           VALUES (?, ?, ?, ?)""",
+        (goal_id, plan.strategy, plan.target, plan.description),
+    )
+    conn.commit()
+    return cur.lastrowid
+
+
+def _record_step(conn: sqlite3.Connection, strategy_id: int, result: StepResult, sig: Signature):
+    with conn:
+        cur = conn.execute(
+            """INSERT INTO FunctionInstance
+                   (StrategyID, FunctionName, FunctionSuccess, failedtext, NodeID, Seconds)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (strategy_id, result.action, result.status == "ok", result.error, result.step_id,
+             round(result.seconds, 6)),
+        )
+        fid = cur.lastrowid
+        conn.executemany(
+            """INSERT INTO FunctionParametersInstance (FunctionID, ParameterName, ParameterValue, Type)
+               VALUES (?, ?, ?, ?)""",
+            [(fid, n, _encode(v, sig.params[n][1]), sig.params[n][1]) for n, v in result.inputs.items()],
+        )
+        conn.executemany(
+            """INSERT INTO FunctionOutputInstance (FunctionID, OutputName, OutputValue, Type)
+               VALUES (?, ?, ?, ?)""",
+            [(fid, n, _encode(v, sig.outputs[n]), sig.outputs[n]) for n, v in result.outputs.items()],
+        )
+
+
+def run_plans(
+    plans: List[Plan],
+    db_path: str = "agentic.db",
+    knowledge_db: str = "knowledge.db",
+    actions: Optional[Dict[str, ActionFn]] = None,
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    goal_id: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    use_cache: bool = True,
+    signatures: Optional[Dict[str, Signature]] = None,
+) -> Dict[str, List[StepResult]]:
+    """Run ``plans`` concurrently and record every step in ``db_path``.
+
+    Steps share one pool (``max_workers`` threads, default one per CPU). Pass
+    ``executor`` to use another pool, e.g. a ``ProcessPoolExecutor`` for
+    CPU-bound actions (their implementations must then be module-level
+    functions). A failed step marks its dependents ``skipped``; the other
+    branches of the plan keep running. ``cache`` defaults to the process-wide
+    memory cache; pass one with a ``path`` to share results between processes
+    and runs. ``signatures`` are the ones the plans were validated against
+    (default: read from ``db_path``). Returns the step results per strategy.
+    """
+    actions = dict(ACTIONS, **(actions or {}))
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON")
+    signatures = signatures if signatures is not None else load_signatures(conn)
+    own_pool = executor is None
+    pool = executor or ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 4,
+                                          thread_name_prefix="plan")
+    parent_id = telemetry.current_span_id()
+    cache = (cache or shared_cache()) if use_cache else None
+
+    strategy_ids = {p.strategy: _record_strategy(conn, p, goal_id) for p in plans}
+    results: Dict[str, Dict[str, StepResult]] = {p.strategy: {} for p in plans}
+    waiting = {(p.strategy, s.id): s for p in plans for s in p.steps}
+    running = {}
+
+    def finish(strategy: str, result: StepResult):
+        results[strategy][result.step_id] = result
+        _record_step(conn, strategy_ids[strategy], result, signatures[result.action])
+        telemetry.count("plan.steps", action=result.action, status=result.status)
+        if (cache is not None and result.action == "POPULATE" and result.status == "ok"
+                and result.outputs.get("Records Created") and result.inputs.get("Target Table")):
+            cache.invalidate(result.inputs["Target Table"])
+        if result.status != "ok":
+            logger.warning("⚠️ %s.%s (%s) %s: %s", strategy, result.step_id, result.action, result.status, result.error)
+
+    try:
+        while waiting or running:
+            for key, step in list(waiting.items()):
+                strategy, done = key[0], results[key[0]]
+                if any(d not in done for d in step.deps):
+                    continue
+                del waiting[key]
+                sig = signatures[step.action]
+                bad = [d for d in step.deps if done[d].status != "ok"]
+                if bad:
+                    finish(strategy, StepResult(strategy, step.id, step.action, "skipped",
+                                                error=f"upstream step {bad[0]!r} did not succeed"))
+                    continue
+                inputs = {n: _default(v, t) for n, (v, t) in sig.params.items()}
+                for pname, value in step.inputs.items():
+                    ref = parse_ref(value)
+                    inputs[pname] = done[ref[0]].outputs.get(ref[1]) if ref else value
+                func = actions.get(step.action)
+                if func is None:
+                    finish(strategy, StepResult(strategy, step.id, step.action, "failed", inputs,
+                                                error=f"no implementation registered for {step.action}"))
+                    continue
+                ctx = StepContext(strategy, step.id, step.action, knowledge_db, cache)
+                running[pool.submit(_call_step, func, inputs, ctx, parent_id)] = (strategy, step, inputs)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                strategy, step, inputs = running.pop(fut)
+                outputs = signatures[step.action].outputs
+                try:
+                    value, seconds, hit = fut.result()
+                    unknown = sorted(set(value) - set(outputs))
+                    if unknown:
+                        raise PlanError(f"{step.action} returned undeclared outputs {unknown}")
+                    finish(strategy, StepResult(strategy, step.id, step.action, "ok", inputs, value,
+                                                seconds=seconds, cached=hit))
+                except Exception as e:
+                    finish(strategy, StepResult(strategy, step.id, step.action, "failed", inputs,
+                                                error=f"{type(e).__name__}: {e}"))
+
+        with conn:
+            for strategy, steps in results.items():
+                conn.execute("UPDATE StrategyInstance SET StrategySuccess = ? WHERE StrategyID = ?",
+                             (all(r.status == "ok" for r in steps.values()), strategy_ids[strategy]))
+    finally:
+        if own_pool:
+            pool.shutdown(wait=True)
+        conn.close()
+    if cache is not None:
+        logger.debug("Result cache: %s", cache.info())
+
+    order = {p.strategy: [s.id for s in p.steps] for p in plans}
+    return {name: [steps[sid] for sid in order[name]] for name, steps in results.items()}
+
+
+def run_strategies(names: Optional[Iterable[str]] = None, db_path: str = "agentic.db",
+                   **kwargs: Any) -> Dict[str, List[StepResult]]:
+    """Load the named strategies' plans (default: every planned strategy) and run them together."""
+    # Plans and the signatures they are checked against come from the same snapshot
+    conn = reader_connection(db_path)
+    signatures = load_signatures(conn)
+    plans = load_plans(conn, names, signatures)
+    return run_plans(plans, db_path=db_path, signatures=signatures, **kwargs)
+
+
+# ─── Built-in actions ────────────────────────────────────────────────────
+
+
+def _rows(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return [value]
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+@register_action("SEARCH")
+def search(inputs: Dict[str, Any], ctx: StepContext) -> Dict[str, Any]:
+    table = inputs.get("Target Table")
+    filters = dict(inputs.get("Search Filters") or {})
+    limit = int(filters.pop("limit", SEARCH_LIMIT))
+    t0 = time.perf_counter()
+    rows: List[Dict[str, Any]] = []
+    if table and os.path.exists(ctx.knowledge_db):
+        # Snapshot when one is published (immutable, mmap-shared), else the live file read-only
+        conn = ctx.knowledge_conn or reader_connection(ctx.knowledge_db)
+        columns = [r[1] for r in conn.execute("SELECT * FROM pragma_table_info(?)", (table,))]
+        if columns:
+            where, args = [], []
+            for col, val in filters.items():
+                if col in columns:
+                    where.append(f'"{col}" = ?')
+                    args.append(val)
+            criteria = inputs.get("Search Criteria")
+            if criteria:
+                text = " OR ".join(f'"{c}" LIKE ?' for c in columns)
+                where.append(f"({text})")
+                args.extend([f"%{criteria}%"] * len(columns))
+            sql = f'SELECT * FROM "{table}"' + (f" WHERE {' AND '.join(where)}" if where else "")
+            cur = conn.execute(sql + " LIMIT ?", (*args, limit))
+            names = [d[0] for d in cur.description]
+            rows = [dict(zip(names, r)) for r in cur]
+    return {"Search Results": rows, "Source Table": table, "Record Count": len(rows),
+            "Query Execution Time": round(time.perf_counter() - t0, 6)}
+
+
+@register_action("ANALYZE")
+def analyze(inputs: Dict[str, Any], ctx: StepContext) -> Dict[str, Any]:
+    rows = [r for r in _rows(inputs.get("Data Input")) if isinstance(r, dict)]
+    fields = Counter(k for r in rows for k, v in r.items() if v not in (None, ""))
+    labels = Counter(r.get("action_label") for r in rows if r.get("action_label"))
+    filled = sum(fields.values()) / (len(rows) * len(fields)) if rows and fields else 0.0
+    return {"Analysis Results": {"rows": len(rows), "fields": dict(fields)},
+            "Analysis Type": inputs.get("Analysis Type"), "Confidence Score": round(filled, 4),
+            "Pattern Matches": dict(labels.most_common(20))}
+
+
+@register_action("EXTRACT")
+def extract(inputs: Dict[str, Any], ctx: StepContext) -> Dict[str, Any]:
+    rows = _rows(inputs.get("Target Elements"))
+    keep = (inputs.get("Extraction Rules") or {}).get("fields")
+    data, failed = [], []
+    for r in rows:
+        if isinstance(r, dict):
+            data.append({k: r.get(k) for k in keep} if keep else r)
+        else:
+            failed.append(r)
+    return {"Extracted Data": data, "Extraction Method": inputs.get("Extraction Pattern"),
+            "Success Rate": round(len(data) / len(rows), 4) if rows else 0.0, "Failed Extractions": failed}
+
+
+@register_action("CLASSIFY")
+def classify(inputs: Dict[str, Any], ctx: StepContext) -> Dict[str, Any]:
+    rows = _rows(inputs.get("Input Data"))
+    key = (inputs.get("Category Schema") or {}).get("key", "action_label")
+    groups: Dict[str, List[Any]] = {}
+    for r in rows:
+        label = r.get(key) if isinstance(r, dict) else None
+        groups.setdefault(str(label) if label is not None else "unclassified", []).append(r)
+    classified = len(rows) - len(groups.get("unclassified", []))
+    return {"Classification Results": groups, "Category Type": inputs.get("Classification Criteria"),
+            "Classification Accuracy": round(classified / len(rows), 4) if rows else 0.0,
+            "Category Counts": {k: len(v) for k, v in groups.items()}}
+
+
+@register_action("MAP")
+def map_elements(inputs: Dict[str, Any], ctx: StepContext) -> Dict[str, Any]:
+    key = (inputs.get("Mapping Rules") or {}).get("key", "action_label")
+    targets: Dict[Any, Any] = {}
+    for t in _rows(inputs.get("Target Elements")):
+        if isinstance(t, dict) and t.get(key) is not None:
+            targets.setdefault(t[key], t)
+    source = _rows(inputs.get("Source Elements"))
+    mapped, unmapped = [], []
+    for s in source:
+        match = targets.get(s.get(key)) if isinstance(s, dict) else None
+        (mapped if match is not None else unmapped).append({"source": s, "target": match} if match else s)
+    return {"Mapping Results": mapped, "Relationship Type": inputs.get("Relationship Type"),
+            "Mapping Completeness": round(len(mapped) / len(source), 4) if source else 0.0,
+            "Unmapped Elements": unmapped}
+
+
+@register_action("GENERATE")
+def generate(inputs: Dict[str, Any], ctx: StepContext) -> Dict[str, Any]:
+    base = _rows(inputs.get("Base Knowledge"))
+    context = _rows(inputs.get("Generation Parameters"))
+    generated = [{"strategy_type": inputs.get("Strategy Type"), "base": b, "context_rows": len(context)}
+                 for b in base]
+    return {"Generated Knowledge": generated, "Generation Method": inputs.get("Generation Rules"),
+            "Generation Count": len(generated), "Quality Score": 1.0 if generated else 0.0}
+
+
+@register_action("VALIDATE")
+def validate(inputs: Dict[str, Any], ctx: StepContext) -> Dict[str, Any]:
+    rows = _rows(inputs.get("Input Data"))
+    valid = [r for r in rows if r not in (None, "", {}, [])]
+    errors = [f"item {i} is empty" for i, r in enumerate(rows) if r in (None, "", {}, [])]
+    confidence = round(len(valid) / len(rows), 4) if rows else 0.0
+    if inputs.get("Validation Criteria") == "parameters":
+        report = _check_parameters(inputs, ctx)
+        if report is not None and report["steps"]:
+            errors += [f"step {f['step_id']} {f['name']}={f['value']:g}{' ' + f['unit'] if f['unit'] else ''}: "
+                       f"{', '.join(f['reasons'])}" for f in report["failures"]]
+            confidence = round(confidence * (1 - report["failed_steps"] / report["steps"]), 4)
+    return {"Validation Results": valid, "Confidence Score": confidence,
+            "Validation Errors": errors, "Validation Status": "passed" if not errors else "partial"}
+
+
+def _check_parameters(inputs: Dict[str, Any], ctx: StepContext) -> Optional[Dict[str, Any]]:
+    """Corpus-wide numeric parameter checks (Agentic.param_checks); None when unavailable."""
+    if not os.path.exists(ctx.knowledge_db):
+        return None
+    thresholds = dict(inputs.get("Quality Thresholds") or {})
+    try:
+        from .param_checks import load_columns, validate as check_params
+
+        return check_params(load_columns(ctx.knowledge_db), rules=inputs.get("Validation Rules") or None,
+                            outlier_z=float(thresholds.get("outlier_z", 6.0)),
+                            min_group=int(thresholds.get("min_group", 8)),
+                            limit=int(thresholds.get("max_errors", 100)))
+    except (ImportError, sqlite3.Error) as e:
+        logger.warning("⚠️ Parameter checks skipped: %s", e)
+        return None
+
+
+@register_action("POPULATE")
+def populate(inputs: Dict[str, Any], ctx: StepContext) -> Dict[str, Any]:
+    # Knowledge tables are written by the agent's own POPULATE; this one only
+    # reports how many records would be written
+    rows = _rows(inputs.get("Knowledge Data"))
+    return {"Population Status": f"dry_run: {len(rows)} records", "Records Created": 0,
+            "Population Errors": [], "Target Knowledge Type": inputs.get("Target Table")}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run strategy plans from StrategyLibrary")
+    ap.add_argument("--strategy", action="append", help="Strategy name (repeatable; default: all planned)")
+    ap.add_argument("--db", default="agentic.db")
+    ap.add_argument("--knowledge", default="knowledge.db")
+    ap.add_argument("--workers", type=int, default=None, help="Pool size (default: CPU count)")
+    ap.add_argument("--goal-id", type=int, default=None, help="GoalInstance the runs belong to")
+    ap.add_argument("--cache", default=None, help="Shared on-disk result cache (e.g. result_cache.db)")
+    ap.add_argument("--cache-mb", type=int, default=64, help="In-memory result cache size")
+    ap.add_argument("--no-cache", action="store_true", help="Do not memoize SEARCH/ANALYZE")
+    args = ap.parse_args()
+    from .config import setup_logging
+
+    setup_logging()
+    t0 = time.perf_counter()
+    cache = ResultCache(max_bytes=args.cache_mb << 20, path=args.cache)
+    results = run_strategies(args.strategy, db_path=args.db, knowledge_db=args.knowledge,
+                             max_workers=args.workers, goal_id=args.goal_id,
+                             cache=cache, use_cache=not args.no_cache)
+    for name, steps in results.items():
+        ok = sum(r.status == "ok" for r in steps)
+        logger.info("%s %s: %s/%s steps ok", '✅' if ok == len(steps) else '❌', name, ok, len(steps))
+    logger.info("⏱️ %s strategies in %.2fs", len(results), time.perf_counter() - t0)
+    if not args.no_cache:
+        logger.info("🗃️ Result cache: %s", cache.info())
+    cache.close()
+    return 0 if all(r.status == "ok" for steps in results.values() for r in steps) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
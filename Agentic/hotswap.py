@@ -0,0 +1,274 @@
+"""
+Atomic hot-swap of rebuilt databases.
+
+A rebuild writes to ``<db>.building`` next to the target (``prepare_staging``),
+is verified there (``PRAGMA integrity_check`` plus row-count checks) and is then
+moved over the target with ``os.replace`` (``publish``). Readers that opened the
+old file keep a consistent view of it until they reopen; ``LiveConnection``
+notices the new file and reopens on its next use. A ``<db>.generation`` sidecar
+records the published generation for monitoring.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+logger = logging.getLogger("HOTSWAP")
+
+STAGING_SUFFIX = ".building"
+SIDE_FILES = ("-journal", "-wal", "-shm")
+
+
+class SwapError(RuntimeError):
+    """Raised when a staged build fails verification or cannot be put in place."""
+
+
+def staging_path(db_path: str) -> str:
+    return db_path + STAGING_SUFFIX
+
+
+def generation_path(db_path: str) -> str:
+    return db_path + ".generation"
+
+
+def _remove(path: str):
+    for suffix in ("",) + SIDE_FILES:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def prepare_staging(db_path: str, copy_live: bool = True) -> str:
+    """Start a build next to ``db_path``; returns the staging path.
+
+    Leftovers of an interrupted build are discarded. With ``copy_live`` the
+    staging file starts as a copy of the live database (backup API, so readers
+    are not blocked), letting partial rebuilds modify only what changed.
+    """
+    staging = staging_path(db_path)
+    _remove(staging)
+    if copy_live and os.path.exists(db_path):
+        src = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+        dst = sqlite3.connect(staging)
+        try:
+            src.backup(dst, pages=1024)
+        finally:
+            dst.close()
+            src.close()
+        logger.info("📋 Staging %s from live %s", staging, db_path)
+    return staging
+
+
+def table_counts(path: str) -> Dict[str, int]:
+    """Exact ``COUNT(*)`` per user table (verification only, not a hot path)."""
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+        return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+    finally:
+        conn.close()
+
+
+def verify_database(
+    path: str,
+    min_rows: Optional[Mapping[str, int]] = None,
+    baseline: Optional[str] = None,
+    max_shrink: float = 0.5,
+) -> List[str]:
+    """Problems found in ``path``; an empty list means it may be published.
+
+    ``min_rows`` gives required minimum row counts per table. With ``baseline``
+    (the live database) a table that lost more than ``max_shrink`` of its rows
+    is reported, which catches a failed scrape that would empty a table.
+    """
+    if not os.path.exists(path):
+        return [f"{path} does not exist"]
+    problems = []
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        result = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+        if result != ["ok"]:
+            problems.extend(f"integrity_check: {r}" for r in result[:10])
+    except sqlite3.DatabaseError as e:  # too damaged for the check to run
+        problems.append(f"integrity_check: {e}")
+    finally:
+        conn.close()
+    if problems:
+        return problems
+
+    counts = table_counts(path)
+    for table, minimum in (min_rows or {}).items():
+        if counts.get(table, 0) < minimum:
+            problems.append(f"{table}: {counts.get(table, 0)} rows, expected at least {minimum}")
+    if baseline and os.path.exists(baseline):
+        for table, before in table_counts(baseline).items():
+            after = counts.get(table)
+            if after is None:
+                problems.append(f"{table}: missing from the new build")
+            elif before and after < before * (1 - max_shrink):
+                problems.append(f"{table}: {after} rows, live has {before}")
+    return problems
+
+
+def read_generation(db_path: str) -> Dict[str, Any]:
+    try:
+        with open(generation_path(db_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _fsync(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # directories cannot be fsynced on Windows
+    finally:
+        os.close(fd)
+
+
+def publish(
+    db_path: str,
+    min_rows: Optional[Mapping[str, int]] = None,
+    max_shrink: float = 0.5,
+    busy_timeout_ms: int = 30000,
+    retries: int = 20,
+) -> Dict[str, Any]:
+    """Verify the staged build of ``db_path`` and swap it in atomically.
+
+    The live file is held under an exclusive lock during the rename, so no writer
+    is mid-transaction (its rollback journal would otherwise be applied to the new
+    file). On failure the live database is untouched and the staging file is kept
+    for inspection. Returns the new generation record.
+    """
+    staging = staging_path(db_path)
+    problems = verify_database(staging, min_rows, baseline=db_path, max_shrink=max_shrink)
+    if problems:
+        raise SwapError(f"Refusing to publish {staging}: " + "; ".join(problems))
+
+    # Self-contained file: no WAL or journal may travel with the new generation
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+    _fsync(staging)
+
+    live = None
+    if os.path.exists(db_path):
+        live = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000, isolation_level=None)
+        if live.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+            live.close()
+            raise SwapError(f"{db_path} is in WAL mode; its -wal file cannot be swapped atomically")
+        live.execute("BEGIN EXCLUSIVE")
+    try:
+        for attempt in range(retries):
+            try:
+                os.replace(staging, db_path)
+                break
+            except PermissionError:  # Windows: a reader still has the file open
+                if attempt == retries - 1:
+                    raise SwapError(f"{db_path} is still open elsewhere; could not replace it")
+                time.sleep(0.25)
+    finally:
+        if live is not None:
+            live.close()  # the lock was on the old file, now unlinked
+    _fsync(os.path.dirname(os.path.abspath(db_path)))
+
+    previous = read_generation(db_path)
+    record = {
+        "generation": previous.get("generation", 0) + 1,
+        "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "size": os.path.getsize(db_path),
+        "tables": table_counts(db_path),
+    }
+    tmp = generation_path(db_path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp, generation_path(db_path))
+    logger.info("✅ Published %s generation %s", db_path, record['generation'])
+    return record
+
+
+def _identity(db_path: str):
+    try:
+        st = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+class LiveConnection:
+    """A reader's connection that follows hot-swapped generations.
+
+    Call ``connection()`` per unit of work instead of holding a raw connection:
+    at most every ``check_interval`` seconds it stats the file and, if a new
+    generation was published, opens it and closes the old connection. One
+    instance per thread (or pass ``check_same_thread=False`` via ``connect_kwargs``).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        readonly: bool = True,
+        check_interval: float = 1.0,
+        row_factory: Optional[Callable] = None,
+        **connect_kwargs: Any,
+    ):
+        self.db_path = db_path
+        self.readonly = readonly
+        self.check_interval = check_interval
+        self.row_factory = row_factory
+        self.connect_kwargs = connect_kwargs
+        self._conn: Optional[sqlite3.Connection] = None
+        self._identity = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.reopens = 0
+
+    def _open(self) -> sqlite3.Connection:
+        if self.readonly:
+            conn = sqlite3.connect(f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True, **self.connect_kwargs)
+        else:
+            conn = sqlite3.connect(self.db_path, **self.connect_kwargs)
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        with self._lock:
+            now = time.monotonic()
+            if self._conn is not None and now - self._checked < self.check_interval:
+                return self._conn
+            self._checked = now
+            identity = _identity(self.db_path)
+            if self._conn is None or identity != self._identity:
+                if self._conn is not None:
+                    self._conn.close()
+                    self.reopens += 1
+                    logger.info("🔄 Reopened %s (generation %s)", self.db_path, self.generation)
+                self._conn = self._open()
+                self._identity = identity
+            return self._conn
+
+    @property
+    def generation(self) -> Optional[int]:
+        return read_generation(self.db_path).get("generation")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
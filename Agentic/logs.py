@@ -0,0 +1,152 @@
+"""
+Non-blocking logging for the CLIs and the agent runtime.
+
+``start_logging`` puts a single ``QueueHandler`` on the root logger. The calling
+thread only resolves the message arguments (they may change after the call)
+and enqueues the record. A ``QueueListener`` thread does the formatting and
+writes to the console and to a size-rotating log file. Call sites use lazy
+%-style arguments (``logger.debug("Connecting to %s", path)``), so a disabled
+level costs one ``isEnabledFor`` check and nothing is formatted.
+
+Levels can be set per logger name (``{"EXECUTOR": "DEBUG", "SCHEMA": "WARNING"}``),
+e.g. from the ``logging:`` section of config.yaml (see ``Agentic.config``).
+The listener is stopped and the queue drained at exit, or with ``stop_logging()``.
+Forked worker processes write directly: to the console, and appended to the
+parent's log file, which only the parent rotates.
+
+    python benchmarks/logging_overhead.py     # per-call cost, disabled and enabled
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Mapping, Optional, Union
+
+DEFAULT_FORMAT = "%(levelname)s - %(name)s - %(message)s"
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_exc_formatter = logging.Formatter()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records for the listener; formatting is left to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the arguments and traceback now (they may change or be gone
+        # later), but leave layout and timestamps to the writer thread. The
+        # queue handler is the only one on the root logger, so the record is
+        # updated in place rather than copied.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _level(value: Union[str, int, None], default: int = logging.INFO) -> int:
+    if value is None:
+        return default
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).upper())
+    return level if isinstance(level, int) else default
+
+
+def set_levels(levels: Optional[Mapping[str, Union[str, int]]]):
+    """Per-logger levels, e.g. ``{"EXECUTOR": "DEBUG", "harvest_pdf_ultramin": "WARNING"}``."""
+    for name, value in (levels or {}).items():
+        logging.getLogger(name).setLevel(_level(value, logging.NOTSET))
+
+
+def start_logging(
+    level: Union[str, int, None] = logging.INFO,
+    fmt: str = DEFAULT_FORMAT,
+    log_file: Optional[Union[str, Path]] = None,
+    max_bytes: int = 10 << 20,
+    backup_count: int = 5,
+    levels: Optional[Mapping[str, Union[str, int]]] = None,
+    console: bool = True,
+) -> bool:
+    """Route all logging through a background writer (idempotent; returns False if already running).
+
+    ``log_file`` rotates at ``max_bytes`` keeping ``backup_count`` old files;
+    ``max_bytes=0`` never rotates.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            set_levels(levels)
+            return False
+        formatter = logging.Formatter(fmt)
+        handlers = []
+        if console:
+            handlers.append(logging.StreamHandler())
+        if log_file:
+            path = Path(log_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handlers.append(logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True))
+        for h in handlers:
+            h.setFormatter(formatter)
+
+        q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _queue_handler = _QueueHandler(q)
+        root = logging.getLogger()
+        for h in list(root.handlers):  # replace whatever basicConfig or a previous run left
+            root.removeHandler(h)
+        root.addHandler(_queue_handler)
+        root.setLevel(_level(level))
+        set_levels(levels)
+        _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        return True
+
+
+def stop_logging():
+    """Write out everything still queued and close the handlers."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()  # drains the queue before returning
+        for h in _listener.handlers:
+            h.close()
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = _queue_handler = None
+
+
+def running() -> bool:
+    return _listener is not None
+
+
+def _after_fork_in_child():
+    # A forked worker has the queue handler but not the writer thread: write directly instead.
+    # Only the parent rotates the log file; a worker appends to it and reopens it once the
+    # parent has rotated, so workers never rename the file from under each other.
+    global _lock, _listener, _queue_handler
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for h in _listener.handlers:
+        if isinstance(h, logging.handlers.RotatingFileHandler):
+            watched = logging.handlers.WatchedFileHandler(h.baseFilename, encoding=h.encoding, delay=True)
+            watched.setFormatter(h.formatter)
+            watched.setLevel(h.level)
+            h = watched
+        root.addHandler(h)
+    _listener = _queue_handler = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
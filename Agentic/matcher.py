@@ -0,0 +1,299 @@
+"""
+Goal, strategy and action matching for free-text queries.
+
+Every goal (GoalInstance), strategy (StrategyLibrary) and core action
+(FunctionTemplateLibrary) is turned into a sparse TF-IDF vector of hashed word
+and character n-grams, L2-normalized. A query is vectorized the same way, so
+cosine similarity against a whole library is one sparse matrix product; a batch
+of queries is still a single product. Features are hashed with CRC32 into
+``N_FEATURES`` columns, so the index has no vocabulary and never needs a refit to
+vectorize new text.
+
+The index is saved next to the database (``agentic.db.matcher.npz``) together
+with a fingerprint of the texts it was built from; ``load_or_build`` rebuilds
+it only when goals, strategies or actions changed.
+
+Needs NumPy and SciPy (optional dependencies, imported on first use).
+
+    python -m Agentic.matcher "create a wing with tangency constraints" --k 3
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger("MATCHER")
+
+N_FEATURES = 1 << 18
+CHAR_NGRAMS = (3, 4, 5)
+# Features in more than this share of all texts are dropped: they barely
+# discriminate, and they are what would make a query touch every document
+MAX_DF = 0.5
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".matcher.npz"
+
+# kind -> (table, id column, name column, text columns, row filter)
+CORPORA = {
+    # Goal templates only: a session's GoalInstance rows are its own goals, not library entries
+    "goal": ("GoalInstance", "GoalID", "GoalName", ("GoalName", "GoalTarget", "GoalDescription"),
+             "SessionID IS NULL"),
+    "strategy": ("StrategyLibrary", "StrategyID", "StrategyName",
+                 ("StrategyName", "StrategyTarget", "StrategyDescription"), None),
+    "action": ("FunctionTemplateLibrary", "FunctionTemplateID", "FunctionName",
+               ("FunctionName", "StrategyType", "FunctionDescription"), None),
+}
+
+WORD_RX = re.compile(r"[a-z0-9]+")
+
+
+class Match(NamedTuple):
+    id: int
+    name: str
+    score: float
+
+
+def _np():
+    try:
+        import numpy as np
+        import scipy.sparse as sp
+    except ImportError as e:
+        raise ImportError("Agentic.matcher needs numpy and scipy (pip install numpy scipy)") from e
+    return np, sp
+
+
+def index_path(db_path: str) -> str:
+    return db_path + INDEX_SUFFIX
+
+
+# ─── Features ────────────────────────────────────────────────────────────
+
+
+def features(text: str) -> Dict[int, float]:
+    """Hashed term counts: words, word bigrams and character n-grams within words."""
+    words = WORD_RX.findall((text or "").lower())
+    grams = list(words)
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f" {w} "
+        for n in CHAR_NGRAMS:
+            grams += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+    counts: Dict[int, float] = {}
+    for g in grams:
+        h = zlib.crc32(g.encode("utf-8")) & (N_FEATURES - 1)
+        counts[h] = counts.get(h, 0.0) + 1.0
+    return counts
+
+
+def _vectors(texts: Sequence[str], idf=None, counts: Optional[List[Dict[int, float]]] = None):
+    """CSR arrays ``(data, indices, indptr)`` of sublinear TF (times ``idf``), rows L2-normalized."""
+    np, _ = _np()
+    counts = counts if counts is not None else [features(t) for t in texts]
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(c) for c in counts])
+    indices = np.fromiter((h for c in counts for h in c), dtype=np.int32, count=int(indptr[-1]))
+    data = np.fromiter((v for c in counts for v in c.values()), dtype=np.float32, count=int(indptr[-1]))
+    data = 1.0 + np.log(data)
+    rows = np.repeat(np.arange(len(counts)), np.diff(indptr))
+    if idf is not None:
+        data *= idf[indices]
+        if not data.all():   # pruned features (idf 0); rows may be or become empty
+            keep = data != 0
+            rows, indices, data = rows[keep], indices[keep], data[keep]
+            indptr[1:] = np.cumsum(np.bincount(rows, minlength=len(counts)))
+    if len(data):
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(counts)))
+        norms[norms == 0] = 1.0
+        data /= norms[rows].astype(np.float32)
+    return data, indices, indptr
+
+
+# ─── Corpus ──────────────────────────────────────────────────────────────
+
+
+def load_corpus(conn: sqlite3.Connection) -> Dict[str, List[Tuple[int, str, str]]]:
+    """kind -> [(id, name, text)] in id order."""
+    corpus = {}
+    for kind, (table, id_col, name_col, text_cols, where) in CORPORA.items():
+        text = " || ' ' || ".join(f"COALESCE({c}, '')" for c in text_cols)
+        where = f" WHERE {where}" if where else ""
+        corpus[kind] = conn.execute(
+            f"SELECT {id_col}, COALESCE({name_col}, ''), {text} FROM {table}{where} ORDER BY {id_col}").fetchall()
+    return corpus
+
+
+def corpus_fingerprint(db_path: str) -> str:
+    """Hash of every text the index is built from (no NumPy needed)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        corpus = load_corpus(conn)
+    finally:
+        conn.close()
+    h = hashlib.sha256(f"v{INDEX_VERSION}:{N_FEATURES}:{CHAR_NGRAMS}:{MAX_DF}".encode())
+    for kind in sorted(corpus):
+        for row in corpus[kind]:
+            h.update(repr((kind,) + tuple(row)).encode("utf-8"))
+    return h.hexdigest()
+
+
+# ─── Index ───────────────────────────────────────────────────────────────
+
+
+class Matcher:
+    """TF-IDF index over goals, strategies and actions; see the module docstring."""
+
+    def __init__(self, idf, matrices: Dict[str, Any], ids: Dict[str, Any], names: Dict[str, List[str]],
+                 fingerprint: str = ""):
+        self.idf = idf
+        self.matrices = matrices      # kind -> (N_FEATURES x n_docs) CSR, i.e. transposed document vectors
+        self.ids = ids
+        self.names = names
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, db_path: str) -> "Matcher":
+        np, sp = _np()
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            corpus = load_corpus(conn)
+        finally:
+            conn.close()
+        counts = {kind: [features(text) for _, _, text in rows] for kind, rows in corpus.items()}
+        n_docs = sum(len(c) for c in counts.values())
+        # Smoothed IDF over the whole library, so goal and strategy scores are comparable
+        df = np.bincount(np.fromiter((h for c in counts.values() for doc in c for h in doc), dtype=np.int64),
+                         minlength=N_FEATURES)
+        idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+        if n_docs >= 10:   # too few texts to tell what is common
+            idf[df > MAX_DF * n_docs] = 0
+        matrices, ids, names = {}, {}, {}
+        for kind, rows in corpus.items():
+            data, indices, indptr = _vectors((), idf, counts[kind])
+            docs = sp.csr_matrix((data, indices, indptr), shape=(len(rows), N_FEATURES))
+            matrices[kind] = docs.T.tocsr()
+            matrices[kind].sort_indices()
+            ids[kind] = np.asarray([r[0] for r in rows], dtype=np.int64)
+            names[kind] = [r[1] for r in rows]
+        return cls(idf, matrices, ids, names, corpus_fingerprint(db_path))
+
+    def save(self, path: str):
+        np, _ = _np()
+        arrays = {"idf": self.idf, "fingerprint": np.asarray(self.fingerprint)}
+        for kind, m in self.matrices.items():
+            arrays.update({f"{kind}.data": m.data, f"{kind}.indices": m.indices, f"{kind}.indptr": m.indptr,
+                           f"{kind}.ids": self.ids[kind], f"{kind}.names": np.asarray(self.names[kind], dtype=str)})
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Matcher":
+        np, sp = _np()
+        with np.load(path, allow_pickle=False) as f:
+            matrices, ids, names = {}, {}, {}
+            for kind in CORPORA:
+                n = len(f[f"{kind}.ids"])
+                matrices[kind] = sp.csr_matrix((f[f"{kind}.data"], f[f"{kind}.indices"], f[f"{kind}.indptr"]),
+                                               shape=(N_FEATURES, n))
+                ids[kind] = f[f"{kind}.ids"]
+                names[kind] = [str(x) for x in f[f"{kind}.names"]]
+            return cls(f["idf"], matrices, ids, names, str(f["fingerprint"]))
+
+    def vectorize(self, queries: Sequence[str]):
+        """(n_queries x N_FEATURES) CSR matrix of normalized TF-IDF vectors."""
+        _, sp = _np()
+        return sp.csr_matrix(_vectors(queries, self.idf), shape=(len(queries), N_FEATURES))
+
+    def scores(self, queries: Sequence[str], kind: str = "goal"):
+        """Dense (n_queries x n_docs) cosine similarities."""
+        np, _ = _np()
+        m = self.matrices[kind]
+        if len(queries) == 1:
+            # One query touches a few hundred rows of the inverted index: slice
+            # them and take one matrix-vector product, no query matrix needed
+            data, indices, _ = _vectors(queries, self.idf)
+            return (m[indices].T @ data)[None, :]
+        return (self.vectorize(queries) @ m).toarray()
+
+    def match_batch(self, queries: Sequence[str], kind: str = "goal", k: int = 5) -> List[List[Match]]:
+        """Top ``k`` matches (best first, score > 0) of ``kind`` for each query."""
+        np, _ = _np()
+        if not len(queries):
+            return []
+        scores = self.scores(queries, kind)
+        n = scores.shape[1]
+        if n == 0:
+            return [[] for _ in queries]
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (len(queries), 1))
+        out = []
+        for row, cols in zip(scores, top):
+            cols = cols[np.argsort(-row[cols], kind="stable")]
+            out.append([Match(int(self.ids[kind][c]), self.names[kind][c], float(row[c])) for c in cols if row[c] > 0])
+        return out
+
+    def match(self, query: str, kind: str = "goal", k: int = 5) -> List[Match]:
+        return self.match_batch([query], kind, k)[0]
+
+    def resolve(self, query: str) -> Dict[str, Optional[int]]:
+        """Best goal and strategy for a query, keyed like ``constants.ANSWER_FIELDS``."""
+        goal = self.match(query, "goal", 1)
+        strategy = self.match(query, "strategy", 1)
+        return {"currentGoalID": goal[0].id if goal else None,
+                "currentStrategyID": strategy[0].id if strategy else None}
+
+
+def build_index(db_path: str = "agentic.db", path: Optional[str] = None) -> Matcher:
+    """Rebuild and save the index for ``db_path``."""
+    t0 = time.perf_counter()
+    matcher = Matcher.build(db_path)
+    matcher.save(path or index_path(db_path))
+    sizes = ", ".join(f"{kind}: {len(names)}" for kind, names in matcher.names.items())
+    logger.info("✅ Matcher index for %s (%s) in %.2fs", db_path, sizes, time.perf_counter() - t0)
+    return matcher
+
+
+def load_or_build(db_path: str = "agentic.db", path: Optional[str] = None) -> Matcher:
+    """The saved index if it matches the database's current texts, otherwise a fresh one."""
+    path = path or index_path(db_path)
+    if os.path.exists(path):
+        try:
+            matcher = Matcher.load(path)
+            if matcher.fingerprint == corpus_fingerprint(db_path):
+                return matcher
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("⚠️ Ignoring unreadable matcher index %s: %s", path, e)
+    return build_index(db_path, path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Match queries to goals, strategies and actions")
+    ap.add_argument("query", nargs="*", help="Query text (several = one batch)")
+    ap.add_argument("--db", default="agentic.db")
+    ap.add_argument("--kind", choices=sorted(CORPORA), action="append", help="Default: all kinds")
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--rebuild", action="store_true", help="Rebuild the saved index")
+    args = ap.parse_args()
+    from .config import setup_logging
+
+    setup_logging()
+    matcher = build_index(args.db) if args.rebuild else load_or_build(args.db)
+    if not args.query:
+        return
+    for kind in args.kind or sorted(CORPORA):
+        t0 = time.perf_counter()
+        results = matcher.match_batch(args.query, kind, args.k)
+        ms = (time.perf_counter() - t0) * 1000
+        for query, matches in zip(args.query, results):
+            print(f"[{kind}] {query!r} ({ms / len(args.query):.3f} ms/query)")
+            for m in matches:
+                print(f"    {m.score:.3f}  #{m.id}  {m.name}")
+
+
+if __name__ == "__main__":
+    main()
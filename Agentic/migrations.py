@@ -0,0 +1,191 @@
+"""
+Versioned schema migrations driven by ``PRAGMA user_version``.
+Shared by ``Agentic.schema`` (agentic.db) and ``schema_ultra_combo`` (knowledge.db).
+"""
+
+import hashlib
+import logging
+import sqlite3
+from dataclasses import dataclass
+from typing import List, Sequence
+
+logger = logging.getLogger("MIGRATIONS")
+
+LEDGER_TABLE = "schema_migrations"
+
+
+class MigrationError(RuntimeError):
+    """Raised when the database history does not match the migration list."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One ordered schema step. ``online`` steps (index builds) commit per statement."""
+
+    version: int
+    name: str
+    sql: str
+    online: bool = False
+
+    @property
+    def checksum(self) -> str:
+        # Whitespace-insensitive so reformatting a migration does not change it
+        return hashlib.sha256(" ".join(self.sql.split()).encode("utf-8")).hexdigest()
+
+
+# ─── Helpers ───────────────────────────────────────────────────────────
+
+
+def split_sql(script: str) -> List[str]:
+    """Split a SQL script into complete statements."""
+    statements, buf = [], ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip(" \t\r\n;"):
+                statements.append(buf.strip())
+            buf = ""
+    if buf.strip():
+        statements.append(buf.strip())
+    return [s for s in statements if _strip_comments(s)]
+
+
+def _strip_comments(stmt: str) -> str:
+    return "\n".join(
+        ln for ln in stmt.splitlines() if not ln.strip().startswith("--")
+    ).strip(" \t\r\n;")
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _ensure_ledger(conn: sqlite3.Connection):
+    conn.execute(
+        f"""CREATE TABLE IF NOT EXISTS {LEDGER_TABLE}(
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            checksum   TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )"""
+    )
+
+
+def _verify_history(conn: sqlite3.Connection, migrations: Sequence[Migration]):
+    known = {m.version: m for m in migrations}
+    rows = conn.execute(
+        f"SELECT version, name, checksum FROM {LEDGER_TABLE} ORDER BY version"
+    ).fetchall()
+    for version, name, checksum in rows:
+        m = known.get(version)
+        if m is None:
+            raise MigrationError(f"Database has unknown migration {version} ({name})")
+        if m.checksum != checksum:
+            raise MigrationError(
+                f"Checksum mismatch for migration {version} ({name}): "
+                "an applied migration was edited"
+            )
+
+
+def _validate(migrations: Sequence[Migration]):
+    versions = [m.version for m in migrations]
+    if versions != sorted(set(versions)) or (versions and versions[0] < 1):
+        raise MigrationError(f"Migration versions must be unique and ascending: {versions}")
+
+
+# ─── Engine ────────────────────────────────────────────────────────────
+
+
+def pending_migrations(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> List[Migration]:
+    """Return the migrations not yet applied to ``conn``."""
+    _validate(migrations)
+    version = current_version(conn)
+    if version and conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (LEDGER_TABLE,)
+    ).fetchone():
+        _verify_history(conn, migrations)
+    return [m for m in migrations if m.version > version]
+
+
+def migrate(
+    conn: sqlite3.Connection,
+    migrations: Sequence[Migration],
+    dry_run: bool = False,
+    busy_timeout_ms: int = 5000,
+) -> List[Migration]:
+    """Bring ``conn`` up to the latest migration; returns the steps applied (or planned)."""
+    pending = pending_migrations(conn, migrations)
+    if dry_run or not pending:
+        for m in pending:
+            logger.info("Would apply migration %d (%s)%s", m.version, m.name,
+                        " [online]" if m.online else "")
+        return pending
+
+    previous_isolation = conn.isolation_level
+    conn.commit()
+    conn.isolation_level = None  # explicit transaction control below
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        for m in pending:
+            if m.online:
+                _apply_online(conn, m)
+            else:
+                _apply_atomic(conn, m)
+            logger.info("Applied migration %d (%s)", m.version, m.name)
+    finally:
+        conn.isolation_level = previous_isolation
+    return pending
+
+
+def _record(conn: sqlite3.Connection, m: Migration):
+    conn.execute(
+        f"INSERT OR REPLACE INTO {LEDGER_TABLE}(version, name, checksum) VALUES (?,?,?)",
+        (m.version, m.name, m.checksum),
+    )
+    conn.execute(f"PRAGMA user_version = {int(m.version)}")
+
+
+def _apply_atomic(conn: sqlite3.Connection, m: Migration):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _ensure_ledger(conn)
+        for stmt in split_sql(m.sql):
+            conn.execute(stmt)
+        _record(conn, m)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _apply_online(conn: sqlite3.Connection, m: Migration):
+    # Each statement (typically CREATE INDEX IF NOT EXISTS) gets its own short
+    # write transaction, so readers and the agent's writers interleave between
+    # index builds instead of waiting on one long lock. Statements must be
+    # idempotent: an interrupted run resumes by re-applying the whole step.
+    for stmt in split_sql(m.sql):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(stmt)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _ensure_ledger(conn)
+        _record(conn, m)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def reset(conn: sqlite3.Connection, tables: Sequence[str]):
+    """Drop ``tables`` and the migration ledger so the next ``migrate`` starts from scratch."""
+    conn.execute("PRAGMA foreign_keys = OFF")
+    for t in list(tables) + [LEDGER_TABLE]:
+        conn.execute(f"DROP TABLE IF EXISTS {t}")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = ON")
@@ -0,0 +1,303 @@
+"""
+Vectorized checks over the numeric geometry parameters of harvested steps.
+
+knowledge.db keeps every numeric parameter in ``step_params_ultramin``, one
+``(step_id, name, feature, value, unit)`` row each, written by triggers as steps
+are harvested (see ``schema_ultra_combo``). ``load_columns`` reads that table
+once into column arrays: int64 step ids, float64 values, and int32 codes for
+name, feature and unit. The arrays are cached next to the database
+(``knowledge.db.params.npz``) until ``harvested_steps_ultramin`` changes.
+
+``validate`` then checks the whole corpus with array operations, never a
+Python loop over rows:
+- range: value is non-finite or outside the rule's ``min``/``max``;
+- unit: unit differs from the rule's ``unit``, or, for names without one, from
+  the unit most rows of that name use;
+- outlier: robust z-score ``|x - median| / (1.4826 * MAD)`` within the name
+  above ``outlier_z``, for names with at least ``min_group`` values.
+
+Needs NumPy (optional dependency, imported on first use).
+
+    python -m Agentic.param_checks --db knowledge.db
+    python -m Agentic.param_checks --synthetic 100000     # timing on a generated corpus
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger("PARAM_CHECKS")
+
+PARAM_TABLE = "step_params_ultramin"
+SOURCE_TABLE = "harvested_steps_ultramin"
+CACHE_SUFFIX = ".params.npz"
+CACHE_VERSION = 1
+
+# name -> bounds and expected unit (None = unitless); names not listed only get
+# the unit-consistency and outlier checks
+DEFAULT_RULES: Dict[str, Dict[str, Any]] = {
+    "offset_mm": {"min": -10000.0, "max": 10000.0, "unit": "mm"},
+    "thickness_mm": {"min": 0.0, "max": 1000.0, "unit": "mm"},
+    "angle_deg": {"min": -360.0, "max": 360.0, "unit": "deg"},
+    "Offset": {"min": -10000.0, "max": 10000.0, "unit": "mm"},
+    "H": {"min": -10000.0, "max": 10000.0},
+    "V": {"min": -10000.0, "max": 10000.0},
+    "x": {"min": -10000.0, "max": 10000.0},
+    "Tension": {"min": 0.0, "max": 10.0, "unit": None},
+}
+
+REASONS = ("range", "unit", "outlier")
+
+
+class ParamColumns(NamedTuple):
+    step_id: Any   # int64[n]
+    name: Any      # int32[n] -> names
+    feature: Any   # int32[n] -> features
+    value: Any     # float64[n]
+    unit: Any      # int32[n] -> units ("" = unitless)
+    names: List[str]
+    features: List[str]
+    units: List[str]
+
+
+def _np():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("Agentic.param_checks needs numpy (pip install numpy)") from e
+    return np
+
+
+def cache_path(db_path: str) -> str:
+    return db_path + CACHE_SUFFIX
+
+
+# ─── Loading ─────────────────────────────────────────────────────────────
+
+
+def _stamp(conn: sqlite3.Connection) -> Optional[str]:
+    """Changes whenever harvested steps are written (via the row-count triggers), else None."""
+    try:
+        row = conn.execute("SELECT row_count, last_modified FROM table_stats WHERE table_name = ?",
+                           (SOURCE_TABLE,)).fetchone()
+    except sqlite3.Error:
+        return None
+    return f"{row[0]}|{row[1]}" if row else None
+
+
+def _encode(values: List[str]):
+    np = _np()
+    vocab: Dict[str, int] = {}
+    codes = np.fromiter((vocab.setdefault(v, len(vocab)) for v in values), dtype=np.int32, count=len(values))
+    return codes, list(vocab)
+
+
+def read_columns(conn: sqlite3.Connection) -> ParamColumns:
+    np = _np()
+    rows = conn.execute(f"SELECT step_id, name, COALESCE(feature, ''), value, COALESCE(unit, '') "
+                        f"FROM {PARAM_TABLE} ORDER BY step_id, name").fetchall()
+    step_ids, names, features, values, units = zip(*rows) if rows else ((),) * 5
+    name_codes, name_vocab = _encode(names)
+    feature_codes, feature_vocab = _encode(features)
+    unit_codes, unit_vocab = _encode(("",) + tuple(units))  # "" is always code 0
+    return ParamColumns(
+        np.array(step_ids, dtype=np.int64), name_codes, feature_codes,
+        np.array(values, dtype=np.float64), unit_codes[1:], name_vocab, feature_vocab, unit_vocab,
+    )
+
+
+def save_columns(cols: ParamColumns, path: str, stamp: str):
+    np = _np()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, step_id=cols.step_id, name=cols.name, feature=cols.feature, value=cols.value,
+                 unit=cols.unit, names=np.array(cols.names, dtype=str),
+                 features=np.array(cols.features, dtype=str), units=np.array(cols.units, dtype=str),
+                 meta=np.array(json.dumps({"version": CACHE_VERSION, "stamp": stamp})))
+    os.replace(tmp, path)
+
+
+def _load_cached(path: str, stamp: str) -> Optional[ParamColumns]:
+    np = _np()
+    try:
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta != {"version": CACHE_VERSION, "stamp": stamp}:
+                return None
+            return ParamColumns(z["step_id"], z["name"], z["feature"], z["value"], z["unit"],
+                                z["names"].tolist(), z["features"].tolist(), z["units"].tolist())
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def load_columns(db_path: str = "knowledge.db", use_cache: bool = True) -> ParamColumns:
+    """All numeric parameters of ``db_path`` as columns, from the cache when it is current."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        stamp = _stamp(conn) if use_cache else None
+        if stamp is not None:
+            cols = _load_cached(cache_path(db_path), stamp)
+            if cols is not None:
+                return cols
+        cols = read_columns(conn)
+    finally:
+        conn.close()
+    if stamp is not None:
+        try:
+            save_columns(cols, cache_path(db_path), stamp)
+        except OSError as e:
+            logger.debug("Could not write %s: %s", cache_path(db_path), e)
+    return cols
+
+
+# ─── Checks ──────────────────────────────────────────────────────────────
+
+
+def _groups(np, keys, n_keys: int):
+    """Row order grouped by key, and each key's ``[start, end)`` in that order."""
+    small = keys.astype(np.int16) if n_keys < (1 << 15) else keys  # radix sort for small vocabularies
+    order = np.argsort(small, kind="stable")
+    return order, np.searchsorted(keys[order], np.arange(n_keys + 1))
+
+
+def _group_median(np, values, order, bounds):
+    """Median of ``values`` per group (NaN for empty groups): one O(n) partition per
+    parameter name, not per row."""
+    out = np.full(len(bounds) - 1, np.nan)
+    v = values[order]
+    for key, (a, b) in enumerate(zip(bounds[:-1].tolist(), bounds[1:].tolist())):
+        if b > a:
+            out[key] = np.median(v[a:b])
+    return out
+
+
+def _distinct(np, a) -> int:
+    """Number of distinct values; O(n) when ``a`` is sorted (as ``read_columns`` returns it)."""
+    if len(a) < 2:
+        return len(a)
+    diff = np.diff(a)
+    return int(np.count_nonzero(diff)) + 1 if (diff >= 0).all() else len(np.unique(a))
+
+
+def check(cols: ParamColumns, rules: Optional[Dict[str, Dict[str, Any]]] = None,
+          outlier_z: float = 6.0, min_group: int = 8) -> Dict[str, Any]:
+    """Boolean masks (one entry per parameter row) for each of ``REASONS``."""
+    np = _np()
+    if not len(cols.value):
+        return {r: np.zeros(0, dtype=bool) for r in REASONS}
+    rules = DEFAULT_RULES if rules is None else rules
+    n_names = len(cols.names)
+    lo = np.full(n_names, -np.inf)
+    hi = np.full(n_names, np.inf)
+    expected = np.full(n_names, -1, dtype=np.int32)  # -1: no rule, use the majority unit
+    unit_code = {u: i for i, u in enumerate(cols.units)}
+    for i, name in enumerate(cols.names):
+        rule = rules.get(name)
+        if not rule:
+            continue
+        lo[i] = -math.inf if rule.get("min") is None else rule["min"]
+        hi[i] = math.inf if rule.get("max") is None else rule["max"]
+        if "unit" in rule:
+            expected[i] = unit_code.get(rule["unit"] or "", len(cols.units))  # unseen unit never matches
+
+    name, value, unit = cols.name, cols.value, cols.unit
+    finite = np.isfinite(value)
+    out_of_range = ~finite | (value < lo[name]) | (value > hi[name])
+
+    # Names without an expected unit should at least agree with themselves
+    counts = np.bincount(name.astype(np.int64) * len(cols.units) + unit,
+                         minlength=n_names * len(cols.units)).reshape(n_names, len(cols.units))
+    expected = np.where(expected >= 0, expected, counts.argmax(axis=1))
+    wrong_unit = unit != expected[name]
+
+    # Usually every value is finite: skip the masked copies then
+    keep = slice(None) if finite.all() else finite
+    order, bounds = _groups(np, name[keep], n_names)
+    size = np.diff(bounds)
+    med = _group_median(np, value[keep], order, bounds)
+    dev = np.abs(value - med[name])
+    mad = _group_median(np, dev[keep], order, bounds)
+    scale = 1.4826 * mad[name]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(scale > 0, dev / scale, 0.0)
+    outlier = finite & (size[name] >= min_group) & (z > outlier_z)
+    return {"range": out_of_range, "unit": wrong_unit, "outlier": outlier}
+
+
+def validate(cols: ParamColumns, rules: Optional[Dict[str, Dict[str, Any]]] = None,
+             outlier_z: float = 6.0, min_group: int = 8, limit: int = 100) -> Dict[str, Any]:
+    """Counts per check, failing steps and the first ``limit`` failing parameters."""
+    np = _np()
+    t0 = time.perf_counter()
+    masks = check(cols, rules, outlier_z, min_group)
+    bad = masks["range"] | masks["unit"] | masks["outlier"]
+    steps = _distinct(np, cols.step_id)
+    failed_steps = _distinct(np, cols.step_id[bad])
+    seconds = time.perf_counter() - t0
+    failures = []
+    for i in np.flatnonzero(bad)[:limit].tolist():
+        failures.append({
+            "step_id": int(cols.step_id[i]), "feature": cols.features[cols.feature[i]],
+            "name": cols.names[cols.name[i]], "value": float(cols.value[i]),
+            "unit": cols.units[cols.unit[i]] or None,
+            "reasons": [r for r in REASONS if masks[r][i]],
+        })
+    return {
+        "parameters": len(cols.value), "steps": steps, "failed_steps": failed_steps,
+        **{r: int(masks[r].sum()) for r in REASONS},
+        "seconds": round(seconds, 6), "failures": failures,
+    }
+
+
+def validate_db(db_path: str = "knowledge.db", **kw) -> Dict[str, Any]:
+    return validate(load_columns(db_path), **kw)
+
+
+def synthetic_columns(n_steps: int, seed: int = 0) -> ParamColumns:
+    """A generated corpus of ``n_steps`` steps with two parameters each (for timing)."""
+    np = _np()
+    rng = np.random.default_rng(seed)
+    names = ["offset_mm", "angle_deg", "thickness_mm", "H", "V", "Tension"]
+    units = ["", "mm", "deg"]
+    name = rng.integers(0, len(names), 2 * n_steps).astype(np.int32)
+    unit = np.array([1, 2, 1, 1, 1, 0], dtype=np.int32)[name]
+    value = rng.normal(50, 10, len(name))
+    value[rng.random(len(name)) < 1e-3] *= 100   # a few outliers / out-of-range values
+    return ParamColumns(np.repeat(np.arange(n_steps, dtype=np.int64), 2), name,
+                        np.zeros(len(name), dtype=np.int32), value, unit, names, [""], units)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Range, unit and outlier checks over harvested numeric parameters")
+    ap.add_argument("--db", default="knowledge.db")
+    ap.add_argument("--rules", help="JSON file of {name: {min, max, unit}} replacing the defaults")
+    ap.add_argument("--outlier-z", type=float, default=6.0)
+    ap.add_argument("--limit", type=int, default=20, help="Failing parameters to list")
+    ap.add_argument("--synthetic", type=int, help="Validate a generated corpus of N steps instead")
+    ap.add_argument("--no-cache", action="store_true", help="Do not read or write the .params.npz cache")
+    args = ap.parse_args()
+    from .config import setup_logging
+
+    setup_logging()
+    rules = None
+    if args.rules:
+        with open(args.rules, encoding="utf-8") as f:
+            rules = json.load(f)
+    t0 = time.perf_counter()
+    cols = synthetic_columns(args.synthetic) if args.synthetic else load_columns(args.db, not args.no_cache)
+    load_ms = (time.perf_counter() - t0) * 1000
+    report = validate(cols, rules, outlier_z=args.outlier_z, limit=args.limit)
+    logger.info("📐 %s parameters of %s steps: %s steps failed (range %s, unit %s, outlier %s); "
+                "load %.1f ms, checks %.2f ms", report['parameters'], report['steps'], report['failed_steps'],
+                report['range'], report['unit'], report['outlier'], load_ms, report['seconds'] * 1000)
+    for f in report["failures"]:
+        print(json.dumps(f, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
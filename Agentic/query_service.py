@@ -0,0 +1,558 @@
+"""
+Local query service over knowledge.db and the agentic.db library.
+
+One long-running process answers typed read queries for every agent process
+on the machine, over a Unix socket or localhost HTTP:
+
+- ``lookup_step``: a harvested step by id
+- ``match_docs``: doc functions for an action label, ranked by token overlap
+- ``dependency_subgraph``: a step and the steps it depends on (the rule of
+  ``codegen_ultramin``: latest earlier producer of a referenced feature in the
+  same document)
+- ``library``: function templates with parameters/outputs, strategies with
+  their plans, or goals
+
+Queries run on a fixed pool of read connections (``SnapshotReader``, so a new
+snapshot is picked up without a restart). Every query has fixed SQL text, and
+variable-length lists are passed as one JSON parameter (``json_each(?)``). Each
+connection therefore prepares a statement once and reuses it from its statement
+cache. Results are memoized in one ``ResultCache`` keyed on the snapshot
+version, so clients share a warm cache instead of each paying cold-start query
+costs. ``POST /batch`` runs many queries in one round trip.
+
+    python -m Agentic.query_service serve --socket /tmp/agentic-query.sock
+    python -m Agentic.query_service serve --port 8765
+    python -m Agentic.query_service call lookup_step '{"step_id": 12}' --socket /tmp/agentic-query.sock
+    python benchmarks/query_service_load.py      # QPS and p99 vs direct sqlite3.connect
+
+From Python::
+
+    with QueryClient("unix:/tmp/agentic-query.sock") as client:
+        step = client.call("lookup_step", step_id=12)
+        steps = client.batch([("lookup_step", {"step_id": i}) for i in range(1, 50)])
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import telemetry
+from .result_cache import ResultCache, canonical
+from .snapshots import SnapshotPolicy, SnapshotReader
+
+logger = logging.getLogger("QUERY_SERVICE")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QueryError(ValueError):
+    """A request names an unknown query or passes invalid arguments."""
+
+
+@dataclass
+class ServicePolicy:
+    """Where the service listens and what it reads."""
+
+    knowledge_db: str = "knowledge.db"
+    agentic_db: str = "agentic.db"
+    host: str = "127.0.0.1"
+    port: int = 8765
+    socket: Optional[str] = None
+    pool_size: int = 4
+    cached_statements: int = 256
+    cache_mb: int = 64
+    max_batch: int = 1000
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ServicePolicy":
+        section = (config or {}).get("query_service") or {}
+        known = {k: v for k, v in section.items() if k in cls.__dataclass_fields__}
+        if "agentic_db" not in known and (config or {}).get("agentic_db"):
+            known["agentic_db"] = config["agentic_db"]
+        return cls(**known)
+
+
+# ─── Queries ─────────────────────────────────────────────────────────────
+#
+# Each query is ``fn(conn, **args)`` on a connection to its database. The SQL
+# text never depends on the arguments, so it stays in the statement cache.
+
+STEP_COLUMNS = ("step_id", "action_label", "description", "params_json", "produces_json",
+                "references_json", "code_lang", "generated_code", "source_doc")
+STEP_SQL = f"SELECT {', '.join(STEP_COLUMNS)} FROM harvested_steps_ultramin WHERE step_id = ?"
+STEPS_SQL = (f"SELECT {', '.join(STEP_COLUMNS)} FROM harvested_steps_ultramin "
+             "WHERE step_id IN (SELECT value FROM json_each(?)) ORDER BY step_id")
+
+MATCH_DOCS_SQL = """
+SELECT function_key, api_factory, api_method, action_label, doc_url, exact, overlap FROM (
+    SELECT d.*, d.action_label = :label AS exact,
+           (SELECT COUNT(*) FROM json_each(d.tokens_json) t
+             WHERE t.value IN (SELECT value FROM json_each(:tokens))) AS overlap
+      FROM doc_functions_ultramin d)
+ WHERE exact OR overlap > 0
+ ORDER BY exact DESC, overlap DESC, function_key
+ LIMIT :limit
+"""
+
+FUNCTIONS_SQL = "SELECT FunctionTemplateID, FunctionName, StrategyType, FunctionDescription FROM FunctionTemplateLibrary ORDER BY FunctionTemplateID"
+PARAMETERS_SQL = "SELECT FunctionTemplateID, ParameterName, ParameterValue, Type FROM FunctionParametersLibrary ORDER BY FunctionParameterID"
+OUTPUTS_SQL = "SELECT FunctionTemplateID, OutputName, OutputValue, Type FROM FunctionOutputLibrary ORDER BY FunctionOutputID"
+STRATEGIES_SQL = "SELECT StrategyID, StrategyName, StrategyTarget, StrategyDescription, PlanSteps FROM StrategyLibrary ORDER BY StrategyID"
+GOALS_SQL = "SELECT GoalID, GoalName, GoalTarget, GoalValidation, GoalDescription FROM GoalInstance WHERE SessionID IS NULL ORDER BY GoalID"
+
+
+def _loads(text: Optional[str], default: Any) -> Any:
+    try:
+        return json.loads(text) if text else default
+    except ValueError:
+        return default
+
+
+def _step(row: Sequence[Any]) -> Dict[str, Any]:
+    step = dict(zip(STEP_COLUMNS, row))
+    step["params"] = _loads(step.pop("params_json"), {})
+    step["produces"] = _loads(step.pop("produces_json"), [])
+    step["references"] = _loads(step.pop("references_json"), [])
+    return step
+
+
+def lookup_step(conn: sqlite3.Connection, step_id: int) -> Optional[Dict[str, Any]]:
+    row = conn.execute(STEP_SQL, (int(step_id),)).fetchone()
+    return _step(row) if row else None
+
+
+def match_docs(conn: sqlite3.Connection, action_label: str = "", tokens: Optional[List[str]] = None,
+               limit: int = 10) -> List[Dict[str, Any]]:
+    """Doc functions with this ``action_label`` first, then by shared tokens
+    (default: the words of the label, e.g. ``create_plane_offset`` -> plane, offset)."""
+    if tokens is None:
+        tokens = [t for t in action_label.lower().split("_") if t and t != "create"]
+    if not action_label and not tokens:
+        raise QueryError("match_docs needs action_label or tokens")
+    cur = conn.execute(MATCH_DOCS_SQL, {"label": action_label, "tokens": json.dumps([t.lower() for t in tokens]),
+                                        "limit": int(limit)})
+    names = [c[0] for c in cur.description]
+    return [dict(zip(names, row)) for row in cur]
+
+
+def _codegen():
+    """``codegen_ultramin``, whose dependency rule the subgraph query shares."""
+    try:
+        import codegen_ultramin
+    except ImportError:
+        sys.path.insert(0, os.path.join(ROOT, "ultramin_package"))
+        import codegen_ultramin
+    return codegen_ultramin
+
+
+def document_dependencies(conn: sqlite3.Connection, source_doc: str) -> Dict[str, Dict[str, int]]:
+    """``{step_id: {feature: producing step_id}}`` for every step of one document (ids as strings)."""
+    codegen = _codegen()
+    steps = codegen.load_steps(conn, source_doc)
+    codegen.dependency_levels(steps)
+    return {str(s["step_id"]): s["dependencies"] for s in steps}
+
+
+def dependency_subgraph(conn: sqlite3.Connection, step_id: int, depth: Optional[int] = None,
+                        dependencies: Callable[[sqlite3.Connection, str], Dict[str, Dict[str, int]]]
+                        = document_dependencies) -> Optional[Dict[str, Any]]:
+    """The step, every step it (transitively) depends on up to ``depth`` hops, and the
+    ``[step_id, feature, producing step_id]`` edges."""
+    root = lookup_step(conn, step_id)
+    if root is None:
+        return None
+    deps = dependencies(conn, root["source_doc"] or "")
+    edges: List[List[Any]] = []
+    seen = {root["step_id"]}
+    frontier = [root["step_id"]]
+    hops = 0
+    while frontier and (depth is None or hops < int(depth)):
+        nxt = []
+        for sid in frontier:
+            for feature, dep in sorted(deps.get(str(sid), {}).items()):
+                edges.append([sid, feature, dep])
+                if dep not in seen:
+                    seen.add(dep)
+                    nxt.append(dep)
+        frontier = nxt
+        hops += 1
+    nodes = [_step(row) for row in conn.execute(STEPS_SQL, (json.dumps(sorted(seen)),))]
+    return {"root": root["step_id"], "nodes": nodes, "edges": edges}
+
+
+def library(conn: sqlite3.Connection, kind: str = "functions", name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """The agentic.db library: ``functions``, ``strategies`` or ``goals`` (optionally just ``name``)."""
+    if kind == "functions":
+        params: Dict[int, Dict[str, Any]] = {}
+        outputs: Dict[int, Dict[str, Any]] = {}
+        for fid, pname, value, typ in conn.execute(PARAMETERS_SQL):
+            params.setdefault(fid, {})[pname] = {"default": value, "type": typ}
+        for fid, oname, value, typ in conn.execute(OUTPUTS_SQL):
+            outputs.setdefault(fid, {})[oname] = {"value": value, "type": typ}
+        out = [{"id": fid, "name": fname, "strategy_type": stype, "description": desc,
+                "parameters": params.get(fid, {}), "outputs": outputs.get(fid, {})}
+               for fid, fname, stype, desc in conn.execute(FUNCTIONS_SQL)]
+    elif kind == "strategies":
+        out = [{"id": sid, "name": sname, "target": target, "description": desc, "plan": _loads(plan, None)}
+               for sid, sname, target, desc, plan in conn.execute(STRATEGIES_SQL)]
+    elif kind == "goals":
+        out = [{"id": gid, "name": gname, "target": target, "validation": validation, "description": desc}
+               for gid, gname, target, validation, desc in conn.execute(GOALS_SQL)]
+    else:
+        raise QueryError(f"Unknown library kind {kind!r} (functions, strategies, goals)")
+    return [item for item in out if name is None or item["name"] == name]
+
+
+# name -> (database, query)
+QUERIES: Dict[str, Tuple[str, Callable[..., Any]]] = {
+    "lookup_step": ("knowledge", lookup_step),
+    "match_docs": ("knowledge", match_docs),
+    "dependency_subgraph": ("knowledge", dependency_subgraph),
+    "library": ("agentic", library),
+}
+
+
+# ─── Service ─────────────────────────────────────────────────────────────
+
+
+class ReaderPool:
+    """A fixed set of read connections to one database, checked out one at a time.
+
+    Each is a ``SnapshotReader`` (follows ``CURRENT``) with a statement cache of
+    ``cached_statements``. A checkout blocks while all of them are in use, which
+    bounds the concurrent SQLite work to ``size`` queries per database.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, cached_statements: int = 256,
+                 policy: Optional[SnapshotPolicy] = None):
+        self.db_path = db_path
+        self.size = size
+        self._idle: "queue.Queue[SnapshotReader]" = queue.Queue()
+        self._readers = [SnapshotReader(db_path, policy, check_same_thread=False,
+                                        cached_statements=cached_statements) for _ in range(size)]
+        for reader in self._readers:
+            self._idle.put(reader)
+
+    @contextmanager
+    def checkout(self) -> Iterator[Tuple[sqlite3.Connection, Optional[int]]]:
+        """``(connection, snapshot version)``; the version is None when reading the live file."""
+        reader = self._idle.get()
+        try:
+            conn = reader.connection()
+            yield conn, reader.version
+        finally:
+            self._idle.put(reader)
+
+    def close(self):
+        for reader in self._readers:
+            reader.close()
+
+
+class QueryService:
+    """The queries bound to their databases, a reader pool per database and a shared result cache."""
+
+    def __init__(self, policy: Optional[ServicePolicy] = None, snapshot_policy: Optional[SnapshotPolicy] = None,
+                 cache: Optional[ResultCache] = None):
+        self.policy = policy or ServicePolicy()
+        self.cache = cache or ResultCache(max_bytes=self.policy.cache_mb << 20)
+        pools = {db: ReaderPool(path, self.policy.pool_size, self.policy.cached_statements, snapshot_policy)
+                 for db, path in (("knowledge", self.policy.knowledge_db), ("agentic", self.policy.agentic_db))}
+        self.pools = pools
+        self.queries = dict(QUERIES, dependency_subgraph=("knowledge", self._dependency_subgraph))
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._tls = threading.local()
+
+    def _memoized(self, db: str, op: str, fn: Callable[..., Any], conn: sqlite3.Connection,
+                  version: Optional[int], args: Dict[str, Any]) -> Any:
+        pool = self.pools[db]
+        # A snapshot never changes, so its version identifies the data; the live file needs its stamp
+        inputs = {"db": os.path.abspath(pool.db_path), "version": version, "args": args}
+        result, _ = self.cache.memoize(op, lambda: fn(conn, **args), inputs,
+                                       db_path=pool.db_path if version is None else None)
+        return result
+
+    def _dependency_subgraph(self, conn: sqlite3.Connection, step_id: int,
+                             depth: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        # The per-document dependency map is the expensive part and is shared by all its steps
+        version = self._tls.version
+        return dependency_subgraph(conn, step_id, depth, dependencies=lambda c, doc: self._memoized(
+            "knowledge", "document_dependencies", document_dependencies, c, version, {"source_doc": doc}))
+
+    def run(self, op: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        """Answer one query (memoized)."""
+        entry = self.queries.get(op)
+        if entry is None:
+            raise QueryError(f"Unknown query {op!r} ({', '.join(sorted(self.queries))})")
+        args = dict(args or {})
+        db, fn = entry
+        with self._lock:
+            self.requests += 1
+        with telemetry.span(f"query_service.{op}"), self.pools[db].checkout() as (conn, version):
+            self._tls.version = version  # for queries that memoize a part of their work
+            try:
+                return self._memoized(db, op, fn, conn, version, args)
+            except (TypeError, ValueError) as e:  # wrong, missing or malformed arguments
+                raise QueryError(f"{op}: {e}") from e
+
+    def batch(self, requests: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``[{"op": .., "args": {..}}, ..]`` -> ``[{"result": ..} or {"error": ..}, ..]`` in order."""
+        if len(requests) > self.policy.max_batch:
+            raise QueryError(f"Batch of {len(requests)} exceeds max_batch={self.policy.max_batch}")
+        out = []
+        for req in requests:
+            try:
+                out.append({"result": self.run(req.get("op", ""), req.get("args"))})
+            except (QueryError, sqlite3.Error) as e:
+                out.append({"error": str(e)})
+        telemetry.count("query_service.batched", len(requests))
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "cache": self.cache.info(),
+                "pools": {db: {"path": p.db_path, "size": p.size} for db, p in self.pools.items()}}
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+        self.cache.close()
+
+
+# ─── HTTP transport ──────────────────────────────────────────────────────
+#
+#   POST /q/<query>   body: JSON arguments      -> {"result": ...}
+#   POST /batch       body: [{"op", "args"}..]  -> {"results": [{"result"} or {"error"}, ..]}
+#   GET  /stats                                 -> requests, cache and pool counters
+# Errors are {"error": message} with status 400 (bad request) or 500.
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: a client reuses one connection
+    server_version = "AgenticQuery/1"
+
+    @property
+    def service(self) -> QueryService:
+        return self.server.service
+
+    def _reply(self, status: int, payload: Any):
+        body = canonical(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError as e:
+            raise QueryError(f"Request body is not JSON: {e}") from e
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._reply(200, self.service.stats())
+        else:
+            self._reply(404, {"error": f"No route {self.path}"})
+
+    def do_POST(self):
+        try:
+            if self.path == "/batch":
+                body = self._body()
+                if not isinstance(body, list):
+                    raise QueryError("/batch expects a JSON list of {op, args}")
+                self._reply(200, {"results": self.service.batch(body)})
+            elif self.path.startswith("/q/"):
+                args = self._body()
+                if not isinstance(args, dict):
+                    raise QueryError("Query arguments must be a JSON object")
+                self._reply(200, {"result": self.service.run(self.path[3:], args)})
+            else:
+                self._reply(404, {"error": f"No route {self.path}"})
+        except QueryError as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception("❌ %s failed", self.path)
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def address_string(self) -> str:
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args: Any):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: QueryService) -> socketserver.BaseServer:
+    """An HTTP server for ``service`` on its policy's Unix socket, else on host:port."""
+    policy = service.policy
+    if policy.socket:
+        if os.path.exists(policy.socket):
+            os.remove(policy.socket)  # left over from a previous run
+        server = _UnixServer(policy.socket, _Handler)
+    else:
+        server = ThreadingHTTPServer((policy.host, policy.port), _Handler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class QueryClient:
+    """One keep-alive connection to the service: ``unix:/path.sock`` or ``http://host:port``.
+
+    Not thread-safe; use one client per thread.
+    """
+
+    def __init__(self, address: str, timeout: float = 30.0):
+        self.address = address
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            if self.address.startswith("unix:"):
+                self._conn = _UnixHTTPConnection(self.address[5:], self.timeout)
+            else:
+                host, _, port = self.address.split("://", 1)[-1].rstrip("/").partition(":")
+                self._conn = http.client.HTTPConnection(host, int(port or 80), timeout=self.timeout)
+        return self._conn
+
+    def _request(self, method: str, path: str, payload: Any = None) -> Any:
+        body = None if payload is None else json.dumps(payload).encode("utf-8")
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body, {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                data = json.loads(response.read())
+                break
+            except (ConnectionError, http.client.HTTPException):
+                self.close()  # the server closed an idle keep-alive connection: reconnect once
+                if attempt == 2:
+                    raise
+        if response.status != 200:
+            raise QueryError(data.get("error", f"HTTP {response.status}"))
+        return data
+
+    def call(self, op: str, **args: Any) -> Any:
+        return self._request("POST", f"/q/{op}", args)["result"]
+
+    def batch(self, requests: Sequence[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Many queries in one round trip; ``[{"result": ..} or {"error": ..}, ..]`` in order."""
+        return self._request("POST", "/batch", [{"op": op, "args": args} for op, args in requests])["results"]
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request("GET", "/stats")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "QueryClient":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def wait_ready(address: str, timeout: float = 10.0) -> bool:
+    """True once the service at ``address`` answers (for scripts that start it)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with QueryClient(address, timeout=1.0) as client:
+                client.stats()
+            return True
+        except (OSError, QueryError, ValueError):
+            time.sleep(0.05)
+    return False
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt  # stop serve_forever and clean up as on Ctrl-C
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve or query the local knowledge/library query service")
+    sub = ap.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the service until interrupted")
+    call = sub.add_parser("call", help="Send one query and print the JSON result")
+    call.add_argument("op")
+    call.add_argument("args", nargs="?", default="{}", help="JSON arguments")
+    for p in (serve, call):
+        p.add_argument("--socket", help="Unix socket path (instead of host:port)")
+        p.add_argument("--host")
+        p.add_argument("--port", type=int)
+    serve.add_argument("--knowledge", help="knowledge.db path")
+    serve.add_argument("--agentic", help="agentic.db path")
+    serve.add_argument("--pool-size", type=int)
+    args = ap.parse_args()
+
+    from .config import get_config, setup_logging
+
+    config = get_config()
+    policy = ServicePolicy.from_config(config)
+    for field, value in (("socket", args.socket), ("host", args.host), ("port", args.port),
+                         ("knowledge_db", getattr(args, "knowledge", None)),
+                         ("agentic_db", getattr(args, "agentic", None)),
+                         ("pool_size", getattr(args, "pool_size", None))):
+        if value is not None:
+            setattr(policy, field, value)
+
+    if args.command == "call":
+        address = f"unix:{policy.socket}" if policy.socket else f"http://{policy.host}:{policy.port}"
+        with QueryClient(address) as client:
+            print(json.dumps(client.call(args.op, **json.loads(args.args)), indent=2, ensure_ascii=False))
+        return
+
+    setup_logging(config)
+    service = QueryService(policy, SnapshotPolicy.from_config(config))
+    server = make_server(service)
+    signal.signal(signal.SIGTERM, _interrupt)
+    where = policy.socket or f"http://{policy.host}:{policy.port}"
+    logger.info("🛰️ Query service on %s (knowledge=%s, agentic=%s, pool=%s)",
+                where, policy.knowledge_db, policy.agentic_db, policy.pool_size)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if policy.socket and os.path.exists(policy.socket):
+            os.remove(policy.socket)
+        logger.info("🛑 Query service stopped after %s requests", service.requests)
+
+
+if __name__ == "__main__":
+    main()
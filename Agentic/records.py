@@ -0,0 +1,143 @@
+"""
+Compact record types for library and instance rows.
+
+Every record is a ``NamedTuple``: immutable, no per-instance ``__dict__``, and
+the same object is a plain tuple, so a list of records goes straight into
+``executemany`` without a conversion pass. Field names are the column names,
+in column order. That lets ``row_factory(cls)`` build records directly from the
+tuples sqlite3 hands back, and ``insert_sql(table, cls)`` spell the matching
+INSERT.
+
+Library definitions (the literals in ``Agentic.templates``) leave out the
+generated id and the owning foreign key. The ``*Row`` types are full rows as
+``SELECT *`` returns them on the current schema.
+"""
+
+import sqlite3
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Sequence, Type, TypeVar
+
+R = TypeVar("R", bound=tuple)
+
+
+# ─── Library definitions ───────────────────────────────────────────────
+
+
+class FunctionTemplate(NamedTuple):
+    FunctionName: str
+    StrategyType: str
+    FunctionDescription: str
+
+
+class OutputDef(NamedTuple):
+    OutputName: str
+    OutputValue: str
+    Type: str
+
+
+class ParameterDef(NamedTuple):
+    ParameterName: str
+    ParameterValue: str
+    Type: str
+
+
+class StrategyDef(NamedTuple):
+    StrategyName: str
+    StrategyTarget: str
+    StrategyDescription: str
+
+
+class GoalDef(NamedTuple):
+    GoalName: str
+    GoalTarget: str
+    GoalDescription: str
+    GoalValidation: str
+
+
+# ─── Instance rows ─────────────────────────────────────────────────────
+
+
+class GoalInstanceRow(NamedTuple):
+    GoalID: int
+    SessionID: Optional[int]
+    GoalName: Optional[str]
+    GoalTarget: Optional[str]
+    GoalValidation: Optional[str]
+    GoalDescription: Optional[str]
+    GoalSuccess: Optional[bool]
+    CompletedAt: Optional[str]
+
+
+class StrategyInstanceRow(NamedTuple):
+    StrategyID: int
+    GoalID: Optional[int]
+    StrategyName: Optional[str]
+    StrategyTarget: Optional[str]
+    StrategyDescription: Optional[str]
+    StrategySuccess: Optional[bool]
+    StrategyValidation: Optional[str]
+
+
+class FunctionInstanceRow(NamedTuple):
+    FunctionID: int
+    StrategyID: Optional[int]
+    FunctionName: Optional[str]
+    FunctionSuccess: Optional[bool]
+    failedtext: Optional[str]
+    NodeID: Optional[str]
+    Seconds: Optional[float]
+
+
+class FunctionOutputRow(NamedTuple):
+    FunctionOutputID: int
+    FunctionID: Optional[int]
+    OutputName: Optional[str]
+    OutputValue: Optional[str]
+    Type: Optional[str]
+
+
+class FunctionParameterRow(NamedTuple):
+    FunctionParameterID: int
+    FunctionID: Optional[int]
+    ParameterName: Optional[str]
+    ParameterValue: Optional[str]
+    Type: Optional[str]
+
+
+# ─── Adapters ──────────────────────────────────────────────────────────
+
+
+def row_factory(cls: Type[R]) -> Callable[[sqlite3.Cursor, tuple], R]:
+    """A ``row_factory`` that builds ``cls`` from each row without intermediate objects."""
+    new = tuple.__new__
+
+    def factory(_cursor: sqlite3.Cursor, row: tuple) -> R:
+        return new(cls, row)
+
+    return factory
+
+
+def check_columns(cursor: sqlite3.Cursor, cls: Type[tuple]):
+    """Raise if the query's result columns are not ``cls``'s fields, in order."""
+    names = tuple(d[0] for d in cursor.description or ())
+    if tuple(n.lower() for n in names) != tuple(f.lower() for f in cls._fields):
+        raise ValueError(f"{cls.__name__} expects columns {cls._fields}, query returns {names}")
+
+
+def iter_records(conn: sqlite3.Connection, cls: Type[R], sql: str, params: Sequence[Any] = ()) -> Iterator[R]:
+    """Rows of ``sql`` as ``cls`` records; the column list is checked once per query."""
+    cur = conn.cursor()
+    cur.row_factory = row_factory(cls)
+    cur.execute(sql, params)
+    check_columns(cur, cls)
+    return iter(cur)
+
+
+def fetch_records(conn: sqlite3.Connection, cls: Type[R], sql: str, params: Sequence[Any] = ()) -> List[R]:
+    return list(iter_records(conn, cls, sql, params))
+
+
+def insert_sql(table: str, cls: Type[tuple], prefix: Sequence[str] = (), suffix: Sequence[str] = ()) -> str:
+    """INSERT for ``cls``'s fields between extra ``prefix``/``suffix`` columns;
+    bind ``(*prefix_values, *record, *suffix_values)``."""
+    cols = [*prefix, *cls._fields, *suffix]
+    return f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
@@ -0,0 +1,243 @@
+"""
+Memoized results for the read-only core actions (SEARCH, ANALYZE).
+
+A result is keyed on the action, its canonicalized inputs (JSON with sorted
+keys) and a stamp of the knowledge database. The stamp is the file identity and
+modification time, so a hot-swapped or rewritten knowledge.db never serves old
+results. It also includes a version counter per table the action reads, which
+``invalidate(table)`` bumps; the executor calls it whenever POPULATE writes to a
+table.
+
+Two tiers:
+- memory: an LRU bounded by the encoded size of the results (``max_bytes``).
+- disk (optional, ``path``): a SQLite file shared by every process pointing at
+  it, bounded by ``disk_max_bytes``. Worker processes get a copy of the cache
+  without the memory tier and share hits through this file.
+
+Cached values are shared, not copied: callers must treat them as read-only.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from . import telemetry
+
+logger = logging.getLogger("RESULT_CACHE")
+
+DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries(
+    key       TEXT PRIMARY KEY,
+    action    TEXT NOT NULL,
+    value     BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_used ON cache_entries(last_used);
+CREATE TABLE IF NOT EXISTS table_versions(
+    name    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+def canonical(value: Any) -> str:
+    """Order-independent JSON for dict keys; stable across processes and runs."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def db_stamp(db_path: str) -> str:
+    """Changes whenever the file is replaced or written (missing file -> "absent")."""
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return "absent"
+    return f"{st.st_dev}:{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+
+
+class ResultCache:
+    """Two-tier result cache; see the module docstring."""
+
+    def __init__(self, max_bytes: int = 64 << 20, path: Optional[str] = None,
+                 disk_max_bytes: int = 512 << 20):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.disk_max_bytes = disk_max_bytes
+        self._init_local()
+
+    def _init_local(self):
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._versions: Dict[str, int] = {}
+        self._disk_local = threading.local()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0,
+                      "invalidations": 0, "stores": 0}
+
+    # Pickled into worker processes: configuration only, memory tier starts empty
+    def __getstate__(self):
+        return {"max_bytes": self.max_bytes, "path": self.path, "disk_max_bytes": self.disk_max_bytes}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_local()
+
+    # ── disk tier ─────────────────────────────────────────────────────
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        conn = getattr(self._disk_local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(DISK_SCHEMA)
+            self._disk_local.conn = conn
+        return conn
+
+    def _bump(self, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+        telemetry.count(f"result_cache.{name}", n)
+
+    # ── keys and invalidation ─────────────────────────────────────────
+
+    def table_version(self, table: str) -> int:
+        disk = self._disk()
+        if disk is not None:
+            row = disk.execute("SELECT version FROM table_versions WHERE name = ?", (table,)).fetchone()
+            return row[0] if row else 0
+        with self._lock:
+            return self._versions.get(table, 0)
+
+    def key(self, action: str, inputs: Dict[str, Any], db_path: Optional[str] = None,
+            tables: Iterable[str] = ()) -> str:
+        """``db_path``/``tables``: what the result was read from (None for pure functions of the inputs)."""
+        versions = {t: self.table_version(t) for t in sorted(set(tables))}
+        raw = canonical([action, inputs, db_stamp(db_path) if db_path else None, versions])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def invalidate(self, table: str):
+        """New version for ``table``: every cached result that read it becomes unreachable."""
+        disk = self._disk()
+        if disk is not None:
+            disk.execute("""INSERT INTO table_versions(name, version) VALUES (?, 1)
+                            ON CONFLICT(name) DO UPDATE SET version = version + 1""", (table,))
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+        self._bump("invalidations")
+        logger.debug("Invalidated cached results for %s", table)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+        disk = self._disk()
+        if disk is not None:
+            disk.execute("DELETE FROM cache_entries")
+
+    # ── lookup and store ──────────────────────────────────────────────
+
+    _MISSING = object()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is not None:
+            self._bump("hits")
+            return entry[0]
+        disk = self._disk()
+        if disk is not None:
+            row = disk.execute("SELECT value FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                disk.execute("UPDATE cache_entries SET last_used = ? WHERE key = ?", (time.time(), key))
+                value = json.loads(row[0])
+                self._remember(key, value, len(row[0]))
+                self._bump("disk_hits")
+                return value
+        self._bump("misses")
+        return self._MISSING
+
+    def put(self, key: str, action: str, value: Any):
+        encoded = canonical(value).encode("utf-8")
+        self._remember(key, value, len(encoded))
+        disk = self._disk()
+        if disk is not None and len(encoded) <= self.disk_max_bytes:
+            disk.execute("INSERT OR REPLACE INTO cache_entries(key, action, value, size, last_used) "
+                         "VALUES (?, ?, ?, ?, ?)", (key, action, encoded, len(encoded), time.time()))
+            self._trim_disk(disk)
+        self._bump("stores")
+
+    def _remember(self, key: str, value: Any, size: int):
+        if size > self.max_bytes:
+            return
+        evicted = 0
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._memory[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, dropped) = self._memory.popitem(last=False)
+                self._bytes -= dropped
+                evicted += 1
+        if evicted:
+            self._bump("evictions", evicted)
+
+    def _trim_disk(self, disk: sqlite3.Connection):
+        total = disk.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        # Drop least recently used entries until back under the limit
+        cur = disk.execute("""
+            DELETE FROM cache_entries WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running
+                    FROM cache_entries
+                ) WHERE running > ?
+            )""", (self.disk_max_bytes,))
+        self._bump("evictions", cur.rowcount)
+
+    def memoize(self, action: str, func: Callable[[], Any], inputs: Dict[str, Any],
+                db_path: Optional[str] = None, tables: Iterable[str] = ()) -> Tuple[Any, bool]:
+        """``(result, hit)``: the cached result for these inputs, or ``func()`` stored for next time."""
+        key = self.key(action, inputs, db_path, tables)
+        value = self.get(key)
+        if value is not self._MISSING:
+            return value, True
+        value = func()
+        self.put(key, action, value)
+        return value, False
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, entries=len(self._memory), bytes=self._bytes)
+
+    def close(self):
+        conn = getattr(self._disk_local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._disk_local.conn = None
+
+
+_shared: Optional[ResultCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> ResultCache:
+    """The process-wide memory-only cache used when no cache is passed in."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ResultCache()
+        return _shared
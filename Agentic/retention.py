@@ -0,0 +1,323 @@
+"""
+Session retention for the agentic runtime tables.
+
+Completed sessions (every ``GoalInstance`` row of the ``SessionID`` has a
+``CompletedAt``) are copied into monthly archive databases
+(``<archive_dir>/agentic-archive-YYYY-MM.db``) through ``ATTACH`` and then
+deleted from the hot database, children first, in bounded batches so each write
+transaction stays short. Freed pages are returned with ``incremental_vacuum``.
+Template goals (``SessionID IS NULL``) are never touched.
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .migrations import migrate
+from .schema import MIGRATIONS
+
+logger = logging.getLogger("RETENTION")
+
+# Parent-to-child order: copy in this order, delete in reverse
+INSTANCE_TABLES = [
+    "GoalInstance",
+    "StrategyInstance",
+    "FunctionInstance",
+    "FunctionOutputInstance",
+    "FunctionParametersInstance",
+]
+
+_SELECTORS = {
+    "GoalInstance": "GoalID IN (SELECT id FROM temp.retention_goals)",
+    "StrategyInstance": "StrategyID IN (SELECT id FROM temp.retention_strategies)",
+    "FunctionInstance": "FunctionID IN (SELECT id FROM temp.retention_functions)",
+    "FunctionOutputInstance": "FunctionID IN (SELECT id FROM temp.retention_functions)",
+    "FunctionParametersInstance": "FunctionID IN (SELECT id FROM temp.retention_functions)",
+}
+
+
+@dataclass
+class RetentionPolicy:
+    """When to archive completed sessions. ``None`` disables a limit."""
+
+    max_age_days: Optional[float] = 30
+    max_size_mb: Optional[float] = None
+    batch_sessions: int = 50
+    pause_seconds: float = 0.05
+    vacuum_pages: int = 1000
+    archive_dir: str = "archive"
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RetentionPolicy":
+        section = (config or {}).get("retention") or {}
+        known = {k: v for k, v in section.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+@dataclass
+class RetentionReport:
+    dry_run: bool
+    sessions: List[Dict[str, Any]] = field(default_factory=list)
+    rows: Dict[str, int] = field(default_factory=dict)
+    partitions: Dict[str, int] = field(default_factory=dict)
+    size_before: int = 0
+    size_after: int = 0
+    pages_vacuumed: int = 0
+
+
+# ─── Selection ─────────────────────────────────────────────────────────
+
+
+def live_size(conn: sqlite3.Connection) -> int:
+    """Bytes in use (excluding free pages)."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (page_count - freelist) * page_size
+
+
+def completed_sessions(conn: sqlite3.Connection) -> List[tuple]:
+    """``(SessionID, completed_at)`` of fully completed sessions, oldest first."""
+    return conn.execute(
+        """SELECT SessionID, MAX(CompletedAt) AS completed_at
+           FROM GoalInstance
+           WHERE SessionID IS NOT NULL
+           GROUP BY SessionID
+           HAVING COUNT(*) = COUNT(CompletedAt)
+           ORDER BY completed_at, SessionID"""
+    ).fetchall()
+
+
+def _stage(conn: sqlite3.Connection, session_ids: Sequence[int]):
+    """Fill the temp id tables with the rows owned by ``session_ids``."""
+    for name in ("goals", "strategies", "functions"):
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS retention_{name}(id INTEGER PRIMARY KEY)")
+        conn.execute(f"DELETE FROM temp.retention_{name}")
+    marks = ",".join("?" * len(session_ids))
+    conn.execute(
+        f"INSERT INTO temp.retention_goals SELECT GoalID FROM main.GoalInstance WHERE SessionID IN ({marks})",
+        list(session_ids),
+    )
+    conn.execute(
+        "INSERT INTO temp.retention_strategies SELECT StrategyID FROM main.StrategyInstance "
+        "WHERE GoalID IN (SELECT id FROM temp.retention_goals)"
+    )
+    conn.execute(
+        "INSERT INTO temp.retention_functions SELECT FunctionID FROM main.FunctionInstance "
+        "WHERE StrategyID IN (SELECT id FROM temp.retention_strategies)"
+    )
+
+
+def _staged_counts(conn: sqlite3.Connection) -> Dict[str, int]:
+    return {
+        t: conn.execute(f"SELECT COUNT(*) FROM main.{t} WHERE {_SELECTORS[t]}").fetchone()[0]
+        for t in INSTANCE_TABLES
+    }
+
+
+def plan(conn: sqlite3.Connection, policy: RetentionPolicy, now: Optional[datetime] = None) -> List[tuple]:
+    """Sessions to archive, oldest first: everything past ``max_age_days`` plus, while
+    the estimated size is over ``max_size_mb``, the next oldest completed sessions."""
+    now = now or datetime.now(timezone.utc)
+    candidates = completed_sessions(conn)
+    chosen: List[tuple] = []
+    if policy.max_age_days is not None:
+        cutoff = (now - timedelta(days=policy.max_age_days)).strftime("%Y-%m-%d %H:%M:%S")
+        chosen = [c for c in candidates if c[1] < cutoff]
+    if policy.max_size_mb is not None:
+        excess = live_size(conn) - int(policy.max_size_mb * 1024 * 1024)
+        if excess > 0:
+            # Estimate a session's footprint from its share of the instance rows
+            total_rows = sum(
+                conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in INSTANCE_TABLES
+            ) or 1
+            bytes_per_row = live_size(conn) / total_rows
+            freed = 0.0
+            for c in chosen:
+                _stage(conn, [c[0]])
+                freed += sum(_staged_counts(conn).values()) * bytes_per_row
+            for c in candidates[len(chosen):]:
+                if freed >= excess:
+                    break
+                _stage(conn, [c[0]])
+                freed += sum(_staged_counts(conn).values()) * bytes_per_row
+                chosen.append(c)
+    return chosen
+
+
+# ─── Archiving ─────────────────────────────────────────────────────────
+
+
+def _partition(completed_at: str) -> str:
+    return (completed_at or "unknown")[:7]
+
+
+def archive_path(policy: RetentionPolicy, partition: str) -> Path:
+    return Path(policy.archive_dir) / f"agentic-archive-{partition}.db"
+
+
+def _prepare_archive(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    archive = sqlite3.connect(path)
+    try:
+        migrate(archive, MIGRATIONS)
+    finally:
+        archive.close()
+
+
+def _copy_to_archive(conn: sqlite3.Connection, table: str, where: str, args: Sequence[Any] = ()):
+    # Plain INSERT: archived history is never overwritten, and the archive's
+    # row-count triggers see every row
+    try:
+        conn.execute(f"INSERT INTO archive.{table} SELECT * FROM main.{table} WHERE {where}", list(args))
+    except sqlite3.IntegrityError as e:
+        raise sqlite3.IntegrityError(f"archive.{table} already holds rows with these IDs ({e}); "
+                                     f"refusing to overwrite archived history") from e
+
+
+def _move_batch(conn: sqlite3.Connection, session_ids: Sequence[int]) -> Dict[str, int]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _stage(conn, session_ids)
+        counts = _staged_counts(conn)
+        for t in INSTANCE_TABLES:
+            _copy_to_archive(conn, t, _SELECTORS[t])
+        for t in reversed(INSTANCE_TABLES):
+            conn.execute(f"DELETE FROM main.{t} WHERE {_SELECTORS[t]}")
+        # Saved agent state (Agentic.sessions) goes with its session
+        marks = ",".join("?" * len(session_ids))
+        _copy_to_archive(conn, "SessionState", f"SessionID IN ({marks})", session_ids)
+        conn.execute(f"DELETE FROM main.SessionState WHERE SessionID IN ({marks})", list(session_ids))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return counts
+
+
+def incremental_vacuum(conn: sqlite3.Connection, pages: int) -> int:
+    """Release up to ``pages`` free pages; returns how many were released."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        logger.debug("auto_vacuum is not INCREMENTAL; run enable_incremental_vacuum() once to reclaim space")
+        return 0
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def enable_incremental_vacuum(db_path: str):
+    """One-off conversion of an existing database to incremental auto-vacuum (full VACUUM)."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def run_retention(
+    db_path: str = "agentic.db",
+    policy: Optional[RetentionPolicy] = None,
+    dry_run: bool = False,
+    now: Optional[datetime] = None,
+) -> RetentionReport:
+    """Archive and delete completed sessions according to ``policy``."""
+    policy = policy or RetentionPolicy()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    report = RetentionReport(dry_run=dry_run)
+    try:
+        report.size_before = live_size(conn)
+        selected = plan(conn, policy, now=now)
+
+        if dry_run:
+            for session_id, completed_at in selected:
+                _stage(conn, [session_id])
+                counts = _staged_counts(conn)
+                part = _partition(completed_at)
+                report.sessions.append(
+                    dict(session_id=session_id, completed_at=completed_at,
+                         archive=str(archive_path(policy, part)), rows=counts)
+                )
+                report.partitions[part] = report.partitions.get(part, 0) + 1
+                for t, n in counts.items():
+                    report.rows[t] = report.rows.get(t, 0) + n
+            report.size_after = report.size_before
+            return report
+
+        by_partition: Dict[str, List[tuple]] = {}
+        for session_id, completed_at in selected:
+            by_partition.setdefault(_partition(completed_at), []).append((session_id, completed_at))
+
+        for part, sessions in by_partition.items():
+            path = archive_path(policy, part)
+            _prepare_archive(path)
+            conn.execute("ATTACH DATABASE ? AS archive", (str(path),))
+            try:
+                for i in range(0, len(sessions), policy.batch_sessions):
+                    batch = sessions[i:i + policy.batch_sessions]
+                    counts = _move_batch(conn, [s for s, _ in batch])
+                    for t, n in counts.items():
+                        report.rows[t] = report.rows.get(t, 0) + n
+                    report.sessions.extend(
+                        dict(session_id=s, completed_at=c, archive=str(path)) for s, c in batch
+                    )
+                    report.partitions[part] = report.partitions.get(part, 0) + len(batch)
+                    report.pages_vacuumed += incremental_vacuum(conn, policy.vacuum_pages)
+                    if policy.pause_seconds:
+                        time.sleep(policy.pause_seconds)  # let the agent's writer in
+            finally:
+                conn.execute("DETACH DATABASE archive")
+
+        report.size_after = live_size(conn)
+        logger.info(
+            "Archived %d sessions into %d partitions (%s); %d -> %d bytes live",
+            len(report.sessions), len(report.partitions), report.rows,
+            report.size_before, report.size_after,
+        )
+        return report
+    finally:
+        conn.close()
+
+
+def mark_session_completed(conn: sqlite3.Connection, session_id: int):
+    """Stamp every goal of ``session_id`` as completed now, making it eligible for retention."""
+    conn.execute(
+        "UPDATE GoalInstance SET CompletedAt = datetime('now') "
+        "WHERE SessionID = ? AND CompletedAt IS NULL",
+        (session_id,),
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Archive completed agent sessions out of agentic.db")
+    ap.add_argument("--db", default="agentic.db")
+    ap.add_argument("--max-age-days", type=float)
+    ap.add_argument("--max-size-mb", type=float)
+    ap.add_argument("--batch-sessions", type=int)
+    ap.add_argument("--archive-dir")
+    ap.add_argument("--dry-run", action="store_true", help="Report what would be moved")
+    args = ap.parse_args()
+
+    from .config import get_config, setup_logging
+
+    config = get_config()
+    setup_logging(config)
+    policy = RetentionPolicy.from_config(config)
+    for name in ("max_age_days", "max_size_mb", "batch_sessions", "archive_dir"):
+        if getattr(args, name) is not None:
+            setattr(policy, name, getattr(args, name))
+    report = run_retention(args.db, policy, dry_run=args.dry_run)
+    verb = "Would archive" if args.dry_run else "Archived"
+    logger.info("%s %s sessions: %s", verb, len(report.sessions), report.rows)
+    for part, n in sorted(report.partitions.items()):
+        logger.info("   📦 %s: %s sessions", archive_path(policy, part), n)
+
+
+if __name__ == "__main__":
+    main()
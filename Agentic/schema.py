@@ -1,115 +1,173 @@
+import argparse
 import logging
-import sqlite3
 
-from .connection import get_agentic_connection
+from .migrations import Migration, migrate, reset
+from .stats import STATS_TABLE, stats_migration_sql
 
 logger = logging.getLogger("SCHEMA")
 
+# Drop order (children first) for an explicit reset
+TABLES = [
+    "FunctionParametersInstance",
+    "FunctionOutputInstance",
+    "FunctionInstance",
+    "StrategyInstance",
+    "StrategyLibrary",
+    "FunctionParametersLibrary",
+    "FunctionOutputLibrary",
+    "FunctionTemplateLibrary",
+    "GoalInstance",
+]
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS GoalInstance(
+    GoalID          INTEGER PRIMARY KEY AUTOINCREMENT,
+    SessionID       INTEGER,
+    GoalName        TEXT,
+    GoalTarget      TEXT,
+    GoalValidation  TEXT,
+    GoalDescription TEXT,
+    GoalSuccess     BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS FunctionTemplateLibrary(
+    FunctionTemplateID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FunctionName        TEXT,
+    StrategyType        TEXT,
+    FunctionDescription TEXT
+);
+
+CREATE TABLE IF NOT EXISTS FunctionOutputLibrary(
+    FunctionOutputID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FunctionTemplateID INTEGER,
+    OutputName TEXT, OutputValue TEXT, Type TEXT,
+    FOREIGN KEY(FunctionTemplateID) REFERENCES FunctionTemplateLibrary(FunctionTemplateID)
+);
+
+CREATE TABLE IF NOT EXISTS FunctionParametersLibrary(
+    FunctionParameterID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FunctionTemplateID INTEGER,
+    ParameterName TEXT, ParameterValue TEXT, Type TEXT,
+    FOREIGN KEY(FunctionTemplateID) REFERENCES FunctionTemplateLibrary(FunctionTemplateID)
+);
+
+
+CREATE TABLE IF NOT EXISTS StrategyInstance(
+    StrategyID          INTEGER PRIMARY KEY AUTOINCREMENT,
+    GoalID              INTEGER,
+    StrategyName        TEXT,
+    StrategyTarget      TEXT,
+    StrategyDescription TEXT,
+    StrategySuccess     BOOLEAN,
+    StrategyValidation  TEXT,
+    FOREIGN KEY(GoalID) REFERENCES GoalInstance(GoalID)
+);
+
+CREATE TABLE IF NOT EXISTS StrategyLibrary(
+    StrategyID          INTEGER PRIMARY KEY AUTOINCREMENT,
+    StrategyName        TEXT,
+    StrategyTarget      TEXT,
+    StrategyDescription TEXT,
+    PlanSteps TEXT
+);
+
+
+CREATE TABLE IF NOT EXISTS FunctionInstance(
+    FunctionID      INTEGER PRIMARY KEY AUTOINCREMENT,
+    StrategyID      INTEGER,
+    FunctionName    TEXT,
+    FunctionSuccess BOOLEAN,
+    failedtext      TEXT,
+    FOREIGN KEY(StrategyID) REFERENCES StrategyInstance(StrategyID)
+);
+
+CREATE TABLE IF NOT EXISTS FunctionOutputInstance(
+    FunctionOutputID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FunctionID INTEGER,
+    OutputName TEXT, OutputValue TEXT, Type TEXT,
+    FOREIGN KEY(FunctionID) REFERENCES FunctionInstance(FunctionID)
+);
+
+CREATE TABLE IF NOT EXISTS FunctionParametersInstance(
+    FunctionParameterID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FunctionID INTEGER,
+    ParameterName TEXT, ParameterValue TEXT, Type TEXT,
+    FOREIGN KEY(FunctionID) REFERENCES FunctionInstance(FunctionID)
+);
+"""
+
+# Indexes on the foreign-key columns used by joins and cascading deletes
+INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_goalinstance_session ON GoalInstance(SessionID);
+CREATE INDEX IF NOT EXISTS idx_outputlib_template ON FunctionOutputLibrary(FunctionTemplateID);
+CREATE INDEX IF NOT EXISTS idx_paramlib_template ON FunctionParametersLibrary(FunctionTemplateID);
+CREATE INDEX IF NOT EXISTS idx_strategyinstance_goal ON StrategyInstance(GoalID);
+CREATE INDEX IF NOT EXISTS idx_functioninstance_strategy ON FunctionInstance(StrategyID);
+CREATE INDEX IF NOT EXISTS idx_outputinstance_function ON FunctionOutputInstance(FunctionID);
+CREATE INDEX IF NOT EXISTS idx_paraminstance_function ON FunctionParametersInstance(FunctionID);
+"""
+
+# Completion time drives session retention (see Agentic.retention)
+COMPLETION_SQL = """
+ALTER TABLE GoalInstance ADD COLUMN CompletedAt TEXT;
+CREATE INDEX IF NOT EXISTS idx_goalinstance_completed ON GoalInstance(SessionID, CompletedAt);
+"""
+
+# Which plan step a function instance ran for, and how long it took (see Agentic.executor)
+PLAN_NODE_SQL = """
+ALTER TABLE FunctionInstance ADD COLUMN NodeID TEXT;
+ALTER TABLE FunctionInstance ADD COLUMN Seconds REAL;
+"""
+
+# Latest agent state per session, written behind by Agentic.sessions
+SESSION_STATE_SQL = """
+CREATE TABLE IF NOT EXISTS SessionState(
+    SessionID         INTEGER PRIMARY KEY,
+    Query             TEXT,
+    GoalID            INTEGER,
+    StrategyID        INTEGER,
+    FunctionID        INTEGER,
+    StrategySatisfied BOOLEAN,
+    GoalSatisfied     BOOLEAN,
+    JudgeStatus       TEXT,
+    FinalAnswer       TEXT,
+    UpdatedAt         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessionstate_active ON SessionState(FinalAnswer, UpdatedAt);
+"""
+
+# Ordered, append-only. Never edit an applied step: add a new one instead.
+MIGRATIONS = [
+    Migration(1, "initial_schema", SCHEMA_SQL),
+    Migration(2, "foreign_key_indexes", INDEX_SQL, online=True),
+    Migration(3, "row_count_triggers", stats_migration_sql(TABLES)),
+    Migration(4, "goal_completion_time", COMPLETION_SQL),
+    Migration(5, "plan_node_columns", PLAN_NODE_SQL),
+    Migration(6, "session_state", SESSION_STATE_SQL),
+]
+
+
+def init_db(drop_and_recreate: bool = False, dry_run: bool = False):
+    """Migrate agentic.db to the latest schema, keeping existing data."""
+    from .connection import get_agentic_connection
 
-def init_db(drop_and_recreate: bool = True):
     with get_agentic_connection() as conn:
-        cur = conn.cursor()
-
-        tables = [
-            "FunctionParametersInstance",
-            "FunctionOutputInstance",
-            "FunctionInstance",
-            "StrategyInstance",
-            "StrategyLibrary",
-            "FunctionParametersLibrary",
-            "FunctionOutputLibrary",
-            "FunctionTemplateLibrary",
-            "GoalInstance",
-        ]
-
-        if drop_and_recreate:
-            cur.execute("PRAGMA foreign_keys = OFF")
-            for t in tables:
-                cur.execute(f"DROP TABLE IF EXISTS {t}")
-            cur.execute("PRAGMA foreign_keys = ON")
-
-        cur.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS GoalInstance(
-                GoalID          INTEGER PRIMARY KEY AUTOINCREMENT,
-                SessionID       INTEGER,
-                GoalName        TEXT,
-                GoalTarget      TEXT,
-                GoalValidation  TEXT,
-                GoalDescription TEXT,
-                GoalSuccess     BOOLEAN
-            );
-
-            CREATE TABLE IF NOT EXISTS FunctionTemplateLibrary(
-                FunctionTemplateID INTEGER PRIMARY KEY AUTOINCREMENT,
-                FunctionName        TEXT,
-                StrategyType        TEXT,
-                FunctionDescription TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS FunctionOutputLibrary(
-                FunctionOutputID INTEGER PRIMARY KEY AUTOINCREMENT,
-                FunctionTemplateID INTEGER,
-                OutputName TEXT, OutputValue TEXT, Type TEXT,
-                FOREIGN KEY(FunctionTemplateID) REFERENCES FunctionTemplateLibrary(FunctionTemplateID)
-            );
-
-            CREATE TABLE IF NOT EXISTS FunctionParametersLibrary(
-                FunctionParameterID INTEGER PRIMARY KEY AUTOINCREMENT,
-                FunctionTemplateID INTEGER,
-                ParameterName TEXT, ParameterValue TEXT, Type TEXT,
-                FOREIGN KEY(FunctionTemplateID) REFERENCES FunctionTemplateLibrary(FunctionTemplateID)
-            );
-
-
-            CREATE TABLE IF NOT EXISTS StrategyInstance(
-                StrategyID          INTEGER PRIMARY KEY AUTOINCREMENT,
-                GoalID              INTEGER,
-                StrategyName        TEXT,
-                StrategyTarget      TEXT,
-                StrategyDescription TEXT,
-                StrategySuccess     BOOLEAN,
-                StrategyValidation  TEXT,
-                FOREIGN KEY(GoalID) REFERENCES GoalInstance(GoalID)
-            );
-
-            CREATE TABLE IF NOT EXISTS StrategyLibrary(
-                StrategyID          INTEGER PRIMARY KEY AUTOINCREMENT,
-                StrategyName        TEXT,
-                StrategyTarget      TEXT,
-                StrategyDescription TEXT,
-                PlanSteps TEXT
-            );
-
-
-            CREATE TABLE IF NOT EXISTS FunctionInstance(
-                FunctionID      INTEGER PRIMARY KEY AUTOINCREMENT,
-                StrategyID      INTEGER,
-                FunctionName    TEXT,
-                FunctionSuccess BOOLEAN,
-                failedtext      TEXT,
-                FOREIGN KEY(StrategyID) REFERENCES StrategyInstance(StrategyID)
-            );
-
-            CREATE TABLE IF NOT EXISTS FunctionOutputInstance(
-                FunctionOutputID INTEGER PRIMARY KEY AUTOINCREMENT,
-                FunctionID INTEGER,
-                OutputName TEXT, OutputValue TEXT, Type TEXT,
-                FOREIGN KEY(FunctionID) REFERENCES FunctionInstance(FunctionID)
-            );
-
-            CREATE TABLE IF NOT EXISTS FunctionParametersInstance(
-                FunctionParameterID INTEGER PRIMARY KEY AUTOINCREMENT,
-                FunctionID INTEGER,
-                ParameterName TEXT, ParameterValue TEXT, Type TEXT,
-                FOREIGN KEY(FunctionID) REFERENCES FunctionInstance(FunctionID)
-            );
-            """
-        )
-        conn.commit()
-        # logger.info(f"✅ agentic.db initialized with tables: len{tables}")
-        logger.info(f"✅ agentic.db initialized with {len(tables)} tables.")
+        if drop_and_recreate and not dry_run:
+            reset(conn, ["SessionState"] + TABLES + [STATS_TABLE])
+        # Only takes effect on a new file; lets retention reclaim pages incrementally
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        applied = migrate(conn, MIGRATIONS, dry_run=dry_run)
+        verb = "would apply" if dry_run else "applied"
+        logger.info("✅ agentic.db at schema v%s (%s %s migrations).", MIGRATIONS[-1].version, verb, len(applied))
+        return applied
 
 
 if __name__ == "__main__":
-    init_db(drop_and_recreate=True)
+    ap = argparse.ArgumentParser(description="Migrate agentic.db to the latest schema")
+    ap.add_argument("--dry-run", action="store_true", help="List pending migrations only")
+    ap.add_argument("--drop-and-recreate", action="store_true", help="Discard all data first")
+    args = ap.parse_args()
+    from .config import setup_logging
+
+    setup_logging()
+    init_db(drop_and_recreate=args.drop_and_recreate, dry_run=args.dry_run)
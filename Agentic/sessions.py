@@ -0,0 +1,393 @@
+"""
+In-memory agent session state with write-behind to agentic.db.
+
+Each active session is one ``SessionState`` record whose slots are the
+``constants.ANSWER_FIELDS`` keys, so reading or changing state on an agent turn
+is an attribute access under one lock, with no SQL. Changes are written to the
+``SessionState`` table by a background thread:
+- every ``flush_interval`` seconds for ordinary changes (query, current function);
+- immediately for state transitions (goal/strategy change, strategy or goal
+  satisfied, judge verdict, final answer).
+
+A flush also carries the transitions into the instance tables: ``GoalSuccess``
+and ``StrategySuccess`` of the session's current goal and strategy, and once a
+final answer exists the session is stamped completed for retention.
+
+Sessions not in memory are recovered from ``SessionState`` on first access (or
+up front with ``recover()``). Idle sessions, and the least recently used ones
+while over ``max_sessions`` or ``max_mb``, are evicted; an evicted session with
+unsaved changes, or one a flush is still writing, stays reachable until its
+flush has committed.
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import telemetry
+from .constants import ANSWER_FIELDS
+from .retention import mark_session_completed
+
+logger = logging.getLogger("SESSIONS")
+
+FIELDS = tuple(ANSWER_FIELDS)
+
+# Slot -> SessionState column
+COLUMNS = {
+    "sessionID": "SessionID",
+    "query": "Query",
+    "currentGoalID": "GoalID",
+    "currentStrategyID": "StrategyID",
+    "currentFunctionID": "FunctionID",
+    "strategySatisfied": "StrategySatisfied",
+    "goalSatisfied": "GoalSatisfied",
+    "judgeStatus": "JudgeStatus",
+    "finalAnswer": "FinalAnswer",
+}
+
+# Changes to these are flushed right away rather than on the next tick
+TRANSITIONS = frozenset({
+    "currentGoalID", "currentStrategyID", "strategySatisfied",
+    "goalSatisfied", "judgeStatus", "finalAnswer",
+})
+
+_UPDATABLE = frozenset(FIELDS) - {"sessionID"}
+_BOOLEANS = ("strategySatisfied", "goalSatisfied")
+
+_UPSERT_SQL = (
+    f"INSERT INTO SessionState({', '.join(COLUMNS[f] for f in FIELDS)}, UpdatedAt) "
+    f"VALUES ({', '.join('?' * len(FIELDS))}, datetime('now')) "
+    f"ON CONFLICT(SessionID) DO UPDATE SET "
+    + ", ".join(f"{COLUMNS[f]} = excluded.{COLUMNS[f]}" for f in FIELDS if f != "sessionID")
+    + ", UpdatedAt = excluded.UpdatedAt"
+)
+
+
+class SessionState:
+    """Per-session agent state; attributes are the ``ANSWER_FIELDS`` keys."""
+
+    __slots__ = FIELDS + ("touched", "nbytes")
+
+    def __init__(self, sessionID: Any, **fields: Any):
+        for name in FIELDS:
+            setattr(self, name, fields.get(name))
+        self.sessionID = sessionID
+        self.touched = time.monotonic()
+        self.nbytes = sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, f)) for f in FIELDS)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {f: getattr(self, f) for f in FIELDS}
+
+    def row(self) -> tuple:
+        return tuple(getattr(self, f) for f in FIELDS)
+
+    def __repr__(self) -> str:
+        return f"SessionState({self.as_dict()!r})"
+
+
+@dataclass
+class SessionPolicy:
+    """How long state may stay unsaved and how much of it to keep in memory."""
+
+    flush_interval: float = 1.0
+    idle_seconds: float = 900
+    max_sessions: int = 10000
+    max_mb: float = 64
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SessionPolicy":
+        section = (config or {}).get("sessions") or {}
+        known = {k: v for k, v in section.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+class SessionStore:
+    """Active sessions in memory, written behind to ``db_path``; see the module docstring."""
+
+    def __init__(self, db_path: str = "agentic.db", policy: Optional[SessionPolicy] = None,
+                 autostart: bool = True):
+        self.db_path = db_path
+        self.policy = policy or SessionPolicy()
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[Any, SessionState]" = OrderedDict()
+        self._dirty: Dict[Any, SessionState] = {}
+        self._evicted: Dict[Any, SessionState] = {}  # dirty or being written, but no longer cached
+        self._flushing: Dict[Any, SessionState] = {}  # taken by the flush in progress, not yet committed
+        self._bytes = 0
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"hits": 0, "loads": 0, "created": 0, "evictions": 0, "flushes": 0, "rows": 0}
+        if autostart:
+            self.start()
+
+    # ── per-turn access ───────────────────────────────────────────────
+
+    def get(self, session_id: Any, create: bool = True) -> Optional[SessionState]:
+        """The session's state, recovered from the database or created if needed."""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                self._sessions.move_to_end(session_id)
+                state.touched = time.monotonic()
+                self.stats["hits"] += 1
+                return state
+            state = self._evicted.get(session_id)
+            if state is not None:
+                self._admit(state)
+                return state
+        state = self._load(session_id)
+        if state is None:
+            if not create:
+                return None
+            state = SessionState(session_id)
+            created = True
+        else:
+            created = False
+        with self._lock:
+            # Another thread may have admitted it while we were reading
+            current = self._sessions.get(session_id)
+            if current is not None:
+                return current
+            self._admit(state)
+            self.stats["created" if created else "loads"] += 1
+            if created:
+                self._dirty[session_id] = state
+            self._enforce_budget()
+        return state
+
+    def update(self, session_id: Any, **changes: Any) -> SessionState:
+        """Apply ``changes`` (``ANSWER_FIELDS`` keys) to a session and schedule the write."""
+        unknown = changes.keys() - _UPDATABLE
+        if unknown:
+            raise ValueError(f"Not updatable session fields: {sorted(unknown)}")
+        state = self.get(session_id)
+        changed = transition = False
+        with self._lock:
+            if self._sessions.get(session_id) is not state:
+                self._admit(state)  # evicted between get() and here
+            for name, value in changes.items():
+                old = getattr(state, name)
+                if old == value:
+                    continue
+                setattr(state, name, value)
+                delta = sys.getsizeof(value) - sys.getsizeof(old)
+                state.nbytes += delta
+                self._bytes += delta
+                changed = True
+                transition = transition or name in TRANSITIONS
+            if changed:
+                self._dirty[session_id] = state
+            state.touched = time.monotonic()
+        if transition:
+            self._wake.set()
+        return state
+
+    def answer(self, session_id: Any) -> Dict[str, Any]:
+        """A copy of the session's fields, keyed like ``ANSWER_FIELDS``."""
+        state = self.get(session_id)
+        with self._lock:
+            return state.as_dict()
+
+    # ── memory budget ─────────────────────────────────────────────────
+
+    def _admit(self, state: SessionState):
+        """Cache ``state`` as most recently used (caller holds ``_lock``)."""
+        self._evicted.pop(state.sessionID, None)
+        self._sessions[state.sessionID] = state
+        self._bytes += state.nbytes
+        state.touched = time.monotonic()
+
+    def _drop(self, session_id: Any):
+        state = self._sessions.pop(session_id)
+        self._bytes -= state.nbytes
+        if session_id in self._dirty or session_id in self._flushing:
+            # The database does not have its latest state yet; get() must not reload it
+            self._evicted[session_id] = state
+        self.stats["evictions"] += 1
+
+    def _enforce_budget(self):
+        """Evict least recently used sessions while over budget (caller holds ``_lock``)."""
+        max_bytes = self.policy.max_mb * 1024 * 1024
+        while self._sessions and (len(self._sessions) > self.policy.max_sessions or self._bytes > max_bytes):
+            self._drop(next(iter(self._sessions)))
+        if self._evicted:
+            self._wake.set()
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop sessions untouched for ``idle_seconds``; returns how many."""
+        cutoff = (now or time.monotonic()) - self.policy.idle_seconds
+        evicted = 0
+        with self._lock:
+            while self._sessions:
+                state = next(iter(self._sessions.values()))
+                if state.touched > cutoff:
+                    break
+                self._drop(state.sessionID)
+                evicted += 1
+        if evicted:
+            logger.debug("Evicted %s idle sessions", evicted)
+        return evicted
+
+    # ── database ──────────────────────────────────────────────────────
+
+    def _load(self, session_id: Any) -> Optional[SessionState]:
+        columns = ", ".join(COLUMNS[f] for f in FIELDS)
+        with self._db_lock:
+            row = self._conn.execute(
+                f"SELECT {columns} FROM SessionState WHERE SessionID = ?", (session_id,)
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    @staticmethod
+    def _from_row(row: Iterable[Any]) -> SessionState:
+        fields = dict(zip(FIELDS, row))
+        for name in _BOOLEANS:
+            if fields[name] is not None:
+                fields[name] = bool(fields[name])
+        return SessionState(**fields)
+
+    def recover(self, limit: Optional[int] = None) -> int:
+        """Load the most recently updated unfinished sessions into memory."""
+        limit = min(limit or self.policy.max_sessions, self.policy.max_sessions)
+        columns = ", ".join(COLUMNS[f] for f in FIELDS)
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM SessionState WHERE FinalAnswer IS NULL "
+                f"ORDER BY UpdatedAt DESC LIMIT ?", (limit,)
+            ).fetchall()
+        loaded = 0
+        with self._lock:
+            for row in reversed(rows):  # oldest first, so the newest end up most recent
+                if row[FIELDS.index("sessionID")] in self._sessions:
+                    continue
+                self._admit(self._from_row(row))
+                loaded += 1
+            self.stats["loads"] += loaded
+            self._enforce_budget()
+        logger.info("♻️ Recovered %s active sessions from %s", loaded, self.db_path)
+        return loaded
+
+    def flush(self) -> int:
+        """Write every changed session now; returns the number of sessions written."""
+        # Flushes run one at a time, so an older state is never written over a newer one
+        with self._db_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                pending = self._flushing = self._dirty
+                self._dirty = {}
+                rows = [s.row() for s in pending.values()]
+            t0 = time.perf_counter()
+            try:
+                with telemetry.span("sessions.flush", sessions=len(rows)):
+                    self._write(rows)
+            except Exception:
+                with self._lock:
+                    for sid, state in pending.items():
+                        self._dirty.setdefault(sid, state)
+                    self._flushing = {}
+                raise
+            with self._lock:
+                self._flushing = {}
+                for sid in [sid for sid in self._evicted if sid not in self._dirty]:
+                    # Committed: the database is current and get() may reload it from there
+                    del self._evicted[sid]
+                self.stats["flushes"] += 1
+                self.stats["rows"] += len(rows)
+        telemetry.observe("sessions.flush", time.perf_counter() - t0, items=len(rows))
+        return len(rows)
+
+    def _write(self, rows: List[tuple]):
+        idx = {f: i for i, f in enumerate(FIELDS)}
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(_UPSERT_SQL, rows)
+            for r in rows:
+                sid = r[idx["sessionID"]]
+                goal, strategy = r[idx["currentGoalID"]], r[idx["currentStrategyID"]]
+                if goal is not None and r[idx["goalSatisfied"]] is not None:
+                    conn.execute(
+                        "UPDATE GoalInstance SET GoalSuccess = ? WHERE GoalID = ? AND SessionID = ?",
+                        (r[idx["goalSatisfied"]], goal, sid),
+                    )
+                if strategy is not None and r[idx["strategySatisfied"]] is not None:
+                    conn.execute(
+                        "UPDATE StrategyInstance SET StrategySuccess = ? WHERE StrategyID = ? "
+                        "AND GoalID IN (SELECT GoalID FROM GoalInstance WHERE SessionID = ?)",
+                        (r[idx["strategySatisfied"]], strategy, sid),
+                    )
+                if r[idx["finalAnswer"]] is not None:
+                    mark_session_completed(conn, sid)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ── write-behind thread ───────────────────────────────────────────
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.policy.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.evict_idle()
+            except sqlite3.Error as e:
+                logger.warning("⚠️ Session flush failed, retrying next tick: %s", e)
+
+    def close(self):
+        """Stop the flusher and write whatever is still pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self) -> "SessionStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, cached=len(self._sessions), dirty=len(self._dirty),
+                        evicted_pending=len(self._evicted), bytes=self._bytes)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Show the active agent sessions stored in agentic.db")
+    ap.add_argument("--db", default="agentic.db")
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+
+    from .config import setup_logging
+
+    setup_logging()
+    with SessionStore(args.db, autostart=False) as store:
+        store.recover(args.limit)
+        for state in reversed(store._sessions.values()):
+            print({ANSWER_FIELDS[k]: v for k, v in state.as_dict().items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+Immutable read-only snapshots for reader processes.
+
+``publish_snapshot`` turns a live database into a compacted, analyzed copy:
+``VACUUM INTO`` (or, for a subset of tables such as the agentic.db library,
+a copy of just those tables followed by ``VACUUM``), then ``ANALYZE`` and
+``quick_check``. The file is made read-only. Snapshots are numbered and kept
+in ``<db>.snapshots/``. The ``CURRENT`` pointer there names the one readers
+should use and is replaced atomically.
+
+Readers open a snapshot with ``mode=ro&immutable=1``. SQLite then takes no
+locks and never looks for a journal or WAL. With a large ``mmap_size``, every
+reader process maps the same pages of the OS page cache. A snapshot file is
+never modified, which is what makes ``immutable`` safe; a new version is
+always a new file. ``SnapshotReader`` follows the pointer the way
+``hotswap.LiveConnection`` follows a swapped file. Old snapshots are pruned
+once ``keep`` newer ones exist, and a process that still has one open keeps
+reading it.
+
+    python -m Agentic.snapshots publish knowledge.db
+    python -m Agentic.snapshots publish agentic.db --library
+    python -m Agentic.snapshots show knowledge.db
+    python benchmarks/snapshot_readers.py     # read throughput vs reader processes
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .hotswap import _fsync, table_counts
+
+logger = logging.getLogger("SNAPSHOTS")
+
+POINTER = "CURRENT"
+# What agent workers read from agentic.db (goals are stored as GoalInstance templates)
+LIBRARY_TABLES = (
+    "FunctionTemplateLibrary",
+    "FunctionOutputLibrary",
+    "FunctionParametersLibrary",
+    "StrategyLibrary",
+    "GoalInstance",
+)
+
+
+class SnapshotError(RuntimeError):
+    """Raised when a snapshot cannot be built or fails its check."""
+
+
+@dataclass
+class SnapshotPolicy:
+    """How many snapshots to keep and how readers open them."""
+
+    keep: int = 3
+    mmap_mb: int = 1024
+    check_interval: float = 1.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SnapshotPolicy":
+        section = (config or {}).get("snapshots") or {}
+        known = {k: v for k, v in section.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+def snapshot_dir(db_path: str) -> str:
+    return db_path + ".snapshots"
+
+
+def _pointer_path(db_path: str) -> str:
+    return os.path.join(snapshot_dir(db_path), POINTER)
+
+
+def read_pointer(db_path: str) -> Dict[str, Any]:
+    try:
+        with open(_pointer_path(db_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def current_snapshot(db_path: str) -> Optional[str]:
+    """Path of the snapshot ``CURRENT`` points to, or None if none is published."""
+    record = read_pointer(db_path)
+    if not record:
+        return None
+    path = os.path.join(snapshot_dir(db_path), record["file"])
+    return path if os.path.exists(path) else None
+
+
+def _versions(db_path: str) -> List[tuple]:
+    """``(version, path)`` of every snapshot file of ``db_path``, oldest first."""
+    directory = snapshot_dir(db_path)
+    if not os.path.isdir(directory):
+        return []
+    rx = re.compile(re.escape(os.path.splitext(os.path.basename(db_path))[0]) + r"-(\d+)\.db$")
+    found = [(int(m.group(1)), os.path.join(directory, name))
+             for name in os.listdir(directory) for m in [rx.match(name)] if m]
+    return sorted(found)
+
+
+def _copy_tables(db_path: str, target: str, tables: Sequence[str]):
+    """Create ``target`` holding only ``tables`` (with their indexes) of ``db_path``."""
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (db_path,))
+        marks = ",".join("?" * len(tables))
+        schema = conn.execute(
+            f"SELECT type, name, sql FROM src.sqlite_master WHERE tbl_name IN ({marks}) "
+            "AND type IN ('table', 'index') AND sql IS NOT NULL", tuple(tables)).fetchall()
+        missing = set(tables) - {name for typ, name, _ in schema if typ == "table"}
+        if missing:
+            raise SnapshotError(f"{db_path} has no table(s) {sorted(missing)}")
+        conn.execute("BEGIN")
+        for typ, name, sql in schema:
+            if typ == "table":
+                conn.execute(sql)
+                conn.execute(f'INSERT INTO main."{name}" SELECT * FROM src."{name}"')
+        # Indexes after the rows: one sorted build per index instead of row-by-row updates
+        for typ, _, sql in schema:
+            if typ == "index":
+                conn.execute(sql)
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+
+
+def publish_snapshot(
+    db_path: str,
+    tables: Optional[Sequence[str]] = None,
+    policy: Optional[SnapshotPolicy] = None,
+) -> Dict[str, Any]:
+    """Build the next snapshot of ``db_path`` (only ``tables``, if given) and point CURRENT at it.
+
+    The live database is only read. On failure the pointer and existing
+    snapshots are untouched. Returns the new pointer record.
+    """
+    policy = policy or SnapshotPolicy()
+    if not os.path.exists(db_path):
+        raise SnapshotError(f"{db_path} does not exist")
+    directory = snapshot_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+    versions = _versions(db_path)
+    version = max([read_pointer(db_path).get("version", 0)] + [v for v, _ in versions]) + 1
+    name = f"{os.path.splitext(os.path.basename(db_path))[0]}-{version:06d}.db"
+    target = os.path.join(directory, name)
+    tmp = target + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    t0 = time.perf_counter()
+    try:
+        if tables is None:
+            src = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+            try:
+                src.execute("VACUUM INTO ?", (tmp,))
+            finally:
+                src.close()
+        else:
+            _copy_tables(db_path, tmp, tables)
+        conn = sqlite3.connect(tmp, isolation_level=None)
+        try:
+            if tables is not None:
+                conn.execute("VACUUM")
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA journal_mode = DELETE")
+            check = [r[0] for r in conn.execute("PRAGMA quick_check")]
+        finally:
+            conn.close()
+        if check != ["ok"]:
+            raise SnapshotError(f"Snapshot of {db_path} failed quick_check: {check[:5]}")
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync(tmp)
+    os.chmod(tmp, 0o444)
+    os.replace(tmp, target)
+
+    record = {
+        "version": version,
+        "file": name,
+        "source": os.path.abspath(db_path),
+        "tables": table_counts(target),
+        "size": os.path.getsize(target),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    pointer = _pointer_path(db_path)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    os.replace(pointer + ".tmp", pointer)
+    _fsync(directory)
+    prune(db_path, policy.keep)
+    logger.info("📸 Snapshot %s of %s (%.1f MB) in %.2fs", version, db_path, record["size"] / 1e6, record["seconds"])
+    return record
+
+
+def prune(db_path: str, keep: int = 3) -> List[str]:
+    """Delete all but the newest ``keep`` snapshots (never the current one)."""
+    current = read_pointer(db_path).get("version")
+    removed = []
+    for version, path in _versions(db_path)[:-max(keep, 1)]:
+        if version == current:
+            continue
+        try:
+            os.chmod(path, 0o644)  # Windows refuses to delete read-only files
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:  # still open elsewhere (Windows); retried on the next publish
+            logger.debug("Could not remove %s: %s", path, e)
+    return removed
+
+
+def connect_snapshot(path: str, mmap_mb: int = 1024, **connect_args: Any) -> sqlite3.Connection:
+    """Open a snapshot file immutable and read-only, memory-mapped up to ``mmap_mb``."""
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro&immutable=1", uri=True, **connect_args)
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_mb) << 20}")
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class SnapshotReader:
+    """A reader's connection that follows ``CURRENT`` to each new snapshot.
+
+    Call ``connection()`` per unit of work: at most every ``check_interval``
+    seconds it stats the pointer and, when a new version is published, opens
+    it and closes the old connection. Without a published snapshot it falls
+    back to the live file opened ``mode=ro``, reopened whenever the file is
+    replaced or rewritten. One instance per thread (or pass
+    ``check_same_thread=False``).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        policy: Optional[SnapshotPolicy] = None,
+        row_factory: Optional[Callable] = None,
+        **connect_kwargs: Any,
+    ):
+        self.db_path = db_path
+        self.policy = policy or SnapshotPolicy()
+        self.row_factory = row_factory
+        self.connect_kwargs = connect_kwargs
+        self.version: Optional[int] = None
+        self.reopens = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _pointer_stamp(self):
+        """What ``connection()`` compares: the pointer's inode and mtime, or, with no
+        snapshot published, the live file's, so a file swapped in by
+        ``hotswap.publish`` is reopened too."""
+        for path in (_pointer_path(self.db_path), self.db_path):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            return path, st.st_ino, st.st_mtime_ns
+        return None
+
+    def _open(self) -> sqlite3.Connection:
+        record = read_pointer(self.db_path)
+        path = current_snapshot(self.db_path)
+        if path is not None:
+            conn = connect_snapshot(path, self.policy.mmap_mb, **self.connect_kwargs)
+            self.version = record["version"]
+        else:
+            conn = sqlite3.connect(f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True,
+                                   **self.connect_kwargs)
+            self.version = None
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        with self._lock:
+            now = time.monotonic()
+            if self._conn is not None and now - self._checked < self.policy.check_interval:
+                return self._conn
+            self._checked = now
+            stamp = self._pointer_stamp()
+            if self._conn is None or stamp != self._stamp:
+                old = self._conn
+                self._conn = self._open()
+                self._stamp = stamp
+                if old is not None:
+                    old.close()
+                    self.reopens += 1
+                    logger.info("🔄 %s: now reading %s", self.db_path,
+                                f"snapshot {self.version}" if self.version is not None else "the live file")
+            return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_local = threading.local()
+
+
+def thread_reader(db_path: str, policy: Optional[SnapshotPolicy] = None) -> SnapshotReader:
+    """This thread's ``SnapshotReader`` for ``db_path`` (created on first use)."""
+    readers = getattr(_local, "readers", None)
+    if readers is None:
+        readers = _local.readers = {}
+    key = os.path.abspath(db_path)
+    reader = readers.get(key)
+    if reader is None:
+        reader = readers[key] = SnapshotReader(db_path, policy)
+    return reader
+
+
+def reader_connection(db_path: str, policy: Optional[SnapshotPolicy] = None) -> sqlite3.Connection:
+    """This thread's read-only connection for ``db_path``: its current snapshot if one is
+    published, else the live file. Cached per thread and database; do not close it."""
+    return thread_reader(db_path, policy).connection()
+
+
+def _after_fork_in_child():
+    # Connections must not cross a fork; the child opens its own on first use
+    _local.__dict__.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Publish or inspect read-only database snapshots")
+    sub = ap.add_subparsers(dest="command", required=True)
+    pub = sub.add_parser("publish", help="Build the next snapshot and point CURRENT at it")
+    pub.add_argument("db")
+    pub.add_argument("--tables", nargs="+", help="Only these tables (default: the whole database)")
+    pub.add_argument("--library", action="store_true", help="Only the agentic.db library tables")
+    pub.add_argument("--keep", type=int)
+    show = sub.add_parser("show", help="Print the CURRENT pointer")
+    show.add_argument("db")
+    args = ap.parse_args()
+
+    from .config import get_config, setup_logging
+
+    config = get_config()
+    setup_logging(config)
+    if args.command == "publish":
+        policy = SnapshotPolicy.from_config(config)
+        if args.keep is not None:
+            policy.keep = args.keep
+        tables = LIBRARY_TABLES if args.library else args.tables
+        publish_snapshot(args.db, tables=tables, policy=policy)
+    else:
+        print(json.dumps(read_pointer(args.db), indent=2))
+
+
+if __name__ == "__main__":
+    main()
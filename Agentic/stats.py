@@ -0,0 +1,157 @@
+"""
+Table statistics without full-table scans.
+
+Row counts and last-modified times come from ``table_stats``, a counter table
+kept current by per-table triggers (installed through a schema migration).
+Tables without counters fall back to ``sqlite_stat1`` estimates, and only then
+to ``COUNT(*)``. Page usage comes from O(1) pragmas, or per table from ``dbstat``
+when requested and the SQLite build provides it.
+"""
+
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+logger = logging.getLogger("STATS")
+
+STATS_TABLE = "table_stats"
+
+
+# ─── Migration SQL ─────────────────────────────────────────────────────
+
+
+def stats_migration_sql(tables: Sequence[str]) -> str:
+    """SQL that creates ``table_stats``, seeds it once and installs the counter triggers."""
+    parts = [
+        f"""CREATE TABLE IF NOT EXISTS {STATS_TABLE}(
+    table_name    TEXT PRIMARY KEY,
+    row_count     INTEGER NOT NULL DEFAULT 0,
+    last_modified TEXT
+);"""
+    ]
+    touch = "last_modified = strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+    for t in tables:
+        parts.append(
+            f"INSERT OR REPLACE INTO {STATS_TABLE}(table_name, row_count, last_modified) "
+            f"SELECT '{t}', COUNT(*), strftime('%Y-%m-%dT%H:%M:%f', 'now') FROM {t};"
+        )
+        parts.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{t}_stats_ins AFTER INSERT ON {t} BEGIN "
+            f"UPDATE {STATS_TABLE} SET row_count = row_count + 1, {touch} WHERE table_name = '{t}'; END;"
+        )
+        parts.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{t}_stats_del AFTER DELETE ON {t} BEGIN "
+            f"UPDATE {STATS_TABLE} SET row_count = row_count - 1, {touch} WHERE table_name = '{t}'; END;"
+        )
+        parts.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{t}_stats_upd AFTER UPDATE ON {t} BEGIN "
+            f"UPDATE {STATS_TABLE} SET {touch} WHERE table_name = '{t}'; END;"
+        )
+    return "\n".join(parts) + "\n"
+
+
+# ─── Readers ───────────────────────────────────────────────────────────
+
+
+def _has_table(conn: sqlite3.Connection, schema: str, name: str) -> bool:
+    return conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type='table' AND name=?", (name,)
+    ).fetchone() is not None
+
+
+def _stat1_estimates(conn: sqlite3.Connection, schema: str) -> Dict[str, int]:
+    if not _has_table(conn, schema, "sqlite_stat1"):
+        return {}
+    estimates = {}
+    for tbl, stat in conn.execute(f"SELECT tbl, stat FROM {schema}.sqlite_stat1"):
+        try:
+            estimates[tbl] = max(estimates.get(tbl, 0), int(str(stat).split()[0]))
+        except (ValueError, IndexError):
+            continue
+    return estimates
+
+
+def _dbstat_pages(conn: sqlite3.Connection, schema: str) -> Dict[str, int]:
+    try:
+        rows = conn.execute(
+            "SELECT name, COUNT(*) FROM dbstat WHERE schema = ? GROUP BY name", (schema,)
+        ).fetchall()
+    except sqlite3.OperationalError:  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+        return {}
+    return dict(rows)
+
+
+def schema_stats(
+    conn: sqlite3.Connection, schema: str = "main", per_table_pages: bool = False
+) -> Dict[str, Any]:
+    """Statistics for one attached schema of ``conn``."""
+    page_size = conn.execute(f"PRAGMA {schema}.page_size").fetchone()[0]
+    page_count = conn.execute(f"PRAGMA {schema}.page_count").fetchone()[0]
+    freelist = conn.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]
+
+    counters: Dict[str, tuple] = {}
+    if _has_table(conn, schema, STATS_TABLE):
+        counters = {
+            name: (count, modified)
+            for name, count, modified in conn.execute(
+                f"SELECT table_name, row_count, last_modified FROM {schema}.{STATS_TABLE}"
+            )
+        }
+    estimates = _stat1_estimates(conn, schema)
+    pages = _dbstat_pages(conn, schema) if per_table_pages else {}
+
+    tables: Dict[str, Dict[str, Any]] = {}
+    for (name,) in conn.execute(
+        f"SELECT name FROM {schema}.sqlite_master WHERE type='table' ORDER BY rowid"
+    ):
+        if name in counters:
+            rows, modified, source = counters[name][0], counters[name][1], "trigger"
+        elif name in estimates:
+            rows, modified, source = estimates[name], None, "sqlite_stat1"
+        else:
+            rows = conn.execute(f'SELECT COUNT(*) FROM {schema}."{name}"').fetchone()[0]
+            modified, source = None, "count"
+        tables[name] = {"rows": rows, "last_modified": modified, "source": source}
+        if per_table_pages:
+            tables[name]["pages"] = pages.get(name, 0)
+
+    return {
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_count": freelist,
+        "size_bytes": page_size * page_count,
+        "tables": tables,
+    }
+
+
+def collect_stats(
+    db_paths: Mapping[str, str], per_table_pages: bool = False
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Statistics for several databases in one call, e.g. ``{"agentic": "agentic.db"}``.
+
+    Every database is attached read-only to a single in-memory connection. Missing
+    files map to ``None``.
+    """
+    result: Dict[str, Optional[Dict[str, Any]]] = {}
+    conn = sqlite3.connect("file::memory:", uri=True)
+    try:
+        for alias, path in db_paths.items():
+            if not alias.isidentifier():
+                raise ValueError(f"Invalid database alias: {alias!r}")
+            if not os.path.exists(path):
+                result[alias] = None
+                continue
+            conn.execute("ATTACH DATABASE ? AS " + alias, (Path(path).resolve().as_uri() + "?mode=ro",))
+            result[alias] = schema_stats(conn, alias, per_table_pages=per_table_pages)
+            result[alias]["path"] = str(path)
+    finally:
+        conn.close()
+    return result
+
+
+def row_counts(db_path: str) -> Dict[str, int]:
+    """``{table: rows}`` for one database (empty if it does not exist)."""
+    stats = collect_stats({"db": db_path})["db"]
+    return {} if stats is None else {t: s["rows"] for t, s in stats["tables"].items()}
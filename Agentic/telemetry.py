@@ -0,0 +1,341 @@
+"""
+Spans, timers and counters for the population and harvest pipeline.
+
+Disabled by default. While disabled, ``span()`` returns a shared no-op object,
+``count()``/``observe()`` return immediately and ``@traced`` functions pay one
+flag check, so instrumented code can stay in hot loops. ``enable()`` turns
+collection on for the process; stages run in worker processes send their data
+back to the parent (see ``build_graph``).
+
+Exports:
+- ``write_json``: aggregated timers (calls, total/min/max, items/s) and counters.
+- ``write_prometheus``: text exposition format for the node_exporter textfile collector.
+- ``write_otel``: OTLP/JSON spans (one ``resourceSpans`` document per line), the
+  format the OpenTelemetry Collector file receiver/exporter reads and writes.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("TELEMETRY")
+
+enabled = False
+MAX_EVENTS = 20000  # span events kept for the OTel export; aggregates are unbounded
+
+_lock = threading.Lock()
+_local = threading.local()
+_timers: Dict[Tuple[str, Tuple], List[float]] = {}   # key -> [calls, total, min, max, items]
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_events: List[Dict[str, Any]] = []
+_trace_id = ""
+
+
+def enable(trace_id: Optional[str] = None):
+    global enabled, _trace_id
+    _trace_id = trace_id or os.urandom(16).hex()
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def state() -> Optional[str]:
+    """What a worker process needs to join this trace (None when disabled)."""
+    return _trace_id if enabled else None
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _events.clear()
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, seconds: float, items: int = 0, **labels: Any):
+    """Add one timing to the ``name`` timer (no span event)."""
+    if not enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        t = _timers.get(key)
+        if t is None:
+            _timers[key] = [1, seconds, seconds, seconds, items]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            t[2] = min(t[2], seconds)
+            t[3] = max(t[3], seconds)
+            t[4] += items
+
+
+def count(name: str, value: float = 1, **labels: Any):
+    if not enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, items: int = 1):
+        pass
+
+    def set(self, **attrs: Any):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "items", "span_id", "parent_id", "start_ns", "t0")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], parent_id: Optional[str] = None):
+        self.name, self.attrs, self.items, self.parent_id = name, attrs, 0, parent_id
+
+    def add(self, items: int = 1):
+        """Count processed items (pages, links, rows) for throughput."""
+        self.items += items
+
+    def set(self, **attrs: Any):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            self.parent_id = stack[-1].span_id
+        self.span_id = os.urandom(8).hex()
+        stack.append(self)
+        self.start_ns = time.time_ns()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.t0
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        observe(self.name, seconds, self.items)
+        with _lock:
+            if len(_events) < MAX_EVENTS:
+                _events.append({
+                    "name": self.name, "span_id": self.span_id, "parent_id": self.parent_id,
+                    "start_ns": self.start_ns, "end_ns": self.start_ns + int(seconds * 1e9),
+                    "items": self.items, "attrs": dict(self.attrs), "pid": os.getpid(),
+                })
+        return False
+
+
+def span(name: str, parent_id: Optional[str] = None, **attrs: Any):
+    """``with span("harvest.insert") as s: ...; s.add(len(rows))``
+
+    ``parent_id`` links a span started in a worker thread or process to the
+    span that scheduled it (see ``current_span_id``).
+    """
+    if not enabled:
+        return _NOOP
+    return Span(name, attrs, parent_id)
+
+
+def current_span_id() -> Optional[str]:
+    stack = getattr(_local, "stack", None)
+    return stack[-1].span_id if enabled and stack else None
+
+
+def traced(name: Optional[str] = None, items: Optional[Callable[[Any], int]] = None):
+    """Decorator: run the function inside a span; ``items(result)`` counts its output."""
+    def deco(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, {}) as s:
+                result = func(*args, **kwargs)
+                if items is not None:
+                    try:
+                        s.add(items(result))
+                    except Exception:
+                        pass
+                return result
+        return wrapper
+    return deco
+
+
+# ─── Collection across processes ────────────────────────────────────────
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "timers": [[n, list(l), list(v)] for (n, l), v in _timers.items()],
+            "counters": [[n, list(l), v] for (n, l), v in _counters.items()],
+            "events": list(_events),
+        }
+
+
+def drain() -> Optional[Dict[str, Any]]:
+    """Snapshot and reset; what a worker process returns to its parent."""
+    if not enabled:
+        return None
+    snap = snapshot()
+    reset()
+    return snap
+
+
+def merge(snap: Optional[Dict[str, Any]]):
+    if not snap or not enabled:
+        return
+    with _lock:
+        for name, labels, (calls, total, lo, hi, items) in snap["timers"]:
+            key = (name, tuple(tuple(x) for x in labels))
+            t = _timers.get(key)
+            if t is None:
+                _timers[key] = [calls, total, lo, hi, items]
+            else:
+                t[0] += calls
+                t[1] += total
+                t[2] = min(t[2], lo)
+                t[3] = max(t[3], hi)
+                t[4] += items
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(tuple(x) for x in labels))
+            _counters[key] = _counters.get(key, 0) + value
+        _events.extend(snap["events"][:max(MAX_EVENTS - len(_events), 0)])
+
+
+# ─── Exporters ─────────────────────────────────────────────────────────
+
+
+def _label_str(labels: Tuple) -> str:
+    return ",".join(f"{k}={v}" for k, v in labels)
+
+
+def report() -> Dict[str, Any]:
+    with _lock:
+        timers = {}
+        for (name, labels), (calls, total, lo, hi, items) in sorted(_timers.items()):
+            key = f"{name}{{{_label_str(labels)}}}" if labels else name
+            timers[key] = {
+                "calls": calls, "seconds": round(total, 6), "min": round(lo, 6), "max": round(hi, 6),
+                "mean": round(total / calls, 6), "items": items,
+                "items_per_second": round(items / total, 2) if items and total else None,
+            }
+        counters = {(f"{n}{{{_label_str(l)}}}" if l else n): v for (n, l), v in sorted(_counters.items())}
+        return {"trace_id": _trace_id, "timers": timers, "counters": counters, "spans_recorded": len(_events)}
+
+
+def _atomic_write(path: str, text: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_json(path: str):
+    _atomic_write(path, json.dumps(report(), indent=2))
+
+
+def _prom_name(name: str) -> str:
+    return "agentic_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _prom_labels(labels: Tuple, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def write_prometheus(path: str):
+    """Text exposition format; point the node_exporter textfile collector at the directory."""
+    lines = ["# HELP agentic_stage_seconds_total Time spent per span/timer.",
+             "# TYPE agentic_stage_seconds_total counter",
+             "# HELP agentic_stage_calls_total Calls per span/timer.",
+             "# TYPE agentic_stage_calls_total counter",
+             "# HELP agentic_stage_items_total Items processed per span/timer.",
+             "# TYPE agentic_stage_items_total counter"]
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+    for (name, labels), (calls, total, _, _, items) in timers:
+        lbl = _prom_labels(labels, span=name)
+        lines.append(f"agentic_stage_seconds_total{lbl} {total:.6f}")
+        lines.append(f"agentic_stage_calls_total{lbl} {calls}")
+        lines.append(f"agentic_stage_items_total{lbl} {items}")
+    typed = set()
+    for (name, labels), value in counters:
+        metric = _prom_name(name) + "_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_prom_labels(labels)} {value:g}")
+    _atomic_write(path, "\n".join(lines) + "\n")
+
+
+def _otel_value(v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def write_otel(path: str, service_name: str = "agentic-populator"):
+    """Append the recorded spans as one OTLP/JSON ``resourceSpans`` line."""
+    with _lock:
+        events = list(_events)
+    spans = []
+    for e in events:
+        attrs = dict(e["attrs"], items=e["items"], **{"process.pid": e["pid"]})
+        s = {
+            "traceId": _trace_id, "spanId": e["span_id"], "name": e["name"], "kind": 1,
+            "startTimeUnixNano": str(e["start_ns"]), "endTimeUnixNano": str(e["end_ns"]),
+            "attributes": [{"key": k, "value": _otel_value(v)} for k, v in attrs.items()],
+        }
+        if e["parent_id"]:
+            s["parentSpanId"] = e["parent_id"]
+        if "error" in e["attrs"]:
+            s["status"] = {"code": 2, "message": e["attrs"]["error"]}
+        spans.append(s)
+    doc = {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{"scope": {"name": "Agentic.telemetry"}, "spans": spans}],
+    }]}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(doc) + "\n")
+
+
+def export(json_path: Optional[str] = None, prometheus_path: Optional[str] = None,
+           otel_path: Optional[str] = None):
+    """Write every requested export; a failing exporter only logs a warning."""
+    for path, writer in ((json_path, write_json), (prometheus_path, write_prometheus), (otel_path, write_otel)):
+        if path:
+            try:
+                writer(path)
+                logger.info("📈 Telemetry written to %s", path)
+            except OSError as e:
+                logger.warning("⚠️ Could not write telemetry to %s: %s", path, e)
@@ -1,48 +1,57 @@
+import hashlib
+import json
 import logging
 import sqlite3
 
+try:
+    from Agentic.records import FunctionTemplate, GoalDef, OutputDef, ParameterDef, StrategyDef, insert_sql
+    from Agentic.telemetry import traced
+except ImportError:  # run as a script from inside Agentic/
+    from records import FunctionTemplate, GoalDef, OutputDef, ParameterDef, StrategyDef, insert_sql
+    from telemetry import traced
+
 # Remove problematic imports and use direct database connections
 logger = logging.getLogger("TEMPLATE")
 
 # 8 Core Merged Actions - replacing old function templates
 templates = [
     # (FunctionName, StrategyType, FunctionDescription)
-    (
+    FunctionTemplate(
         "SEARCH",
         "search",
         "Query different knowledge tables based on strategy type. Searches CatiaDocFunctionsLibrary for declarative KC, ConditionalKnowledge for conditional strategies, ProceduralKnowledge for procedural strategies, and DeclarativeKnowledge for declarative KG."
     ),
-    (
+    FunctionTemplate(
         "ANALYZE", 
         "analyze",
         "Process data with different analytical approaches. Performs text analysis for declarative facts, geometric analysis for constraint relationships, parameter analysis for procedural values, pattern analysis for knowledge generation, and usage/frequency analysis for optimization."
     ),
-    (
+    FunctionTemplate(
         "EXTRACT",
         "extract", 
         "Pull out specific information elements from various sources. Extracts product numbers and key identifiers, parameter values and constraints, sequence patterns and workflow elements, and implicit knowledge from high-confidence data."
     ),
-    (
+    FunctionTemplate(
         "CLASSIFY",
         "filter",
         "Categorize information by different criteria based on strategy needs. Classifies constraints by type (geometric, dimensional), workflows by grouping, functions by enhancement level, and procedures by optimization type."
     ),
-    (
+    FunctionTemplate(
         "MAP",
         "modification",
         "Create relationships and connections between different elements. Maps step actions to CATIA functions, constraints between objects, cross-references with documentation, and establishes procedural dependencies."
     ),
-    (
+    FunctionTemplate(
         "GENERATE",
         "generation",
         "Create new knowledge variations and combinations. Generates object type variations, constraint context variations, adaptive procedures, logic combinations (AND/OR), and workflow synthesis from existing knowledge."
     ),
-    (
+    FunctionTemplate(
         "VALIDATE",
         "validation",
         "Assess quality and completeness of processed knowledge. Performs confidence assessment for reliability, parameter validation for completeness, cross-validation with documentation, and meta-analysis for procedure management."
     ),
-    (
+    FunctionTemplate(
         "POPULATE",
         "storage",
         "Store processed knowledge in appropriate knowledge tables. Populates declarative knowledge with factual information, conditional knowledge with constraint rules, procedural knowledge with execution procedures, and generates new knowledge entries."
@@ -52,146 +61,257 @@ templates = [
 # Enhanced output definitions for each core action
 outputs = {
     "SEARCH": [
-        ("Search Results", "", "json"), 
-        ("Source Table", "", "string"),
-        ("Record Count", "", "integer"),
-        ("Query Execution Time", "", "float")
+        OutputDef("Search Results", "", "json"), 
+        OutputDef("Source Table", "", "string"),
+        OutputDef("Record Count", "", "integer"),
+        OutputDef("Query Execution Time", "", "float")
     ],
     "ANALYZE": [
-        ("Analysis Results", "", "json"), 
-        ("Analysis Type", "", "string"),
-        ("Confidence Score", "", "float"),
-        ("Pattern Matches", "", "json")
+        OutputDef("Analysis Results", "", "json"), 
+        OutputDef("Analysis Type", "", "string"),
+        OutputDef("Confidence Score", "", "float"),
+        OutputDef("Pattern Matches", "", "json")
     ],
     "EXTRACT": [
-        ("Extracted Data", "", "json"), 
-        ("Extraction Method", "", "string"),
-        ("Success Rate", "", "float"),
-        ("Failed Extractions", "", "json")
+        OutputDef("Extracted Data", "", "json"), 
+        OutputDef("Extraction Method", "", "string"),
+        OutputDef("Success Rate", "", "float"),
+        OutputDef("Failed Extractions", "", "json")
     ],
     "CLASSIFY": [
-        ("Classification Results", "", "json"), 
-        ("Category Type", "", "string"),
-        ("Classification Accuracy", "", "float"),
-        ("Category Counts", "", "json")
+        OutputDef("Classification Results", "", "json"), 
+        OutputDef("Category Type", "", "string"),
+        OutputDef("Classification Accuracy", "", "float"),
+        OutputDef("Category Counts", "", "json")
     ],
     "MAP": [
-        ("Mapping Results", "", "json"), 
-        ("Relationship Type", "", "string"),
-        ("Mapping Completeness", "", "float"),
-        ("Unmapped Elements", "", "json")
+        OutputDef("Mapping Results", "", "json"), 
+        OutputDef("Relationship Type", "", "string"),
+        OutputDef("Mapping Completeness", "", "float"),
+        OutputDef("Unmapped Elements", "", "json")
     ],
     "GENERATE": [
-        ("Generated Knowledge", "", "json"), 
-        ("Generation Method", "", "string"),
-        ("Generation Count", "", "integer"),
-        ("Quality Score", "", "float")
+        OutputDef("Generated Knowledge", "", "json"), 
+        OutputDef("Generation Method", "", "string"),
+        OutputDef("Generation Count", "", "integer"),
+        OutputDef("Quality Score", "", "float")
     ],
     "VALIDATE": [
-        ("Validation Results", "", "json"), 
-        ("Confidence Score", "", "float"),
-        ("Validation Errors", "", "json"),
-        ("Validation Status", "", "string")
+        OutputDef("Validation Results", "", "json"), 
+        OutputDef("Confidence Score", "", "float"),
+        OutputDef("Validation Errors", "", "json"),
+        OutputDef("Validation Status", "", "string")
     ],
     "POPULATE": [
-        ("Population Status", "", "string"), 
-        ("Records Created", "", "integer"),
-        ("Population Errors", "", "json"),
-        ("Target Knowledge Type", "", "string")
+        OutputDef("Population Status", "", "string"), 
+        OutputDef("Records Created", "", "integer"),
+        OutputDef("Population Errors", "", "json"),
+        OutputDef("Target Knowledge Type", "", "string")
     ],
 }
 
 # Enhanced parameter definitions for each core action
 params = {
     "SEARCH": [
-        ("Target Table", "", "string"), 
-        ("Search Criteria", "", "string"),
-        ("Strategy Context", "", "string"),
-        ("Search Filters", "", "json")
+        ParameterDef("Target Table", "", "string"), 
+        ParameterDef("Search Criteria", "", "string"),
+        ParameterDef("Strategy Context", "", "string"),
+        ParameterDef("Search Filters", "", "json")
     ],
     "ANALYZE": [
-        ("Data Input", "", "json"), 
-        ("Analysis Type", "", "string"),
-        ("Strategy Phase", "", "string"),
-        ("Analysis Parameters", "", "json")
+        ParameterDef("Data Input", "", "json"), 
+        ParameterDef("Analysis Type", "", "string"),
+        ParameterDef("Strategy Phase", "", "string"),
+        ParameterDef("Analysis Parameters", "", "json")
     ],
     "EXTRACT": [
-        ("Source Data", "", "string"), 
-        ("Extraction Pattern", "", "string"),
-        ("Target Elements", "", "json"),
-        ("Extraction Rules", "", "json")
+        ParameterDef("Source Data", "", "string"), 
+        ParameterDef("Extraction Pattern", "", "string"),
+        ParameterDef("Target Elements", "", "json"),
+        ParameterDef("Extraction Rules", "", "json")
     ],
     "CLASSIFY": [
-        ("Input Data", "", "json"), 
-        ("Classification Criteria", "", "string"),
-        ("Category Schema", "", "json"),
-        ("Classification Threshold", "", "float")
+        ParameterDef("Input Data", "", "json"), 
+        ParameterDef("Classification Criteria", "", "string"),
+        ParameterDef("Category Schema", "", "json"),
+        ParameterDef("Classification Threshold", "", "float")
     ],
     "MAP": [
-        ("Source Elements", "", "json"), 
-        ("Target Elements", "", "json"),
-        ("Mapping Rules", "", "json"),
-        ("Relationship Type", "", "string")
+        ParameterDef("Source Elements", "", "json"), 
+        ParameterDef("Target Elements", "", "json"),
+        ParameterDef("Mapping Rules", "", "json"),
+        ParameterDef("Relationship Type", "", "string")
     ],
     "GENERATE": [
-        ("Base Knowledge", "", "json"), 
-        ("Generation Rules", "", "string"),
-        ("Strategy Type", "", "string"),
-        ("Generation Parameters", "", "json")
+        ParameterDef("Base Knowledge", "", "json"), 
+        ParameterDef("Generation Rules", "", "string"),
+        ParameterDef("Strategy Type", "", "string"),
+        ParameterDef("Generation Parameters", "", "json")
     ],
     "VALIDATE": [
-        ("Input Data", "", "json"), 
-        ("Validation Criteria", "", "string"),
-        ("Quality Thresholds", "", "json"),
-        ("Validation Rules", "", "json")
+        ParameterDef("Input Data", "", "json"), 
+        ParameterDef("Validation Criteria", "", "string"),
+        ParameterDef("Quality Thresholds", "", "json"),
+        ParameterDef("Validation Rules", "", "json")
     ],
     "POPULATE": [
-        ("Knowledge Data", "", "json"), 
-        ("Target Table", "", "string"),
-        ("Population Mode", "", "string"),
-        ("Data Validation", "", "boolean")
+        ParameterDef("Knowledge Data", "", "json"), 
+        ParameterDef("Target Table", "", "string"),
+        ParameterDef("Population Mode", "", "string"),
+        ParameterDef("Data Validation", "", "boolean")
     ],
 }
 
 # Keep existing strategies unchanged
 strategies = [
     # (StrategyName, StrategyTarget, StrategyDescription)
-    (
+    StrategyDef(
         "Declarative KC",
         "knowledge_construction",
         "Strategy for constructing declarative knowledge from extracted data and user queries. Focuses on building factual knowledge representations about CATIA objects, their types, subtypes, and parameters. Extracts object creation facts, properties, and specifications from the steps data and CATIA documentation."
     ),
-    (
+    StrategyDef(
         "Declarative KG",
         "knowledge_generation",
         "Strategy for generating declarative knowledge from existing knowledge base. Focuses on creating new factual knowledge from stored information. Combines existing declarative facts with CATIA documentation to generate new object specifications, properties, and relationships."
     ),
-    (
+    StrategyDef(
         "Conditional KC", 
         "knowledge_construction",
         "Strategy for constructing conditional knowledge from extracted data and user queries. Focuses on building if-then relationships and constraints. Identifies tangency conditions, parameter modifications, and geometric constraints from the steps data and maps them to conditional logic."
     ),
-    (
+    StrategyDef(
         "Conditional KG",
         "knowledge_generation",
         "Strategy for generating conditional knowledge from existing knowledge base. Focuses on creating new if-then relationships and conditional logic. Synthesizes existing constraints with CATIA function parameters to generate new conditional rules and constraint patterns."
     ),
-    (
+    StrategyDef(
         "Procedural KC",
         "knowledge_construction", 
         "Strategy for constructing procedural knowledge from extracted data and user queries. Focuses on building step-by-step procedures and workflows. Extracts procedural sequences, tool selections, and workflow patterns from the steps data to create executable procedures."
     ),
-    (
+    StrategyDef(
         "Procedural KG", 
         "knowledge_generation",
         "Strategy for generating procedural knowledge from existing knowledge base. Focuses on creating new step-by-step procedures and workflows. Combines existing procedural knowledge with CATIA function outputs to generate new workflow sequences and procedural patterns."
     ),
 ]
 
+# Plan DAG per strategy (stored as JSON in StrategyLibrary.PlanSteps).
+# Each step is one core action; "$step.Output Name" binds a parameter to an
+# upstream step's output, which is also what orders the steps (see
+# Agentic.executor). Any other value is a literal. Unbound parameters take
+# their library default.
+plans = {
+    "Declarative KC": [
+        {"id": "search_docs", "action": "SEARCH",
+         "inputs": {"Target Table": "doc_functions_ultramin", "Strategy Context": "declarative"}},
+        {"id": "search_steps", "action": "SEARCH",
+         "inputs": {"Target Table": "harvested_steps_ultramin", "Strategy Context": "declarative"}},
+        {"id": "extract", "action": "EXTRACT",
+         "inputs": {"Source Data": "harvested_steps_ultramin", "Extraction Pattern": "object_creation",
+                    "Target Elements": "$search_steps.Search Results"}},
+        {"id": "map", "action": "MAP",
+         "inputs": {"Source Elements": "$extract.Extracted Data", "Target Elements": "$search_docs.Search Results",
+                    "Relationship Type": "action_to_function"}},
+        {"id": "validate", "action": "VALIDATE",
+         "inputs": {"Input Data": "$map.Mapping Results", "Validation Criteria": "completeness"}},
+        {"id": "populate", "action": "POPULATE",
+         "inputs": {"Knowledge Data": "$validate.Validation Results", "Target Table": "DeclarativeKnowledge",
+                    "Population Mode": "append"}},
+    ],
+    "Declarative KG": [
+        {"id": "search_knowledge", "action": "SEARCH",
+         "inputs": {"Target Table": "DeclarativeKnowledge", "Strategy Context": "declarative"}},
+        {"id": "search_docs", "action": "SEARCH",
+         "inputs": {"Target Table": "doc_functions_ultramin", "Strategy Context": "declarative"}},
+        {"id": "analyze", "action": "ANALYZE",
+         "inputs": {"Data Input": "$search_knowledge.Search Results", "Analysis Type": "pattern"}},
+        {"id": "generate", "action": "GENERATE",
+         "inputs": {"Base Knowledge": "$analyze.Analysis Results", "Strategy Type": "declarative",
+                    "Generation Parameters": "$search_docs.Search Results"}},
+        {"id": "validate", "action": "VALIDATE",
+         "inputs": {"Input Data": "$generate.Generated Knowledge", "Validation Criteria": "confidence"}},
+        {"id": "populate", "action": "POPULATE",
+         "inputs": {"Knowledge Data": "$validate.Validation Results", "Target Table": "DeclarativeKnowledge",
+                    "Population Mode": "append"}},
+    ],
+    "Conditional KC": [
+        {"id": "search_steps", "action": "SEARCH",
+         "inputs": {"Target Table": "harvested_steps_ultramin", "Strategy Context": "conditional"}},
+        {"id": "search_docs", "action": "SEARCH",
+         "inputs": {"Target Table": "doc_functions_ultramin", "Strategy Context": "conditional"}},
+        {"id": "extract", "action": "EXTRACT",
+         "inputs": {"Source Data": "harvested_steps_ultramin", "Extraction Pattern": "constraint",
+                    "Target Elements": "$search_steps.Search Results"}},
+        {"id": "classify", "action": "CLASSIFY",
+         "inputs": {"Input Data": "$extract.Extracted Data", "Classification Criteria": "constraint_type"}},
+        {"id": "map", "action": "MAP",
+         "inputs": {"Source Elements": "$classify.Classification Results",
+                    "Target Elements": "$search_docs.Search Results", "Relationship Type": "constraint"}},
+        {"id": "validate", "action": "VALIDATE",
+         "inputs": {"Input Data": "$map.Mapping Results", "Validation Criteria": "parameters"}},
+        {"id": "populate", "action": "POPULATE",
+         "inputs": {"Knowledge Data": "$validate.Validation Results", "Target Table": "ConditionalKnowledge",
+                    "Population Mode": "append"}},
+    ],
+    "Conditional KG": [
+        {"id": "search_knowledge", "action": "SEARCH",
+         "inputs": {"Target Table": "ConditionalKnowledge", "Strategy Context": "conditional"}},
+        {"id": "search_docs", "action": "SEARCH",
+         "inputs": {"Target Table": "doc_functions_ultramin", "Strategy Context": "conditional"}},
+        {"id": "analyze", "action": "ANALYZE",
+         "inputs": {"Data Input": "$search_knowledge.Search Results", "Analysis Type": "geometric"}},
+        {"id": "generate", "action": "GENERATE",
+         "inputs": {"Base Knowledge": "$analyze.Analysis Results", "Strategy Type": "conditional",
+                    "Generation Rules": "logic_combinations", "Generation Parameters": "$search_docs.Search Results"}},
+        {"id": "validate", "action": "VALIDATE",
+         "inputs": {"Input Data": "$generate.Generated Knowledge", "Validation Criteria": "cross_validation"}},
+        {"id": "populate", "action": "POPULATE",
+         "inputs": {"Knowledge Data": "$validate.Validation Results", "Target Table": "ConditionalKnowledge",
+                    "Population Mode": "append"}},
+    ],
+    "Procedural KC": [
+        {"id": "search_steps", "action": "SEARCH",
+         "inputs": {"Target Table": "harvested_steps_ultramin", "Strategy Context": "procedural"}},
+        {"id": "extract", "action": "EXTRACT",
+         "inputs": {"Source Data": "harvested_steps_ultramin", "Extraction Pattern": "sequence",
+                    "Target Elements": "$search_steps.Search Results"}},
+        {"id": "analyze", "action": "ANALYZE",
+         "inputs": {"Data Input": "$search_steps.Search Results", "Analysis Type": "parameter"}},
+        {"id": "map", "action": "MAP",
+         "inputs": {"Source Elements": "$extract.Extracted Data", "Target Elements": "$analyze.Analysis Results",
+                    "Relationship Type": "procedural_dependency"}},
+        {"id": "validate", "action": "VALIDATE",
+         "inputs": {"Input Data": "$map.Mapping Results", "Validation Criteria": "completeness"}},
+        {"id": "populate", "action": "POPULATE",
+         "inputs": {"Knowledge Data": "$validate.Validation Results", "Target Table": "ProceduralKnowledge",
+                    "Population Mode": "append"}},
+    ],
+    "Procedural KG": [
+        {"id": "search_knowledge", "action": "SEARCH",
+         "inputs": {"Target Table": "ProceduralKnowledge", "Strategy Context": "procedural"}},
+        {"id": "search_docs", "action": "SEARCH",
+         "inputs": {"Target Table": "doc_functions_ultramin", "Strategy Context": "procedural"}},
+        {"id": "analyze", "action": "ANALYZE",
+         "inputs": {"Data Input": "$search_knowledge.Search Results", "Analysis Type": "usage"}},
+        {"id": "generate", "action": "GENERATE",
+         "inputs": {"Base Knowledge": "$analyze.Analysis Results", "Strategy Type": "procedural",
+                    "Generation Rules": "workflow_synthesis", "Generation Parameters": "$search_docs.Search Results"}},
+        {"id": "classify", "action": "CLASSIFY",
+         "inputs": {"Input Data": "$generate.Generated Knowledge", "Classification Criteria": "optimization"}},
+        {"id": "validate", "action": "VALIDATE",
+         "inputs": {"Input Data": "$classify.Classification Results", "Validation Criteria": "meta_analysis"}},
+        {"id": "populate", "action": "POPULATE",
+         "inputs": {"Knowledge Data": "$validate.Validation Results", "Target Table": "ProceduralKnowledge",
+                    "Population Mode": "append"}},
+    ],
+}
+
 # Goal templates for different types of user requests
 goals = [
     # (GoalName, GoalTarget, GoalDescription, GoalValidation)
-    (
+    GoalDef(
         "create_wing",
         "wing_creation",
         "Create a complete wing structure using CATIA functions and knowledge from the database. This involves creating the main wing body, adding necessary features, and ensuring proper geometry.",
@@ -199,86 +319,65 @@ goals = [
     ),
 ]
 
+def template_fingerprint() -> str:
+    """Content hash of all template data; changes whenever a library row would change."""
+    data = json.dumps([templates, outputs, params, strategies, plans, goals], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
 # ────────────────────────────────────────────────────────────────────────────────────────
 # Populate the template libraries in the database with 8 core actions
 
-def populate_template_libraries():
-    """Populate the template libraries with 8 core merged actions."""
+@traced("agentic.populate_template_libraries")
+def populate_template_libraries(db_path="agentic.db"):
+    """Populate the template libraries with 8 core merged actions.
+
+    Runs as a single transaction, so agents reading the libraries during a
+    refresh see either the old or the new set, never an empty or partial one.
+    """
     # Use direct database connection
-    conn = sqlite3.connect("agentic.db")
-    cur = conn.cursor()
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
 
-    # Clear existing data and reset auto-increment counters
-    cur.executescript(
-        """
-        DELETE FROM FunctionTemplateLibrary;
-        DELETE FROM FunctionOutputLibrary;
-        DELETE FROM FunctionParametersLibrary;
-        DELETE FROM StrategyLibrary;
-        DELETE FROM GoalInstance;
-        
-        -- Reset auto-increment counters to start from 1
-        DELETE FROM sqlite_sequence WHERE name='FunctionTemplateLibrary';
-        DELETE FROM sqlite_sequence WHERE name='FunctionOutputLibrary';
-        DELETE FROM sqlite_sequence WHERE name='FunctionParametersLibrary';
-        DELETE FROM sqlite_sequence WHERE name='StrategyLibrary';
-        DELETE FROM sqlite_sequence WHERE name='GoalInstance';
-        """
-    )
+        # Clear existing data and reset auto-increment counters
+        for table in ("FunctionTemplateLibrary", "FunctionOutputLibrary", "FunctionParametersLibrary",
+                      "StrategyLibrary"):
+            cur.execute(f"DELETE FROM {table}")
+            # Reset auto-increment counters to start from 1
+            cur.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+        # Only the template goals: session goals (and their strategies) are runtime history, and
+        # GoalIDs keep counting up so a new goal never reuses the ID of an archived one
+        cur.execute("DELETE FROM GoalInstance WHERE SessionID IS NULL")
 
-    # Insert goals first
-    for gname, gtarget, gdesc, gvalidation in goals:
-        cur.execute(
-            """INSERT INTO GoalInstance
-                (GoalName, GoalTarget, GoalDescription, GoalValidation)
-                VALUES (?, ?, ?, ?)
-            """,
-            (gname, gtarget, gdesc, gvalidation),
-        )
+        # Insert goals first; the records are already the parameter tuples
+        cur.executemany(insert_sql("GoalInstance", GoalDef), goals)
 
-    # Insert strategies (keep existing 6 strategies)
-    for sname, starg, sdesc in strategies:
-        cur.execute(
-            """INSERT INTO StrategyLibrary
-                (StrategyName,StrategyTarget,StrategyDescription)
-                VALUES (?,?,?)""",
-            (sname, starg, sdesc),
+        # Insert strategies (keep existing 6 strategies) with their plan DAGs
+        cur.executemany(
+            insert_sql("StrategyLibrary", StrategyDef, suffix=("PlanSteps",)),
+            [(*s, json.dumps(plans[s.StrategyName]) if s.StrategyName in plans else None) for s in strategies],
         )
 
-    # Insert the 8 core action templates
-    for fname, stype, fdesc in templates:
-        cur.execute(
-            """INSERT INTO FunctionTemplateLibrary
-                    (FunctionName,StrategyType,FunctionDescription)
-                    VALUES (?,?,?)""",
-            (fname, stype, fdesc),
-        )
-        fid = cur.lastrowid
-
-        # Insert outputs for this function
-        for oname, oval, otype in outputs.get(fname, []):
-            cur.execute(
-                """INSERT INTO FunctionOutputLibrary
-                        (FunctionTemplateID,OutputName,OutputValue,Type)
-                        VALUES (?,?,?,?)""",
-                (fid, oname, oval, otype),
-            )
-
-        # Insert parameters for this function
-        for pname, pval, ptype in params.get(fname, []):
-            cur.execute(
-                """INSERT INTO FunctionParametersLibrary
-                        (FunctionTemplateID,ParameterName,ParameterValue,Type)
-                        VALUES (?,?,?,?)""",
-                (fid, pname, pval, ptype),
-            )
+        # Insert the 8 core action templates, then their outputs and parameters
+        output_sql = insert_sql("FunctionOutputLibrary", OutputDef, prefix=("FunctionTemplateID",))
+        param_sql = insert_sql("FunctionParametersLibrary", ParameterDef, prefix=("FunctionTemplateID",))
+        for t in templates:
+            cur.execute(insert_sql("FunctionTemplateLibrary", FunctionTemplate), t)
+            fid = cur.lastrowid
+            cur.executemany(output_sql, [(fid, *o) for o in outputs.get(t.FunctionName, [])])
+            cur.executemany(param_sql, [(fid, *p) for p in params.get(t.FunctionName, [])])
 
-    conn.commit()
-    logger.info(f"✅ Template-library tables populated with 8 core actions in agentic.db")
-    logger.info(f"   📋 Functions: {len(templates)} core actions")
-    logger.info(f"   📋 Strategies: {len(strategies)} strategies")
-    logger.info(f"   📋 Goals: {len(goals)} goals")
-    conn.close()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    logger.info("✅ Template-library tables populated with 8 core actions in %s", db_path)
+    logger.info("   📋 Functions: %s core actions", len(templates))
+    logger.info("   📋 Strategies: %s strategies", len(strategies))
+    logger.info("   📋 Goals: %s goals", len(goals))
 
 if __name__ == "__main__":
     populate_template_libraries()
\ No newline at end of file
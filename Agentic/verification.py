@@ -0,0 +1,345 @@
+"""
+Verification engine for the built databases.
+
+Every check opens its own read-only connection and all checks of all databases
+run concurrently, so a verification takes about as long as its slowest check
+(usually ``quick_check`` on knowledge.db). Two tiers:
+
+- ``fast`` (every startup/deploy): ``PRAGMA quick_check``, ``foreign_key_check``,
+  JSON validity on a random sample of rows, and the expected row counts derived
+  from the template definitions in ``Agentic.templates``.
+- ``deep`` (nightly): ``PRAGMA integrity_check``, JSON validity of every row,
+  dangling step references and drift of the ``table_stats`` row counters.
+
+``verify()`` returns a JSON-serialisable report; the CLI writes it to a file
+and exits non-zero when any check fails.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from .stats import STATS_TABLE
+
+logger = logging.getLogger("VERIFICATION")
+
+TIERS = ("fast", "deep")
+
+# (table, column, required non-empty) for the JSON columns of knowledge.db
+KNOWLEDGE_JSON_COLUMNS = [
+    ("harvested_steps_ultramin", "params_json", False),
+    ("harvested_steps_ultramin", "produces_json", False),
+    ("harvested_steps_ultramin", "references_json", False),
+    ("doc_functions_ultramin", "tokens_json", True),
+]
+EMPTY_JSON = ("", "{}", "[]", "null")
+
+
+@dataclass
+class CheckResult:
+    name: str
+    status: str = "ok"            # "ok", "warn", "fail", "error"
+    seconds: float = 0.0
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Check:
+    name: str
+    func: Callable[[sqlite3.Connection, "Context"], CheckResult]
+    tiers: tuple = TIERS
+
+
+@dataclass
+class Context:
+    tier: str
+    sample: int
+    rng: random.Random
+    empty_params_warn: float
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, check_same_thread=False)
+
+
+def _tables(conn: sqlite3.Connection) -> set:
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+
+# ─── Generic checks ──────────────────────────────────────────────────────
+
+
+def check_integrity(conn: sqlite3.Connection, ctx: Context) -> CheckResult:
+    pragma = "integrity_check" if ctx.tier == "deep" else "quick_check"
+    rows = [r[0] for r in conn.execute(f"PRAGMA {pragma}(100)")]
+    if rows == ["ok"]:
+        return CheckResult(pragma)
+    return CheckResult(pragma, "fail", details={"errors": rows})
+
+
+def check_foreign_keys(conn: sqlite3.Connection, ctx: Context) -> CheckResult:
+    dangling: Dict[str, int] = {}
+    examples: List[Dict[str, Any]] = []
+    for table, rowid, parent, _ in conn.execute("PRAGMA foreign_key_check"):
+        key = f"{table} -> {parent}"
+        dangling[key] = dangling.get(key, 0) + 1
+        if len(examples) < 10:
+            examples.append({"table": table, "rowid": rowid, "parent": parent})
+    if not dangling:
+        return CheckResult("foreign_key_check")
+    return CheckResult("foreign_key_check", "fail", details={"dangling": dangling, "examples": examples})
+
+
+def check_stats_drift(conn: sqlite3.Connection, ctx: Context) -> CheckResult:
+    """Trigger-maintained counters in ``table_stats`` must equal ``COUNT(*)``."""
+    if STATS_TABLE not in _tables(conn):
+        return CheckResult("table_stats_drift", "warn", details={"reason": f"no {STATS_TABLE} table"})
+    drift = {}
+    for table, rows in conn.execute(f"SELECT table_name, row_count FROM {STATS_TABLE}").fetchall():
+        actual = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        if actual != rows:
+            drift[table] = {"counter": rows, "actual": actual}
+    return CheckResult("table_stats_drift", "fail" if drift else "ok", details={"drift": drift} if drift else {})
+
+
+# ─── agentic.db ──────────────────────────────────────────────────────────
+
+
+def check_template_cardinality(conn: sqlite3.Connection, ctx: Context) -> CheckResult:
+    """Library tables must hold exactly what ``Agentic.templates`` defines."""
+    from .templates import goals, outputs, params, plans, strategies, templates
+
+    problems: List[str] = []
+
+    def expect(label: str, actual: int, expected: int, at_least: bool = False):
+        if actual < expected or (actual != expected and not at_least):
+            problems.append(f"{label}: {actual} rows, expected {'>= ' if at_least else ''}{expected}")
+
+    count = lambda table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    expect("FunctionTemplateLibrary", count("FunctionTemplateLibrary"), len(templates))
+    expect("StrategyLibrary", count("StrategyLibrary"), len(strategies))
+    # Agents add goal instances at runtime; the seeded goals are a lower bound
+    expect("GoalInstance", count("GoalInstance"), len(goals), at_least=True)
+
+    for table, spec in (("FunctionOutputLibrary", outputs), ("FunctionParametersLibrary", params)):
+        actual = dict(conn.execute(f"""
+            SELECT t.FunctionName, COUNT(x.FunctionTemplateID)
+            FROM FunctionTemplateLibrary t LEFT JOIN {table} x USING (FunctionTemplateID)
+            GROUP BY t.FunctionName
+        """).fetchall())
+        for fname, _, _ in templates:
+            expect(f"{table}[{fname}]", actual.get(fname, 0), len(spec.get(fname, [])))
+
+    stored = dict(conn.execute("SELECT StrategyName, PlanSteps FROM StrategyLibrary").fetchall())
+    for sname, steps in plans.items():
+        raw = stored.get(sname)
+        try:
+            if raw is None or json.loads(raw) != steps:
+                problems.append(f"StrategyLibrary[{sname}]: PlanSteps differ from Agentic.templates.plans")
+        except ValueError:
+            problems.append(f"StrategyLibrary[{sname}]: PlanSteps is not valid JSON")
+
+    return CheckResult("template_cardinality", "fail" if problems else "ok",
+                       details={"problems": problems} if problems else {})
+
+
+# ─── knowledge.db ────────────────────────────────────────────────────────
+
+
+def _sample_rowids(conn: sqlite3.Connection, table: str, n: int, rng: random.Random) -> Optional[List[int]]:
+    """``n`` random rowids in range, or None when the table is small enough to read whole."""
+    lo, hi = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+    if lo is None or hi - lo + 1 <= n:
+        return None
+    return rng.sample(range(lo, hi + 1), n)
+
+
+def check_json_columns(conn: sqlite3.Connection, ctx: Context) -> CheckResult:
+    """Invalid JSON fails; empty required columns fail; mostly-empty params warn.
+
+    The fast tier probes a random sample of rowids (index lookups, no scan);
+    the deep tier reads every row.
+    """
+    present = _tables(conn)
+    status, details = "ok", {}
+    for table, column, required in KNOWLEDGE_JSON_COLUMNS:
+        if table not in present:
+            continue
+        rowids = _sample_rowids(conn, table, ctx.sample, ctx.rng) if ctx.tier == "fast" else None
+        where = "" if rowids is None else f"WHERE rowid IN ({','.join(map(str, rowids))})"
+        checked, invalid, empty, examples = conn.execute(f"""
+            SELECT COUNT(*),
+                   SUM({column} IS NOT NULL AND NOT json_valid({column})),
+                   SUM({column} IS NULL OR trim({column}) IN {EMPTY_JSON!r}),
+                   (SELECT group_concat(rowid) FROM (SELECT rowid FROM {table} {where}
+                        {'AND' if where else 'WHERE'} {column} IS NOT NULL AND NOT json_valid({column}) LIMIT 10))
+            FROM {table} {where}
+        """).fetchone()
+        invalid, empty = invalid or 0, empty or 0
+        entry = {"checked": checked, "sampled": rowids is not None, "invalid": invalid, "empty": empty}
+        if invalid:
+            entry["invalid_rowids"] = [int(r) for r in examples.split(",")] if examples else []
+            status = "fail"
+        elif required and empty:
+            status = "fail"
+        elif column == "params_json" and checked and empty / checked > ctx.empty_params_warn and status == "ok":
+            status = "warn"
+        details[f"{table}.{column}"] = entry
+    return CheckResult("json_columns", status, details=details)
+
+
+def check_knowledge_cardinality(conn: sqlite3.Connection, ctx: Context) -> CheckResult:
+    present = _tables(conn)
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+              for t in ("harvested_steps_ultramin", "doc_functions_ultramin") if t in present}
+    missing = [t for t in ("harvested_steps_ultramin", "doc_functions_ultramin") if t not in present]
+    if missing:
+        return CheckResult("knowledge_cardinality", "fail", details={"missing_tables": missing})
+    status = "ok" if counts["harvested_steps_ultramin"] else "fail"
+    if status == "ok" and not counts["doc_functions_ultramin"]:
+        status = "warn"  # the doc scrape is optional (offline builds)
+    return CheckResult("knowledge_cardinality", status, details={"rows": counts})
+
+
+def check_step_refs(conn: sqlite3.Connection, ctx: Context) -> CheckResult:
+    """Every ``step_refs_ultramin`` row must point at an existing step."""
+    if "step_refs_ultramin" not in _tables(conn):
+        return CheckResult("step_refs")
+    dangling = conn.execute("""
+        SELECT COUNT(*) FROM step_refs_ultramin r
+        WHERE NOT EXISTS (SELECT 1 FROM harvested_steps_ultramin s WHERE s.step_id = r.step_id)
+    """).fetchone()[0]
+    return CheckResult("step_refs", "fail" if dangling else "ok", details={"dangling": dangling} if dangling else {})
+
+
+def check_step_occurrences(conn: sqlite3.Connection, ctx: Context) -> CheckResult:
+    """Every ``step_occurrences_ultramin`` row must point at a stored (canonical) step."""
+    if "step_occurrences_ultramin" not in _tables(conn):
+        return CheckResult("step_occurrences")
+    dangling = conn.execute("""
+        SELECT COUNT(*) FROM step_occurrences_ultramin o
+        WHERE NOT EXISTS (SELECT 1 FROM harvested_steps_ultramin s WHERE s.step_id = o.step_id)
+    """).fetchone()[0]
+    return CheckResult("step_occurrences", "fail" if dangling else "ok",
+                       details={"dangling": dangling} if dangling else {})
+
+
+CHECKS: Dict[str, List[Check]] = {
+    "agentic": [
+        Check("integrity", check_integrity),
+        Check("foreign_key_check", check_foreign_keys),
+        Check("template_cardinality", check_template_cardinality),
+        Check("table_stats_drift", check_stats_drift, tiers=("deep",)),
+    ],
+    "knowledge": [
+        Check("integrity", check_integrity),
+        Check("foreign_key_check", check_foreign_keys),
+        Check("json_columns", check_json_columns),
+        Check("knowledge_cardinality", check_knowledge_cardinality),
+        Check("step_refs", check_step_refs, tiers=("deep",)),
+        Check("step_occurrences", check_step_occurrences, tiers=("deep",)),
+        Check("table_stats_drift", check_stats_drift, tiers=("deep",)),
+    ],
+}
+
+
+def _run(check: Check, path: str, ctx: Context) -> CheckResult:
+    t0 = time.perf_counter()
+    try:
+        conn = _connect(path)
+        try:
+            result = check.func(conn, ctx)
+        finally:
+            conn.close()
+    except Exception as e:
+        result = CheckResult(check.name, "error", details={"error": str(e)})
+    result.seconds = round(time.perf_counter() - t0, 4)
+    return result
+
+
+def verify(
+    db_paths: Mapping[str, str],
+    tier: str = "fast",
+    sample: int = 500,
+    max_workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    empty_params_warn: float = 0.5,
+) -> Dict[str, Any]:
+    """Run the ``tier`` checks for ``{kind: path}`` (kinds are keys of ``CHECKS``)."""
+    if tier not in TIERS:
+        raise ValueError(f"Unknown tier {tier!r}; expected one of {TIERS}")
+    t0 = time.perf_counter()
+    report: Dict[str, Any] = {
+        "tier": tier,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "databases": {},
+    }
+    jobs = []
+    for kind, path in db_paths.items():
+        entry = report["databases"][kind] = {"path": path, "checks": []}
+        if not os.path.exists(path):
+            entry["checks"].append(asdict(CheckResult("exists", "fail", details={"error": "file not found"})))
+            continue
+        for check in CHECKS[kind]:
+            if tier in check.tiers:
+                ctx = Context(tier, sample, random.Random(seed), empty_params_warn)
+                jobs.append((kind, check, path, ctx))
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(jobs), 1), thread_name_prefix="verify") as pool:
+        futures = [(kind, pool.submit(_run, check, path, ctx)) for kind, check, path, ctx in jobs]
+        for kind, fut in futures:
+            report["databases"][kind]["checks"].append(asdict(fut.result()))
+
+    statuses = [c["status"] for db in report["databases"].values() for c in db["checks"]]
+    report["ok"] = not any(s in ("fail", "error") for s in statuses)
+    report["warnings"] = statuses.count("warn")
+    report["seconds"] = round(time.perf_counter() - t0, 4)
+    return report
+
+
+def log_report(report: Dict[str, Any]):
+    icons = {"ok": "✅", "warn": "⚠️", "fail": "❌", "error": "💥"}
+    logger.info("🔍 Verification (%s) in %.2fs", report['tier'], report['seconds'])
+    for kind, db in report["databases"].items():
+        for c in db["checks"]:
+            line = f"   {icons[c['status']]} {kind + '.' + c['name']:<34} {c['seconds']:.3f}s"
+            if c["status"] != "ok":
+                line += f"  {json.dumps(c['details'], ensure_ascii=False)[:300]}"
+            logger.log(logging.INFO if c["status"] in ("ok", "warn") else logging.ERROR, line)
+
+
+def write_report(report: Dict[str, Any], path: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Verify agentic.db and knowledge.db")
+    ap.add_argument("--agentic", default="agentic.db")
+    ap.add_argument("--knowledge", default="knowledge.db")
+    ap.add_argument("--tier", choices=TIERS, default="fast")
+    ap.add_argument("--sample", type=int, default=500, help="Rows per JSON column in the fast tier")
+    ap.add_argument("--report", help="Write the JSON report here")
+    args = ap.parse_args()
+    from .logs import start_logging
+
+    start_logging(logging.INFO)
+    report = verify({"agentic": args.agentic, "knowledge": args.knowledge}, tier=args.tier, sample=args.sample)
+    log_report(report)
+    if args.report:
+        write_report(report, args.report)
+    raise SystemExit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Startup benchmark for the CLI and worker entry points.
+
+Runs each entry point in a fresh interpreter under ``python -X importtime``,
+takes the best of ``--repeat`` runs (interpreter start-up itself excluded) and
+fails when an entry point exceeds its time budget or loads a module it must
+not need (heavy optional dependencies). The forbidden-module check is exact and
+machine independent; the time budgets are a guard against large regressions.
+
+    python benchmarks/import_budget.py              # check every budget
+    python benchmarks/import_budget.py --top 15     # also show the heaviest imports
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, NamedTuple, Sequence, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ULTRAMIN = os.path.join(ROOT, "ultramin_package")
+
+HEAVY = ("requests", "bs4", "lxml", "yaml", "pypdf", "PyPDF2", "numpy", "pyarrow")
+
+
+class EntryPoint(NamedTuple):
+    name: str
+    code: str
+    budget_ms: float
+    forbidden: Sequence[str] = HEAVY
+
+
+ENTRY_POINTS = [
+    EntryPoint("Agentic", "import Agentic", 40),
+    EntryPoint("Agentic.schema", "import Agentic.schema", 40),
+    EntryPoint("Agentic.retention", "import Agentic.retention", 60),
+    EntryPoint("Agentic.matcher", "import Agentic.matcher", 40, forbidden=HEAVY + ("scipy",)),
+    EntryPoint("Agentic.param_checks", "import Agentic.param_checks", 40),
+    EntryPoint("Agentic.logs", "import Agentic.logs", 40),
+    EntryPoint("populator", "from unified_database_populator import UnifiedDatabasePopulator; "
+                            "UnifiedDatabasePopulator()", 120,
+               forbidden=HEAVY + ("multiprocessing", "concurrent.futures.process")),
+    EntryPoint("harvest_pdf_ultramin", "import harvest_pdf_ultramin", 60),
+    EntryPoint("scrape_docs_ultramin", "import scrape_docs_ultramin", 60),
+    EntryPoint("query_steps_ultramin", "import query_steps_ultramin", 60),
+    EntryPoint("codegen_ultramin", "import codegen_ultramin", 60),
+]
+
+
+def import_profile(code: str) -> List[Tuple[int, int, str]]:
+    """``(self_us, cumulative_us, module)`` per line of ``-X importtime`` output;
+    leading spaces of the module name encode nesting depth."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, ULTRAMIN]))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{proc.stderr[-2000:]}")
+    out = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        out.append((int(self_us), int(cum_us), name.rstrip()[1:]))
+    return out
+
+
+def measure(entry: EntryPoint, startup: set, repeat: int) -> Tuple[float, set, List[Tuple[int, str]]]:
+    best, modules, heaviest = None, set(), []
+    for _ in range(repeat):
+        profile = [p for p in import_profile(entry.code) if p[2].strip() not in startup]
+        total = sum(cum for _, cum, name in profile if not name.startswith(" ")) / 1000
+        if best is None or total < best:
+            best = total
+            heaviest = sorted(((cum, name.strip()) for _, cum, name in profile), reverse=True)
+        modules = {name.strip() for _, _, name in profile}
+    return best, modules, heaviest
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Check start-up import time budgets")
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per entry point (best is kept)")
+    ap.add_argument("--top", type=int, default=0, help="Show the N heaviest imports per entry point")
+    ap.add_argument("--only", action="append", help="Entry point name (repeatable)")
+    ap.add_argument("--scale", type=float, default=1.0, help="Multiply budgets (slow CI machines)")
+    args = ap.parse_args()
+
+    # Modules the bare interpreter imports anyway (site, encodings, .pth hooks)
+    startup = {name.strip() for _, _, name in import_profile("pass")}
+    failures = 0
+    for entry in ENTRY_POINTS:
+        if args.only and entry.name not in args.only:
+            continue
+        ms, modules, heaviest = measure(entry, startup, args.repeat)
+        budget = entry.budget_ms * args.scale
+        loaded = [f for f in entry.forbidden if any(m == f or m.startswith(f + ".") for m in modules)]
+        ok = ms <= budget and not loaded
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {entry.name:<22} {ms:7.1f} ms  (budget {budget:.0f} ms)"
+              + (f"  loads {', '.join(loaded)}" if loaded else ""))
+        for cum, name in heaviest[:args.top]:
+            print(f"       {cum / 1000:7.1f} ms  {name}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
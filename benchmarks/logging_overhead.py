@@ -0,0 +1,108 @@
+"""
+Per-call cost of a log statement on the caller's thread.
+
+Disabled: a ``logger.debug`` below the effective level, written with an
+f-string (the message is built before the call) and with lazy %-style
+arguments (one ``isEnabledFor`` check). Enabled: ``logger.info`` through a
+synchronous ``FileHandler`` and through ``Agentic.logs`` (queue handler with a
+background writer to a rotating file), timed over bursts of calls. For the
+queue pipeline, the time to drain the queue at stop is reported separately.
+
+Exits non-zero if lazy disabled calls are not cheaper than f-strings or if the
+queue pipeline costs the caller more than a synchronous file write.
+
+    python benchmarks/logging_overhead.py              # 20000 calls per case
+    python benchmarks/logging_overhead.py --calls 100000
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Agentic.logs import start_logging, stop_logging  # noqa: E402
+
+STEP = {"action": "create_offset_plane", "params": {"offset_mm": 120.0}, "source": "manual.pdf"}
+
+
+def per_call(fn: Callable[[int], None], n: int, burst: int = 500, pause: float = 0.02) -> float:
+    """Median microseconds per call of ``fn(i)`` over bursts of ``burst`` calls.
+
+    Log statements come in bursts (a stage starting, a plan step failing), so
+    the writer thread gets ``pause`` seconds between bursts to catch up instead
+    of competing with the caller for the GIL, as it would in a tight loop.
+    """
+    samples = []
+    for start in range(0, n, burst):
+        t0 = time.perf_counter()
+        for i in range(start, start + burst):
+            fn(i)
+        samples.append((time.perf_counter() - t0) / burst)
+        if pause:
+            time.sleep(pause)
+    return statistics.median(samples) * 1e6
+
+
+def reset_root():
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+        h.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Per-call logging overhead, disabled and enabled")
+    ap.add_argument("--calls", type=int, default=20000)
+    args = ap.parse_args()
+    n = args.calls
+    log = logging.getLogger("BENCH")
+    rows: List[Tuple[str, float]] = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reset_root()
+        logging.getLogger().setLevel(logging.INFO)
+        rows.append(("disabled debug, f-string",
+                     per_call(lambda i: log.debug(f"step {i}: {STEP['action']} {STEP['params']}"), n, pause=0)))
+        rows.append(("disabled debug, %-args",
+                     per_call(lambda i: log.debug("step %s: %s %s", i, STEP["action"], STEP["params"]), n, pause=0)))
+
+        handler = logging.FileHandler(os.path.join(tmp, "sync.log"), encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+        logging.getLogger().addHandler(handler)
+        rows.append(("enabled info, FileHandler",
+                     per_call(lambda i: log.info("step %s: %s %s", i, STEP["action"], STEP["params"]), n)))
+        reset_root()
+
+        start_logging(logging.INFO, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+                      log_file=os.path.join(tmp, "queued.log"), max_bytes=5 << 20, console=False)
+        rows.append(("enabled info, Agentic.logs",
+                     per_call(lambda i: log.info("step %s: %s %s", i, STEP["action"], STEP["params"]), n)))
+        t0 = time.perf_counter()
+        stop_logging()
+        drain = time.perf_counter() - t0
+
+    print(f"{'case':<30} {'us/call':>9}")
+    for case, us in rows:
+        print(f"{case:<30} {us:>9.3f}")
+    print(f"{'(writer drain at stop)':<30} {drain * 1000:>7.1f}ms")
+
+    cost = dict(rows)
+    failures = []
+    if cost["disabled debug, %-args"] >= cost["disabled debug, f-string"]:
+        failures.append("lazy %-args are not cheaper than f-strings when disabled")
+    if cost["enabled info, Agentic.logs"] >= cost["enabled info, FileHandler"]:
+        failures.append("the queue pipeline costs the caller more than a synchronous FileHandler")
+    for f in failures:
+        print(f"FAIL {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
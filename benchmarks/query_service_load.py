@@ -0,0 +1,175 @@
+"""
+Load test for the local query service: QPS and latency percentiles.
+
+Builds a synthetic knowledge.db (``--steps`` harvested steps in manuals of 500
+steps, plus doc functions) and an agentic.db library. It then starts
+``python -m Agentic.query_service serve`` on a Unix socket (TCP where there are
+none). ``--clients`` processes each run the same query mix for ``--seconds``:
+lookup_step, match_docs, dependency_subgraph and library. Three modes run:
+
+- direct:  what callers do today, ``sqlite3.connect`` + query + close per call
+- service: one keep-alive ``QueryClient`` call per query
+- batch:   ``--batch`` queries per ``/batch`` round trip
+
+The report shows queries/s and the p50/p99 latency of each call (one call is a
+whole batch in batch mode), then the service's result-cache counters. Client
+and server share the machine's CPUs, whose count is printed with the results.
+
+    python benchmarks/query_service_load.py
+    python benchmarks/query_service_load.py --steps 200000 --clients 8 --seconds 5
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "ultramin_package")]
+
+from Agentic.migrations import migrate  # noqa: E402
+from Agentic.query_service import QUERIES, QueryClient, wait_ready  # noqa: E402
+from Agentic.schema import MIGRATIONS  # noqa: E402
+from Agentic.templates import populate_template_libraries  # noqa: E402
+from harvest_pdf_ultramin import _classify, _step_row  # noqa: E402
+from schema_ultra_combo import HarvestedStep, init_db, insert_sql  # noqa: E402
+from scrape_docs_ultramin import insert_docs  # noqa: E402
+
+LINES = [
+    "Create an offset plane from the xy plane with an offset of 120 mm",
+    "Create a point on Plane.1 at 10 mm, 20 mm",
+    "Create a spline through Point.1, Point.2 and Point.3",
+    "Create a line Point-Direction from Point.4 along the zx plane",
+    "Extrude surface Spline.2 along Line.1",
+]
+LABELS = ["create_plane_offset", "create_spline", "create_line_pt_dir", "create_point_coord", "extrude_surface"]
+FACTORIES = ["HybridShapeFactory", "ShapeFactory", "SketcherFactory", "PartFactory"]
+METHODS = ["AddNewPlaneOffset", "AddNewSpline", "AddNewLinePtDir", "AddNewPointCoord", "AddNewExtrude",
+           "AddNewJoin", "AddNewSymmetry", "AddNewLoft", "AddNewPlane3Points", "AddNewPointOnPlane"]
+
+
+def build(tmp: str, steps: int) -> Tuple[str, str]:
+    knowledge = os.path.join(tmp, "knowledge.db")
+    conn = init_db(knowledge)
+    rows = [_step_row(i, LINES[i % len(LINES)], _classify(LINES[i % len(LINES)]), f"manual-{i // 500}.pdf")
+            for i in range(1, steps + 1)]
+    with conn:
+        conn.executemany(insert_sql("harvested_steps_ultramin", HarvestedStep), rows)
+    insert_docs(conn, [(f, f"{m}{k or ''}", f"http://docs/{f}.htm") for f in FACTORIES for m in METHODS
+                       for k in range(25)])
+    conn.close()
+
+    agentic = os.path.join(tmp, "agentic.db")
+    conn = sqlite3.connect(agentic)
+    migrate(conn, MIGRATIONS)
+    conn.close()
+    populate_template_libraries(agentic)
+    return knowledge, agentic
+
+
+def workload(rnd: random.Random, steps: int) -> Tuple[str, Dict[str, Any]]:
+    r = rnd.random()
+    if r < 0.5:
+        return "lookup_step", {"step_id": rnd.randint(1, steps)}
+    if r < 0.75:
+        return "match_docs", {"action_label": rnd.choice(LABELS), "limit": 10}
+    if r < 0.95:
+        return "dependency_subgraph", {"step_id": rnd.randint(1, steps), "depth": 3}
+    return "library", {"kind": rnd.choice(("functions", "strategies", "goals"))}
+
+
+def client(mode: str, target: Any, steps: int, seconds: float, batch: int) -> Tuple[int, List[float]]:
+    rnd = random.Random(os.getpid())
+    latencies: List[float] = []
+    done = 0
+    if mode != "direct":
+        conn = QueryClient(target)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        if mode == "direct":
+            op, args = workload(rnd, steps)
+            db, fn = QUERIES[op]
+            c = sqlite3.connect(target[db])
+            try:
+                fn(c, **args)
+            finally:
+                c.close()
+            done += 1
+        elif mode == "service":
+            op, args = workload(rnd, steps)
+            conn.call(op, **args)
+            done += 1
+        else:
+            results = conn.batch([workload(rnd, steps) for _ in range(batch)])
+            assert not any("error" in r for r in results), results[:1]
+            done += batch
+        latencies.append(time.perf_counter() - t0)
+    if mode != "direct":
+        conn.close()
+    return done, latencies
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run(mode: str, target: Any, args) -> Tuple[float, float, float]:
+    with ProcessPoolExecutor(args.clients) as pool:
+        pool.submit(sum, ()).result()  # start the workers before the clock runs
+        futures = [pool.submit(client, mode, target, args.steps, args.seconds, args.batch)
+                   for _ in range(args.clients)]
+        results = [f.result() for f in futures]
+    done = sum(n for n, _ in results)
+    latencies = [t for _, lat in results for t in lat]
+    return done / args.seconds, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Query service load test: QPS and p99 vs direct sqlite3.connect")
+    ap.add_argument("--steps", type=int, default=50000)
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--batch", type=int, default=20)
+    ap.add_argument("--pool-size", type=int, default=4)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        knowledge, agentic = build(tmp, args.steps)
+        if hasattr(socket, "AF_UNIX"):
+            listen, address = ["--socket", os.path.join(tmp, "query.sock")], f"unix:{os.path.join(tmp, 'query.sock')}"
+        else:
+            listen, address = ["--port", "8799"], "http://127.0.0.1:8799"
+        server = subprocess.Popen([sys.executable, "-m", "Agentic.query_service", "serve", *listen,
+                                   "--knowledge", knowledge, "--agentic", agentic,
+                                   "--pool-size", str(args.pool_size)], cwd=ROOT)
+        try:
+            if not wait_ready(address, timeout=30):
+                print("❌ Query service did not start")
+                return 1
+            print(f"{args.steps} steps, {args.clients} clients, {args.seconds:.0f}s per mode, "
+                  f"batch {args.batch}, pool {args.pool_size}, {os.cpu_count()} CPUs")
+            print(f"{'mode':<8} {'queries/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+            direct = {"knowledge": knowledge, "agentic": agentic}
+            for mode, target in (("direct", direct), ("service", address), ("batch", address)):
+                qps, p50, p99 = run(mode, target, args)
+                print(f"{mode:<8} {qps:>10.0f} {p50:>8.2f} {p99:>8.2f}")
+            with QueryClient(address) as c:
+                print("cache:", json.dumps(c.stats()["cache"]))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
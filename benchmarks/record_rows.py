@@ -0,0 +1,146 @@
+"""
+Per-row memory and allocations of the row shapes used in the hot paths.
+
+Harvest: the parse result of one manual line plus the row handed to
+``executemany``, as the old dict + tuple pair and as ``ParsedLine`` +
+``HarvestedStep``. Population/read: one fetched library or step row as
+``sqlite3.Row``, as a dict, and as a record from ``Agentic.records.row_factory``.
+
+For every shape, the rows are built N times under ``tracemalloc``. The report
+shows the bytes still held per row and the number of memory blocks allocated
+per row. Exits non-zero if a record shape costs more than what it replaces.
+
+    python benchmarks/record_rows.py            # 20000 rows per shape
+    python benchmarks/record_rows.py --rows 100000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tracemalloc
+from typing import Callable, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "ultramin_package")]
+
+from Agentic.records import FunctionParameterRow, fetch_records, row_factory  # noqa: E402
+from harvest_pdf_ultramin import _classify, _step_row  # noqa: E402
+from schema_ultra_combo import HarvestedStep, init_db, insert_sql  # noqa: E402
+
+LINES = [
+    "Create an offset plane from the xy plane with an offset of 120 mm",
+    "Create a spline through Point.1, Point.2 and Point.3",
+    "Create a line Point-Direction from Point.4 along the zx plane",
+    "Create a thick surface of Join.1 with a thickness of 2 mm",
+    "Extrude surface Spline.2 along Line.1",
+]
+
+
+def measure(build: Callable[[int], list], n: int) -> Tuple[float, float]:
+    """``(bytes held per row, blocks allocated per row)`` for ``build(n)``."""
+    build(min(n, 100))  # warm caches (regexes, interned strings)
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    rows = build(n)
+    held = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = held.compare_to(base, "filename")
+    size = sum(s.size_diff for s in stats)
+    blocks = sum(max(s.count_diff, 0) for s in stats)
+    assert len(rows) == n
+    return size / n, blocks / n
+
+
+# ─── Harvest ───────────────────────────────────────────────────────────
+
+
+def harvest_dicts(n: int) -> list:
+    out = []
+    for i in range(n):
+        p = _classify(LINES[i % len(LINES)])
+        parsed = dict(action=p.action, params=dict(p.params), produces=list(p.produces),
+                      references=list(p.references))
+        out.append((parsed, (i, parsed["action"], LINES[i % len(LINES)],
+                             json.dumps(parsed["params"]), json.dumps(parsed["produces"]),
+                             json.dumps(parsed["references"]), None, None, "manual.pdf")))
+    return out
+
+
+def harvest_records(n: int) -> list:
+    out = []
+    for i in range(n):
+        p = _classify(LINES[i % len(LINES)])
+        out.append((p, _step_row(i, LINES[i % len(LINES)], p, "manual.pdf")))
+    return out
+
+
+# ─── Reads ─────────────────────────────────────────────────────────────
+
+
+def make_db(n: int) -> sqlite3.Connection:
+    conn = init_db(":memory:")
+    conn.executemany(insert_sql("harvested_steps_ultramin", HarvestedStep),
+                     [r for _, r in harvest_records(n)])
+    conn.execute("""CREATE TABLE FunctionParametersInstance(
+        FunctionParameterID INTEGER PRIMARY KEY, FunctionID INTEGER,
+        ParameterName TEXT, ParameterValue TEXT, Type TEXT)""")
+    conn.executemany("INSERT INTO FunctionParametersInstance VALUES (?,?,?,?,?)",
+                     [(i, i // 4, "Target Table", "DeclarativeKnowledge", "string") for i in range(n)])
+    return conn
+
+
+STEP_SQL = "SELECT " + ", ".join(HarvestedStep._fields) + " FROM harvested_steps_ultramin"
+PARAM_SQL = "SELECT * FROM FunctionParametersInstance"
+
+
+def reader(conn: sqlite3.Connection, sql: str, factory) -> Callable[[int], list]:
+    def build(n: int) -> list:
+        cur = conn.cursor()
+        cur.row_factory = factory
+        return cur.execute(sql + f" LIMIT {n}").fetchall()
+    return build
+
+
+def dict_factory(cursor, row):
+    return {d[0]: v for d, v in zip(cursor.description, row)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Per-row memory of dict/Row vs record shapes")
+    ap.add_argument("--rows", type=int, default=20000)
+    args = ap.parse_args()
+    conn = make_db(args.rows)
+
+    cases: List[Tuple[str, str, Callable[[int], list]]] = [
+        ("harvest", "dict + tuple", harvest_dicts),
+        ("harvest", "ParsedLine + HarvestedStep", harvest_records),
+        ("read steps", "sqlite3.Row", reader(conn, STEP_SQL, sqlite3.Row)),
+        ("read steps", "dict", reader(conn, STEP_SQL, dict_factory)),
+        ("read steps", "HarvestedStep", reader(conn, STEP_SQL, row_factory(HarvestedStep))),
+        ("read params", "sqlite3.Row", reader(conn, PARAM_SQL, sqlite3.Row)),
+        ("read params", "dict", reader(conn, PARAM_SQL, dict_factory)),
+        ("read params", "FunctionParameterRow",
+         lambda n: fetch_records(conn, FunctionParameterRow, PARAM_SQL + f" LIMIT {n}")),
+    ]
+    results = {}
+    print(f"{'path':<12} {'shape':<28} {'bytes/row':>10} {'blocks/row':>11}")
+    for path, shape, build in cases:
+        size, blocks = measure(build, args.rows)
+        results.setdefault(path, []).append((shape, size, blocks))
+        print(f"{path:<12} {shape:<28} {size:>10.1f} {blocks:>11.2f}")
+
+    failures = []
+    for path, rows in results.items():
+        record = rows[-1]  # the record shape is listed last for each path
+        for shape, size, blocks in rows[:-1]:
+            if record[1] > size or record[2] > blocks:
+                failures.append(f"{path}: {record[0]} is not smaller than {shape}")
+    for f in failures:
+        print(f"FAIL {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Concurrent ingest into one knowledge.db vs a sharded corpus.
+
+``--workers`` processes each write ``--docs`` synthetic manuals of ``--steps``
+steps, one transaction per manual, the way ``harvest`` stores a PDF. Single-file
+writers queue on the database lock (``busy_timeout``). Sharded writers only
+queue when two manuals hash to the same shard. The report shows the wall time,
+the steps written per second, and how long a ``query_steps`` filter takes on the
+single file vs a fan-out over the shards.
+
+    python benchmarks/shard_ingest.py
+    python benchmarks/shard_ingest.py --workers 8 --docs 16 --steps 5000 --shards 8
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "ultramin_package")]
+
+from harvest_pdf_ultramin import _classify, _step_row  # noqa: E402
+from query_steps_ultramin import find_steps  # noqa: E402
+from schema_ultra_combo import HarvestedStep, init_db, insert_sql  # noqa: E402
+from shards_ultramin import ShardRouter  # noqa: E402
+
+LINES = [
+    "Create an offset plane from the xy plane with an offset of 120 mm",
+    "Create a spline through Point.1, Point.2 and Point.3",
+    "Create a line Point-Direction from Point.4 along the zx plane",
+    "Create a thick surface of Join.1 with a thickness of 2 mm",
+    "Extrude surface Spline.2 along Line.1",
+]
+FILTER = {"offset_mm": (">", 100)}
+
+
+def manual(doc: str, steps: int) -> List[HarvestedStep]:
+    return [_step_row(i, LINES[i % len(LINES)], _classify(LINES[i % len(LINES)]), doc)
+            for i in range(1, steps + 1)]
+
+
+def write_single(db_path: str, docs: List[str], steps: int) -> int:
+    conn = init_db(db_path, timeout=300)
+    for doc in docs:
+        rows = manual(doc, steps)
+        with conn:
+            conn.execute("DELETE FROM harvested_steps_ultramin WHERE source_doc = ?", (doc,))
+            base = conn.execute("SELECT COALESCE(MAX(step_id), 0) FROM harvested_steps_ultramin").fetchone()[0]
+            conn.executemany(insert_sql("harvested_steps_ultramin", HarvestedStep),
+                             [r._replace(step_id=base + r.step_id) for r in rows])
+    conn.close()
+    return len(docs) * steps
+
+
+def write_sharded(root: str, docs: List[str], steps: int) -> int:
+    with ShardRouter(root) as router:
+        return sum(router.write_steps(doc, manual(doc, steps)) for doc in docs)
+
+
+def run(writer, target: str, workers: int, docs: int, steps: int) -> float:
+    batches = [[f"manual-{w}-{d}.pdf" for d in range(docs)] for w in range(workers)]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        total = sum(pool.map(writer, [target] * workers, batches, [steps] * workers))
+    assert total == workers * docs * steps
+    return time.perf_counter() - t0
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Concurrent ingest: one knowledge.db vs shards")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--docs", type=int, default=8, help="Manuals per worker")
+    ap.add_argument("--steps", type=int, default=2000, help="Steps per manual")
+    ap.add_argument("--shards", type=int, default=8)
+    args = ap.parse_args()
+    total = args.workers * args.docs * args.steps
+
+    with tempfile.TemporaryDirectory() as tmp:
+        single = os.path.join(tmp, "knowledge.db")
+        init_db(single).close()
+        root = os.path.join(tmp, "shards")
+        ShardRouter(root, steps=args.shards).close()
+
+        t_single = run(write_single, single, args.workers, args.docs, args.steps)
+        t_sharded = run(write_sharded, root, args.workers, args.docs, args.steps)
+
+        conn = sqlite3.connect(single)
+        q_single = timed(lambda: find_steps(conn, FILTER))
+        with ShardRouter(root) as router:
+            q_sharded = timed(lambda: router.find_steps(FILTER))
+            assert len(router.find_steps(FILTER)) == len(find_steps(conn, FILTER))
+        conn.close()
+
+    print(f"{args.workers} workers x {args.docs} manuals x {args.steps} steps ({total} rows), "
+          f"{args.shards} shards, {os.cpu_count()} CPUs")
+    print(f"{'target':<10} {'ingest s':>9} {'rows/s':>10} {'query ms':>9}")
+    print(f"{'single':<10} {t_single:>9.2f} {total / t_single:>10.0f} {q_single * 1000:>9.1f}")
+    print(f"{'sharded':<10} {t_sharded:>9.2f} {total / t_sharded:>10.0f} {q_sharded * 1000:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
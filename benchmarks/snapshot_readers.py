@@ -0,0 +1,110 @@
+"""
+Read throughput vs reader processes: live knowledge.db vs an immutable snapshot.
+
+Builds a synthetic corpus of ``--steps`` harvested steps and publishes a
+snapshot of it (``Agentic.snapshots``). For 1, 2, 4, ... reader processes, every
+process runs the same query mix for ``--seconds``: a point lookup by step_id,
+an indexed parameter filter and a reference lookup. It runs once on a normal
+read-write connection to the live file and once on ``connect_snapshot``
+(``mode=ro&immutable=1`` plus ``mmap_size``). The report shows the total
+queries/s and the scaling relative to one process. Scaling is bounded by the
+number of CPUs, which is printed with the results.
+
+    python benchmarks/snapshot_readers.py
+    python benchmarks/snapshot_readers.py --steps 200000 --workers 1 2 4 8 16
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "ultramin_package")]
+
+from Agentic.snapshots import connect_snapshot, current_snapshot, publish_snapshot  # noqa: E402
+from harvest_pdf_ultramin import _classify, _step_row  # noqa: E402
+from schema_ultra_combo import HarvestedStep, init_db, insert_sql  # noqa: E402
+
+LINES = [
+    "Create an offset plane from the xy plane with an offset of 120 mm",
+    "Create a spline through Point.1, Point.2 and Point.3",
+    "Create a line Point-Direction from Point.4 along the zx plane",
+    "Create an offset plane from the yz plane with an offset of 35 mm",
+    "Extrude surface Spline.2 along Line.1",
+]
+
+
+def build(db_path: str, steps: int):
+    conn = init_db(db_path)
+    rows = [_step_row(i, LINES[i % len(LINES)], _classify(LINES[i % len(LINES)]), f"manual-{i // 500}.pdf")
+            for i in range(1, steps + 1)]
+    with conn:
+        conn.executemany(insert_sql("harvested_steps_ultramin", HarvestedStep), rows)
+    conn.close()
+
+
+def read_live(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(path)
+
+
+def read_snapshot(path: str) -> sqlite3.Connection:
+    return connect_snapshot(path)
+
+
+def reader(open_fn: Callable[[str], sqlite3.Connection], path: str, steps: int, seconds: float) -> int:
+    conn = open_fn(path)
+    rnd = random.Random(os.getpid())
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            conn.execute("SELECT description, params_json FROM harvested_steps_ultramin WHERE step_id = ?",
+                         (rnd.randint(1, steps),)).fetchall()
+            conn.execute("SELECT step_id FROM harvested_steps_ultramin WHERE p_offset_mm BETWEEN ? AND ? LIMIT 20",
+                         (rnd.choice((35.0, 120.0)), 120.0)).fetchall()
+            conn.execute("SELECT step_id FROM step_refs_ultramin WHERE ref = ? AND kind = 'references' LIMIT 20",
+                         (rnd.choice(("Point.1", "Spline.2", "Line.1")),)).fetchall()
+            done += 3
+    conn.close()
+    return done
+
+
+def throughput(open_fn, path: str, steps: int, workers: int, seconds: float) -> float:
+    with ProcessPoolExecutor(workers) as pool:
+        pool.submit(sum, ()).result()  # start the workers before the clock runs
+        futures = [pool.submit(reader, open_fn, path, steps, seconds) for _ in range(workers)]
+        return sum(f.result() for f in futures) / seconds
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Reader scaling: live database vs immutable snapshot")
+    ap.add_argument("--steps", type=int, default=50000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--seconds", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        live = os.path.join(tmp, "knowledge.db")
+        build(live, args.steps)
+        publish_snapshot(live)
+        snapshot = current_snapshot(live)
+
+        print(f"{args.steps} steps, {args.seconds:.0f}s per run, {os.cpu_count()} CPUs")
+        print(f"{'workers':>7} {'live q/s':>10} {'scale':>6} {'snapshot q/s':>13} {'scale':>6}")
+        base: List[float] = []
+        for n in args.workers:
+            rates = [throughput(read_live, live, args.steps, n, args.seconds),
+                     throughput(read_snapshot, snapshot, args.steps, n, args.seconds)]
+            base = base or rates
+            print(f"{n:>7} {rates[0]:>10.0f} {rates[0] / base[0]:>6.2f} {rates[1]:>13.0f} {rates[1] / base[1]:>6.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+Build Graph Executor
+====================
+A small dependency-aware task graph used by ``UnifiedDatabasePopulator``.
+
+Each ``Stage`` declares the resources it reads (``inputs``) and produces
+(``outputs``); a stage depends on every stage that outputs one of its inputs.
+Ready stages run concurrently: ``kind="thread"`` for I/O-bound work and
+``kind="process"`` for CPU-bound work. Every stage reports its wall time, so a
+build takes about as long as its longest chain instead of the sum of all stages.
+
+Builds are incremental, make-style: a stage with a ``fingerprint`` callable is
+skipped ("cached") when its fingerprint matches the one recorded in the build
+manifest and none of its dependencies re-ran. ``when_needed`` stages (backups,
+staging copies) run only if a stage depending on them runs; ``after_changes``
+stages (publishing a rebuilt database) run only if one of their dependencies
+runs, and a failed one makes its dependencies rebuild next time.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from Agentic import telemetry
+
+logger = logging.getLogger("BUILD_GRAPH")
+
+
+@dataclass
+class Stage:
+    """One unit of work in the build graph."""
+
+    name: str
+    func: Callable[..., Any]
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    kind: str = "thread"          # "thread" or "process" (func/args must be picklable)
+    required: bool = True         # a failed optional stage does not block its dependents
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    fingerprint: Optional[Callable[[], Optional[str]]] = None  # None result: always stale
+    when_needed: bool = False     # run only if a dependent runs; never invalidates dependents
+    after_changes: bool = False   # run only if a (non-when_needed) dependency runs
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str                   # "ok", "cached", "failed", "skipped"
+    seconds: float = 0.0
+    value: Any = None
+    error: Optional[str] = None
+    started: float = 0.0
+
+
+class BuildError(RuntimeError):
+    """Raised for an invalid graph (duplicate outputs, cycles)."""
+
+
+def dependencies(stages: Sequence[Stage]) -> Dict[str, List[str]]:
+    """``{stage: [stages it waits for]}`` derived from inputs/outputs."""
+    producer: Dict[str, str] = {}
+    for s in stages:
+        for out in s.outputs:
+            if out in producer:
+                raise BuildError(f"Resource {out!r} is produced by both {producer[out]} and {s.name}")
+            producer[out] = s.name
+    deps = {s.name: sorted({producer[i] for i in s.inputs if i in producer and producer[i] != s.name})
+            for s in stages}
+
+    # Reject cycles up front (Kahn's algorithm)
+    remaining = {k: set(v) for k, v in deps.items()}
+    while remaining:
+        ready = [k for k, v in remaining.items() if not v]
+        if not ready:
+            raise BuildError(f"Dependency cycle between stages: {sorted(remaining)}")
+        for k in ready:
+            del remaining[k]
+        for v in remaining.values():
+            v.difference_update(ready)
+    return deps
+
+
+# ─── Incremental builds ────────────────────────────────────────────────
+
+
+def hash_parts(*parts: Any) -> str:
+    """Stable hash of JSON-serialisable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(path: Optional[str]) -> Dict[str, Any]:
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.warning("⚠️ Ignoring unreadable build manifest %s", path)
+        return {}
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _fingerprint(stage: Stage) -> Optional[str]:
+    if stage.fingerprint is None:
+        return None
+    try:
+        return stage.fingerprint()
+    except Exception as e:
+        logger.warning("⚠️ Could not fingerprint %s: %s", stage.name, e)
+        return None
+
+
+def _topological(stages: Sequence[Stage], deps: Dict[str, List[str]]) -> List[str]:
+    order: List[str] = []
+    pending = [s.name for s in stages]
+    while pending:
+        for name in list(pending):
+            if not any(d in pending for d in deps[name]):
+                order.append(name)
+                pending.remove(name)
+    return order
+
+
+def _ancestors(name: str, deps: Dict[str, List[str]]) -> set:
+    seen, todo = set(), list(deps[name])
+    while todo:
+        d = todo.pop()
+        if d not in seen:
+            seen.add(d)
+            todo.extend(deps[d])
+    return seen
+
+
+def plan(stages: Sequence[Stage], manifest: Dict[str, Any], force: Sequence[str] = ()) -> Dict[str, bool]:
+    """``{stage: must_run}``. ``force`` names stages to rebuild, or ``"all"``."""
+    deps = dependencies(stages)
+    by_name = {s.name: s for s in stages}
+    unknown = set(force) - set(by_name) - {"all"}
+    if unknown:
+        raise BuildError(f"Unknown stages in --force: {sorted(unknown)}")
+    recorded = manifest.get("stages", {})
+    order = _topological(stages, deps)
+    dirty: Dict[str, bool] = {}
+    for name in order:
+        stage = by_name[name]
+        changed = any(dirty[d] for d in deps[name] if not by_name[d].when_needed)
+        if stage.when_needed:
+            dirty[name] = False
+        elif stage.after_changes:
+            dirty[name] = changed or "all" in force or name in force
+        else:
+            fp = _fingerprint(stage)
+            dirty[name] = (
+                changed or "all" in force or name in force or fp is None
+                or recorded.get(name, {}).get("fingerprint") != fp
+            )
+    for name in reversed(order):  # backups and staging copies follow their dependents
+        if by_name[name].when_needed:
+            dirty[name] = any(dirty[o.name] for o in stages if name in deps[o.name])
+    return dirty
+
+
+def _process_init(paths: List[str], trace_id: Optional[str] = None):
+    for p in reversed(paths):
+        if p not in sys.path:
+            sys.path.insert(0, p)
+    if trace_id:
+        telemetry.enable(trace_id)
+
+
+def _timed(func, args, kwargs, name, parent_id=None):
+    t0 = time.perf_counter()
+    with telemetry.span(f"stage.{name}", parent_id=parent_id):
+        value = func(*args, **kwargs)
+    return value, time.perf_counter() - t0, None
+
+
+def _timed_in_process(func, args, kwargs, name, parent_id=None):
+    value, seconds, _ = _timed(func, args, kwargs, name, parent_id)
+    return value, seconds, telemetry.drain()  # spans and counters travel back to the parent
+
+
+def run_graph(
+    stages: Sequence[Stage],
+    max_threads: int = 8,
+    max_processes: int = 2,
+    manifest_path: Optional[str] = None,
+    force: Sequence[str] = (),
+) -> Dict[str, StageResult]:
+    """Run ``stages`` as their dependencies allow; returns a result per stage.
+
+    With ``manifest_path`` only stages whose inputs changed run; the manifest is
+    updated with the fingerprints of the stages that succeeded.
+    """
+    deps = dependencies(stages)
+    by_name = {s.name: s for s in stages}
+    manifest = load_manifest(manifest_path) if manifest_path else {}
+    must_run = plan(stages, manifest, force) if manifest_path else {s.name: True for s in stages}
+    results: Dict[str, StageResult] = {
+        name: StageResult(name, "cached") for name, run in must_run.items() if not run
+    }
+    for name in results:
+        logger.info("💤 %s up to date", name)
+    running: Dict[Any, Tuple[str, float]] = {}
+    t_start = time.perf_counter()
+    parent_span = telemetry.current_span_id()
+
+    threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="stage")
+    processes = None
+    if any(s.kind == "process" and must_run[s.name] for s in stages):
+        # Imported here: multiprocessing is only worth loading when a process stage runs
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import get_context
+
+        processes = ProcessPoolExecutor(
+            max_workers=max_processes, mp_context=get_context("spawn"),
+            initializer=_process_init, initargs=(list(sys.path), telemetry.state()),
+        )
+    try:
+        while len(results) < len(stages):
+            for name, stage in by_name.items():
+                if name in results or any(n == name for n, _ in running.values()):
+                    continue
+                if any(d not in results for d in deps[name]):
+                    continue
+                blocked = [d for d in deps[name]
+                           if results[d].status not in ("ok", "cached") and by_name[d].required]
+                if blocked:
+                    results[name] = StageResult(name, "skipped", error=f"blocked by {', '.join(blocked)}")
+                    logger.warning("⏭️ %s skipped (blocked by %s)", name, ', '.join(blocked))
+                    continue
+                pool, timed = (processes, _timed_in_process) if stage.kind == "process" else (threads, _timed)
+                started = time.perf_counter() - t_start
+                running[pool.submit(timed, stage.func, stage.args, stage.kwargs, name, parent_span)] = (name, started)
+                logger.info("▶️ %s started (%s)", name, stage.kind)
+
+            if not running:
+                continue  # everything left was just skipped
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, started = running.pop(fut)
+                try:
+                    value, seconds, spans = fut.result()
+                    telemetry.merge(spans)
+                    results[name] = StageResult(name, "ok", seconds, value, started=started)
+                    logger.info("✅ %s finished in %.2fs", name, seconds)
+                except Exception as e:
+                    seconds = time.perf_counter() - t_start - started
+                    results[name] = StageResult(name, "failed", seconds, error=str(e), started=started)
+                    level = logging.ERROR if by_name[name].required else logging.WARNING
+                    logger.log(level, "❌ %s failed after %.2fs: %s", name, seconds, e)
+    finally:
+        threads.shutdown(wait=True)
+        if processes is not None:
+            processes.shutdown(wait=True)
+
+    if manifest_path:
+        recorded = manifest.setdefault("stages", {})
+        # Work that never got published must be redone on the next build
+        unpublished = set()
+        for s in stages:
+            if s.after_changes and results[s.name].status in ("failed", "skipped"):
+                unpublished |= _ancestors(s.name, deps)
+        for s in stages:
+            if s.name in unpublished or results[s.name].status in ("failed", "skipped"):
+                recorded.pop(s.name, None)
+            elif results[s.name].status == "ok" and s.fingerprint is not None:
+                # Recomputed after the run: outputs such as schema versions are now current
+                recorded[s.name] = {"fingerprint": _fingerprint(s), "seconds": round(results[s.name].seconds, 3)}
+        save_manifest(manifest_path, manifest)
+    return results
+
+
+def critical_path(stages: Sequence[Stage], results: Dict[str, StageResult]) -> Tuple[float, List[str]]:
+    """Longest chain of measured stage times: the lower bound for the build's wall time."""
+    deps = dependencies(stages)
+    best: Dict[str, Tuple[float, List[str]]] = {}
+
+    def walk(name: str) -> Tuple[float, List[str]]:
+        if name not in best:
+            own = results[name].seconds if name in results else 0.0
+            prev = max((walk(d) for d in deps[name]), default=(0.0, []), key=lambda x: x[0])
+            best[name] = (prev[0] + own, prev[1] + [name])
+        return best[name]
+
+    return max((walk(s.name) for s in stages), default=(0.0, []), key=lambda x: x[0])
+
+
+def log_summary(stages: Sequence[Stage], results: Dict[str, StageResult], wall: float):
+    logger.info("⏱️ STAGE TIMINGS:")
+    for s in stages:
+        r = results[s.name]
+        logger.info("   %-20s %-8s %8.2fs  (start +%.2fs)", s.name, r.status, r.seconds, r.started)
+    chain, path = critical_path(stages, results)
+    total = sum(r.seconds for r in results.values())
+    logger.info("   wall %.2fs | sum of stages %.2fs | longest chain %.2fs (%s)", wall, total, chain, ' → '.join(path))
@@ -0,0 +1,116 @@
+import json
+import sqlite3
+import threading
+
+import codegen_ultramin
+from codegen_ultramin import StubBackend, generate_code
+from schema_ultra_combo import HarvestedStep, init_db, insert_sql
+
+# (action_label, references): Point.1 and Point.2 are implicit names, Spline.1 depends on both
+STEPS = [
+    ("create_point_on_plane", []),
+    ("create_point_coord", []),
+    ("create_spline_through_points", ["Point.1", "Point.2"]),
+    ("extrude_surface", ["Spline.1"]),
+    ("set_parameter", ["Spline.1"]),
+    ("note", []),
+]
+
+
+def make_db(directory, steps=STEPS):
+    directory.mkdir(exist_ok=True)
+    path = str(directory / "knowledge.db")
+    conn = init_db(path)
+    with conn:
+        conn.executemany(insert_sql("harvested_steps_ultramin", HarvestedStep), [
+            HarvestedStep(i, action, f"step {i}", json.dumps({"n": i}), "[]", json.dumps(refs), None, None, "m.pdf")
+            for i, (action, refs) in enumerate(steps, start=1)])
+    conn.close()
+    return path
+
+
+def stored(path):
+    conn = sqlite3.connect(path)
+    rows = dict(conn.execute("SELECT step_id, generated_code FROM harvested_steps_ultramin"))
+    conn.close()
+    return rows
+
+
+class Recorder(StubBackend):
+    """Per-step stub that records the order of calls and the most requests in flight."""
+
+    cacheable = False
+
+    def __init__(self, latency=0.0, fail=()):
+        super().__init__(latency)
+        self.fail = set(fail)
+        self.order, self.contexts = [], {}
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate(self, step, context):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if step["action_label"] in self.fail:
+                raise RuntimeError("backend error")
+            code = super().generate(step, context)
+            with self._lock:
+                self.order.append(step["step_id"])
+                self.contexts[step["step_id"]] = dict(context)
+            return code
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_dependencies_are_generated_first(tmp_path):
+    db = make_db(tmp_path)
+    backend = Recorder(latency=0.01)
+    stats = generate_code(db, backend, workers=4)
+    assert stats["generated"] == 6 and stats["levels"] == 3
+    position = {sid: i for i, sid in enumerate(backend.order)}
+    assert position[3] > max(position[1], position[2])
+    assert min(position[4], position[5]) > position[3]
+    assert set(backend.contexts[3]) == {1, 2} and set(backend.contexts[4]) == {3}
+    assert all(stored(db).values())
+
+
+def test_dependents_of_a_failed_step_are_skipped(tmp_path):
+    db = make_db(tmp_path)
+    stats = generate_code(db, Recorder(fail={"create_spline_through_points"}))
+    assert (stats["generated"], stats["failed"], stats["skipped"]) == (3, 1, 2)
+    code = stored(db)
+    assert [sid for sid in sorted(code) if code[sid] is None] == [3, 4, 5]
+
+
+def test_max_in_flight_bounds_outstanding_requests(tmp_path):
+    db = make_db(tmp_path, [("note", [])] * 20)
+    backend = Recorder(latency=0.01)
+    stats = generate_code(db, backend, workers=8, max_in_flight=3)
+    assert stats["generated"] == 20
+    assert backend.max_in_flight <= 3
+
+
+def test_rows_are_written_in_batches(tmp_path, monkeypatch):
+    db = make_db(tmp_path, [("note", [])] * 7)
+    commits = []
+
+    def traced_init_db(path, **kwargs):
+        conn = init_db(path, **kwargs)
+        conn.set_trace_callback(lambda sql: commits.append(sql) if sql == "COMMIT" else None)
+        return conn
+
+    monkeypatch.setattr(codegen_ultramin, "init_db", traced_init_db)
+    generate_code(db, Recorder(), batch_size=3)
+    assert len(commits) == 3  # 3 + 3 rows, then the level's last row
+    assert all(stored(db).values())
+
+
+def test_template_cache_is_opt_in(tmp_path):
+    steps = [("create_point_on_plane", [])] * 5
+    per_step = generate_code(make_db(tmp_path / "a", steps), Recorder())
+    shared = generate_code(make_db(tmp_path / "b", steps), StubBackend())
+    assert per_step["backend_calls"] == 5 and per_step["cache_hits"] == 0
+    assert shared["backend_calls"] == 1 and shared["deduplicated"] == 4
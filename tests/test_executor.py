@@ -0,0 +1,73 @@
+import os
+import sqlite3
+
+from Agentic.executor import StepContext, _call_step, run_strategies, search
+from Agentic.migrations import migrate
+from Agentic.result_cache import ResultCache
+from Agentic.schema import MIGRATIONS
+from Agentic.snapshots import LIBRARY_TABLES, SnapshotPolicy, publish_snapshot, thread_reader
+from Agentic.templates import populate_template_libraries
+
+
+def names(result):
+    return sorted(r["name"] for r in result["Search Results"])
+
+
+def test_search_cache_follows_the_snapshot_read(tmp_path):
+    db = str(tmp_path / "knowledge.db")
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("CREATE TABLE parts(name TEXT)")
+        conn.execute("INSERT INTO parts VALUES ('wing')")
+    publish_snapshot(db)  # S1
+    with conn:
+        conn.execute("INSERT INTO parts VALUES ('spar')")  # live only, until S2
+    conn.close()
+    thread_reader(db, SnapshotPolicy(check_interval=0))
+    ctx = StepContext("s", "1", "SEARCH", db, ResultCache())
+    inputs = {"Target Table": "parts"}
+
+    result, _, hit = _call_step(search, inputs, ctx, None)
+    assert names(result) == ["wing"] and not hit
+    assert _call_step(search, inputs, ctx, None)[2]  # same snapshot: served from the cache
+
+    publish_snapshot(db)  # S2; the live file is untouched
+    result, _, hit = _call_step(search, inputs, ctx, None)
+    assert names(result) == ["spar", "wing"] and not hit
+
+
+
+def test_search_cache_follows_a_swapped_live_file(tmp_path):
+    db = str(tmp_path / "knowledge.db")
+    for path, rows in ((db, ["wing"]), (db + ".staging", ["spar", "wing"])):
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("CREATE TABLE parts(name TEXT)")
+            conn.executemany("INSERT INTO parts VALUES (?)", [(r,) for r in rows])
+        conn.close()
+    reader = thread_reader(db, SnapshotPolicy(check_interval=0))
+    ctx = StepContext("s", "1", "SEARCH", db, ResultCache())
+    inputs = {"Target Table": "parts"}
+
+    result, _, hit = _call_step(search, inputs, ctx, None)
+    assert names(result) == ["wing"] and not hit and reader.version is None
+
+    os.replace(db + ".staging", db)  # no snapshot published: the reader is on the live file
+    result, _, hit = _call_step(search, inputs, ctx, None)
+    assert names(result) == ["spar", "wing"] and not hit
+    assert reader.reopens == 1
+
+def test_plans_run_against_the_signatures_they_were_loaded_with(tmp_path):
+    db = str(tmp_path / "agentic.db")
+    conn = sqlite3.connect(db)
+    migrate(conn, MIGRATIONS)
+    conn.close()
+    populate_template_libraries(db)
+    publish_snapshot(db, tables=LIBRARY_TABLES)
+    conn = sqlite3.connect(db)
+    with conn:  # the live library drifts from the published snapshot
+        conn.execute("DELETE FROM FunctionOutputLibrary")
+    strategy = conn.execute("SELECT StrategyName FROM StrategyLibrary WHERE PlanSteps IS NOT NULL").fetchone()[0]
+    conn.close()
+    results = run_strategies([strategy], db_path=db, knowledge_db=str(tmp_path / "knowledge.db"), use_cache=False)
+    assert results[strategy] and all(r.status == "ok" for r in results[strategy])
@@ -0,0 +1,67 @@
+import os
+import shutil
+
+import pytest
+
+from Agentic.query_service import dependency_subgraph
+from codegen_ultramin import StubBackend, dependency_levels, generate_code, load_steps
+from conftest import ROOT
+from harvest_pdf_ultramin import harvest
+from schema_ultra_combo import init_db
+
+PDF = os.path.join(ROOT, "Flying-Wing-Instructions.pdf")
+pytestmark = pytest.mark.skipif(not os.path.exists(PDF), reason="sample manual not present")
+
+
+def edges(conn, source_doc):
+    """(position, feature, producer position) of the manual's steps, and the manual's step count."""
+    position = dict(conn.execute("SELECT step_id, MIN(position) FROM step_occurrences_ultramin "
+                                 "WHERE source_doc = ? GROUP BY step_id", (source_doc,)))
+    steps = load_steps(conn, source_doc)
+    dependency_levels(steps)
+    return {(position[s["step_id"]], feature, position[sid])
+            for s in steps for feature, sid in s["dependencies"].items()}, len(steps)
+
+
+def test_second_copy_of_a_manual_is_complete(tmp_path):
+    a, b = str(tmp_path / "A.pdf"), str(tmp_path / "B.pdf")
+    shutil.copy(PDF, a)
+    shutil.copy(PDF, b)
+    full = str(tmp_path / "full.db")
+    harvest(a, full, dedup=None)
+    conn = init_db(full)
+    expected, n = edges(conn, "A.pdf")
+    conn.close()
+
+    db = str(tmp_path / "dedup.db")
+    harvest(a, db)
+    harvest(b, db)
+    conn = init_db(db)
+    shared = conn.execute("SELECT COUNT(*) FROM step_occurrences_ultramin o JOIN harvested_steps_ultramin s "
+                          "ON s.step_id = o.step_id WHERE o.source_doc = 'B.pdf' AND s.source_doc = 'A.pdf'"
+                          ).fetchone()[0]
+    assert shared > 0  # B's notes are A's rows
+    assert edges(conn, "B.pdf") == (expected, n)
+    # Everything B's steps depend on is B's own row
+    owner = dict(conn.execute("SELECT step_id, source_doc FROM harvested_steps_ultramin"))
+    for step in load_steps(conn, "B.pdf"):
+        graph = dependency_subgraph(conn, step["step_id"], depth=1)
+        assert all(owner[producer] == "B.pdf" for sid, _, producer in graph["edges"] if sid == step["step_id"])
+    conn.close()
+
+    generate_code(db, StubBackend(), source_doc="B.pdf")
+    conn = init_db(db)
+    assert all(s["generated_code"] for s in load_steps(conn, "B.pdf"))
+    conn.close()
+
+
+def test_reharvest_is_stable(tmp_path):
+    db = str(tmp_path / "k.db")
+    harvest(PDF, db)
+    conn = init_db(db)
+    first = edges(conn, os.path.basename(PDF))
+    conn.close()
+    harvest(PDF, db)
+    conn = init_db(db)
+    assert edges(conn, os.path.basename(PDF)) == first
+    conn.close()
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from Agentic.hotswap import LiveConnection, SwapError, prepare_staging, publish, read_generation
+
+
+def build(path, rows, pad=0):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE parts(name TEXT)")
+        conn.execute("CREATE INDEX idx_parts_name ON parts(name)")
+        conn.executemany("INSERT INTO parts VALUES (?)", [(f"{r}{'.' * pad}",) for r in rows])
+    conn.close()
+
+
+def names(conn):
+    return [r[0].rstrip(".") for r in conn.execute("SELECT name FROM parts ORDER BY name")]
+
+
+def live_names(path):
+    with closing(sqlite3.connect(path)) as conn:
+        return names(conn)
+
+
+def test_publish_under_an_open_reader(tmp_path):
+    db = str(tmp_path / "knowledge.db")
+    build(db, ["wing"])
+    reader = LiveConnection(db, check_interval=0)
+    assert names(reader.connection()) == ["wing"]
+
+    staging = prepare_staging(db)
+    conn = sqlite3.connect(staging)
+    with conn:
+        conn.execute("INSERT INTO parts VALUES ('spar')")
+    conn.close()
+    assert publish(db)["generation"] == 1
+
+    assert names(reader.connection()) == ["spar", "wing"]
+    assert reader.reopens == 1 and reader.generation == 1
+    reader.close()
+
+
+def test_shrunk_build_is_refused(tmp_path):
+    db = str(tmp_path / "knowledge.db")
+    build(db, [f"part{i}" for i in range(10)])
+    build(prepare_staging(db, copy_live=False), ["part0", "part1"])
+
+    with pytest.raises(SwapError, match="parts: 2 rows, live has 10"):
+        publish(db, max_shrink=0.5)
+    assert len(live_names(db)) == 10 and read_generation(db) == {}
+
+
+def test_corrupt_build_is_refused(tmp_path):
+    db = str(tmp_path / "knowledge.db")
+    build(db, ["wing"])
+    staging = prepare_staging(db, copy_live=False)
+    build(staging, [f"part{i}" for i in range(200)], pad=200)
+    size = os.path.getsize(staging)
+    with open(staging, "r+b") as f:  # scribble over the last page, past the header
+        f.seek(size - 4096)
+        f.write(b"\xff" * 4096)
+
+    with pytest.raises(SwapError, match="integrity_check"):
+        publish(db)
+    assert live_names(db) == ["wing"] and os.path.exists(staging)
@@ -0,0 +1,32 @@
+import glob
+import logging
+import multiprocessing
+import os
+
+import pytest
+
+from Agentic.logs import start_logging, stop_logging
+
+
+def worker(n):
+    log = logging.getLogger("WORKER")
+    for i in range(n):
+        log.info("worker %s line %s %s", os.getpid(), i, "x" * 60)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_workers_do_not_lose_lines(tmp_path):
+    path = tmp_path / "app.log"
+    start_logging(log_file=path, max_bytes=4000, backup_count=1000, console=False)
+    try:
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=worker, args=(300,)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        worker(300)
+        for p in procs:
+            p.join()
+    finally:
+        stop_logging()
+    lines = [ln for f in glob.glob(f"{path}*") for ln in open(f, encoding="utf-8")]
+    assert len(lines) == 5 * 300
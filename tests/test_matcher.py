@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("scipy")
+
+from Agentic.matcher import Matcher  # noqa: E402
+from Agentic.migrations import migrate  # noqa: E402
+from Agentic.schema import MIGRATIONS  # noqa: E402
+from Agentic.templates import populate_template_libraries  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("matcher") / "agentic.db")
+    conn = sqlite3.connect(path)
+    migrate(conn, MIGRATIONS)
+    conn.close()
+    populate_template_libraries(path)
+    return path
+
+
+def test_empty_queries_in_a_batch(db):
+    matcher = Matcher.build(db)
+    wing = matcher.match("flying wing surface", "goal", 3)
+    assert wing
+    assert matcher.match_batch(["flying wing surface", ""], "goal", 3) == [wing, []]
+    assert matcher.match_batch(["", "flying wing surface"], "goal", 3) == [[], wing]
+    assert matcher.match_batch(["", "!!"], "goal", 3) == [[], []]
+    assert matcher.match("", "goal") == []
+    assert matcher.match_batch([], "goal") == []
+
+
+def test_build_with_empty_goal_text(db):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("INSERT INTO GoalInstance(GoalName) VALUES ('')")
+    conn.close()
+    matcher = Matcher.build(db)
+    assert matcher.match("flying wing surface", "goal", 3)
+
+
+def test_session_goals_are_not_in_the_goal_corpus(db):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("INSERT INTO GoalInstance(GoalName, GoalDescription, SessionID) "
+                     "VALUES ('zeppelin gondola', 'a session goal, not a template', 7)")
+        session_goal = conn.execute("SELECT MAX(GoalID) FROM GoalInstance").fetchone()[0]
+    conn.close()
+    matcher = Matcher.build(db)
+    assert session_goal not in [m.id for m in matcher.match("zeppelin gondola", "goal", 50)]
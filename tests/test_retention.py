@@ -0,0 +1,37 @@
+import sqlite3
+
+import pytest
+
+from Agentic.migrations import migrate
+from Agentic.retention import RetentionPolicy, archive_path, run_retention
+from Agentic.schema import MIGRATIONS
+
+
+def add_session(db, session_id, goal_id):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("INSERT INTO GoalInstance(GoalID, SessionID, GoalName, CompletedAt) "
+                     "VALUES (?, ?, 'wing', '2020-01-15 10:00:00')", (goal_id, session_id))
+        conn.execute("INSERT INTO StrategyInstance(GoalID, StrategyName) VALUES (?, 'Declarative KC')", (goal_id,))
+    conn.close()
+
+
+def test_archive_never_overwrites_history(tmp_path):
+    db = str(tmp_path / "agentic.db")
+    conn = sqlite3.connect(db)
+    migrate(conn, MIGRATIONS)
+    conn.close()
+    policy = RetentionPolicy(archive_dir=str(tmp_path / "archive"), pause_seconds=0)
+
+    add_session(db, 1, 100)
+    assert len(run_retention(db, policy).sessions) == 1
+    add_session(db, 2, 100)  # a reused GoalID, e.g. after a restore
+    with pytest.raises(sqlite3.IntegrityError):
+        run_retention(db, policy)
+
+    archive = sqlite3.connect(str(archive_path(policy, "2020-01")))
+    assert archive.execute("SELECT SessionID FROM GoalInstance WHERE GoalID = 100").fetchone() == (1,)
+    archive.close()
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT SessionID FROM GoalInstance WHERE GoalID = 100").fetchone() == (2,)
+    conn.close()
@@ -0,0 +1,55 @@
+import types
+
+import pytest
+
+import scrape_docs_ultramin
+from schema_ultra_combo import init_db
+from scrape_docs_ultramin import insert_docs, scrape
+
+MASTER = "http://docs.example/online/interfaces/CAAMasterIdx.htm"
+PAGE = "http://docs.example/online/interfaces/interface_HybridShapeFactory.htm"
+
+
+class Response:
+    def __init__(self, text):
+        self.text, self.content = text, text.encode()
+
+    def raise_for_status(self):
+        pass
+
+
+def serve(monkeypatch, pages):
+    """Make ``scrape`` fetch from ``pages`` (url -> html); other urls fail to resolve."""
+    def get(url, **kwargs):
+        if url not in pages:
+            raise ConnectionError(f"cannot resolve {url}")
+        return Response(pages[url])
+
+    session = types.SimpleNamespace(get=get)
+    monkeypatch.setattr(scrape_docs_ultramin, "_requests",
+                        lambda: types.SimpleNamespace(Session=lambda: session))
+
+
+def docs(db):
+    conn = init_db(db)
+    try:
+        return sorted(r[0] for r in conn.execute("SELECT api_method FROM doc_functions_ultramin"))
+    finally:
+        conn.close()
+
+
+def test_failed_master_fetch_keeps_the_old_docs(tmp_path, monkeypatch):
+    db = str(tmp_path / "knowledge.db")
+    conn = init_db(db, overwrite=True)
+    insert_docs(conn, [("HybridShapeFactory", "AddNewPlaneOffset", PAGE)])
+    conn.close()
+
+    serve(monkeypatch, {})
+    with pytest.raises(RuntimeError, match="Master index"):
+        scrape(MASTER, db, overwrite_docs=True)
+    assert docs(db) == ["AddNewPlaneOffset"]
+
+    serve(monkeypatch, {MASTER: f'<a href="{PAGE}">HybridShapeFactory</a>',
+                        PAGE: "<h1>HybridShapeFactory</h1><code>AddNewLinePtDir</code>"})
+    assert scrape(MASTER, db, overwrite_docs=True) == 1
+    assert docs(db) == ["AddNewLinePtDir"]
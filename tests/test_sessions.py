@@ -0,0 +1,61 @@
+import sqlite3
+import threading
+import time
+
+from Agentic.migrations import migrate
+from Agentic.schema import MIGRATIONS
+from Agentic.sessions import SessionPolicy, SessionStore
+
+
+def agentic_db(tmp_path):
+    path = str(tmp_path / "agentic.db")
+    conn = sqlite3.connect(path)
+    migrate(conn, MIGRATIONS)
+    conn.close()
+    return path
+
+
+def test_session_evicted_during_flush_is_not_reloaded(tmp_path):
+    store = SessionStore(agentic_db(tmp_path), SessionPolicy(max_sessions=3), autostart=False)
+    store.update(1, query="wing", currentGoalID=7)
+    writing, release = threading.Event(), threading.Event()
+    write = store._write
+
+    def slow_write(rows):
+        writing.set()
+        release.wait(5)
+        write(rows)
+
+    store._write = slow_write
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert writing.wait(5)
+    assert store.evict_idle(now=time.monotonic() + 3600) == 1  # while its row is being written
+    got = []
+    reader = threading.Thread(target=lambda: got.append(store.get(1)))
+    reader.start()
+    reader.join(2)
+    assert not reader.is_alive()  # served from memory, not reloaded from the uncommitted row
+    release.set()
+    flusher.join()
+    reader.join()
+    assert got[0].query == "wing" and got[0].currentGoalID == 7
+    assert store.stats["created"] == 1
+    store.close()
+    conn = sqlite3.connect(store.db_path)
+    assert conn.execute("SELECT Query, GoalID FROM SessionState WHERE SessionID = 1").fetchone() == ("wing", 7)
+    conn.close()
+
+
+def test_background_flush_with_evictions_keeps_state(tmp_path):
+    store = SessionStore(agentic_db(tmp_path), SessionPolicy(max_sessions=3, flush_interval=0.05))
+    for rnd in range(20):
+        for sid in range(1, 6):
+            store.update(sid, query=f"q{sid}", currentGoalID=sid)
+            assert store.answer(sid)["query"] == f"q{sid}"
+    store.close()
+    assert store.stats["created"] == 5
+    conn = sqlite3.connect(store.db_path)
+    rows = conn.execute("SELECT SessionID, Query, GoalID FROM SessionState ORDER BY SessionID").fetchall()
+    conn.close()
+    assert rows == [(sid, f"q{sid}", sid) for sid in range(1, 6)]
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+from Agentic.migrations import migrate
+from Agentic.schema import MIGRATIONS
+from Agentic.templates import goals, populate_template_libraries
+
+
+def test_repopulating_keeps_session_goals(tmp_path):
+    db = str(tmp_path / "agentic.db")
+    conn = sqlite3.connect(db)
+    migrate(conn, MIGRATIONS)
+    conn.close()
+    populate_template_libraries(db)
+    conn = sqlite3.connect(db)
+    with conn:
+        session_goal = conn.execute("INSERT INTO GoalInstance(SessionID, GoalName) VALUES (1, 'wing')").lastrowid
+    conn.close()
+
+    populate_template_libraries(db)
+    conn = sqlite3.connect(db)
+    rows = conn.execute("SELECT GoalID, SessionID FROM GoalInstance ORDER BY GoalID").fetchall()
+    conn.close()
+    assert (session_goal, 1) in rows
+    template_ids = [gid for gid, sid in rows if sid is None]
+    assert len(template_ids) == len(goals) and min(template_ids) > session_goal
+
+
+def test_failed_repopulation_keeps_the_old_libraries(tmp_path):
+    db = str(tmp_path / "agentic.db")
+    conn = sqlite3.connect(db)
+    migrate(conn, MIGRATIONS)
+    conn.close()
+    populate_template_libraries(db)
+    conn = sqlite3.connect(db, isolation_level=None)
+    before = conn.execute("SELECT COUNT(*) FROM StrategyLibrary").fetchone()[0]
+    conn.execute("DROP TABLE FunctionParametersLibrary")  # the last insert now fails
+
+    with pytest.raises(sqlite3.OperationalError):
+        populate_template_libraries(db)
+    assert conn.execute("SELECT COUNT(*) FROM StrategyLibrary").fetchone()[0] == before
+    conn.execute("BEGIN IMMEDIATE")  # the failed refresh left no write lock behind
+    conn.execute("ROLLBACK")
+    conn.close()
@@ -0,0 +1,329 @@
+# codegen_ultramin.py
+from __future__ import annotations
+import re, json, time, hashlib, sqlite3, argparse, logging, importlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+from schema_ultra_combo import init_db
+from Agentic import telemetry  # importable once schema_ultra_combo has set up sys.path
+
+log = logging.getLogger("codegen_ultramin")
+
+# Fills harvested_steps_ultramin.generated_code/code_lang level by level:
+#   level 0 = steps that reference nothing produced earlier in the same document,
+#   level n = steps whose latest producer of some referenced feature is at level n-1.
+# All steps of a level are independent, so they are generated concurrently
+# (--workers, at most --max-in-flight requests outstanding) and written back in
+# batches; a level starts once the previous one is done, so a step's generator
+# sees the code of every step it depends on.
+#
+# A backend is any object with a ``lang`` attribute and a thread-safe
+# ``generate(step, context) -> str``; ``step`` is the row as a dict plus
+# ``dependencies`` ({feature: step_id}) and ``context`` maps those step_ids to
+# their generated code. Select one with --backend stub or --backend pkg.module:factory.
+
+# CATIA names a new feature <Type>.<n> per document; used when produces_json is empty
+IMPLICIT_PRODUCES = [
+    ("create_plane", "Plane"), ("create_point", "Point"), ("create_line", "Line"),
+    ("create_spline", "Spline"), ("extrude_surface", "Extrude"),
+    ("multi_section_surface", "Multi-sections Surface"), ("join", "Join"), ("symmetry", "Symmetry"),
+]
+
+def implicit_kind(action_label: str | None) -> Optional[str]:
+    """The feature type a step without produces_json creates, or None if it creates nothing."""
+    for prefix, kind in IMPLICIT_PRODUCES:
+        if (action_label or "").startswith(prefix):
+            return kind
+    return None
+
+def _loads(text: str | None, default: Any) -> Any:
+    try: return json.loads(text) if text else default
+    except ValueError: return default
+
+def load_steps(conn: sqlite3.Connection, source_doc: str | None=None) -> List[Dict[str, Any]]:
+    sql = """SELECT step_id, action_label, description, params_json, produces_json, references_json,
+                    code_lang, generated_code, COALESCE(source_doc, '') FROM harvested_steps_ultramin"""
+    args: List[Any] = []
+    order = " ORDER BY source_doc, step_id"
+    if source_doc is not None:
+        # A manual's steps include the rows it shares with earlier manuals (see dedup_ultramin),
+        # in the manual's order; rows harvested without occurrences keep step_id order
+        sql += """ WHERE COALESCE(source_doc, '') = ?
+                      OR step_id IN (SELECT step_id FROM step_occurrences_ultramin WHERE source_doc = ?)"""
+        order = """ ORDER BY COALESCE((SELECT MIN(position) FROM step_occurrences_ultramin o
+                                        WHERE o.source_doc = ? AND o.step_id = harvested_steps_ultramin.step_id),
+                                       step_id)"""
+        args += [source_doc, source_doc, source_doc]
+    out = []
+    for sid, action, desc, params, produces, refs, lang, code, doc in conn.execute(sql + order, args):
+        out.append(dict(step_id=sid, action_label=action, description=desc, params=_loads(params, {}),
+                        produces=_loads(produces, []), references=_loads(refs, []),
+                        code_lang=lang, generated_code=code, source_doc=doc))
+    return out
+
+def dependency_levels(steps: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group steps into levels; sets ``step["dependencies"]`` ({feature: producing step_id})."""
+    producer: Dict[Tuple[str, str], int] = {}   # (doc, feature lower-case) -> latest producing step_id
+    counters: Dict[Tuple[str, str], int] = {}   # implicit CATIA naming per document and type
+    level: Dict[int, int] = {}
+    for step in steps:   # document, then step order
+        doc = step["source_doc"]
+        deps = {}
+        for ref in step["references"]:
+            sid = producer.get((doc, str(ref).lower()))
+            if sid is not None and sid != step["step_id"]:
+                deps[ref] = sid
+        step["dependencies"] = deps
+        level[step["step_id"]] = 1 + max((level[s] for s in deps.values()), default=-1)
+        produces = list(step["produces"])
+        kind = None if produces else implicit_kind(step["action_label"])
+        if kind:
+            counters[(doc, kind)] = counters.get((doc, kind), 0) + 1
+            produces.append(f"{kind}.{counters[(doc, kind)]}")
+        for feature in produces:
+            producer[(doc, str(feature).lower())] = step["step_id"]
+    levels: List[List[Dict[str, Any]]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for step in steps:
+        levels[level[step["step_id"]]].append(step)
+    return levels
+
+class StubBackend:
+    """Deterministic local backend: same step, same code. ``latency`` simulates a remote model."""
+    lang = "python-catia-stub"
+    cacheable = True  # code depends only on the action, parameters and dependency ids
+
+    def __init__(self, latency: float=0.0):
+        self.latency = latency
+
+    def generate(self, step: Dict[str, Any], context: Dict[int, str]) -> str:
+        if self.latency: time.sleep(self.latency)
+        name = re.sub(r'\W+', '_', step["action_label"] or "step").strip("_") or "step"
+        args = ", ".join(f"{re.sub(r'[^0-9A-Za-z_]+', '_', k)}={v!r}" for k, v in sorted(step["params"].items()))
+        after = sorted(set(step["dependencies"].values()))
+        lines = [f"# Step {step['step_id']}: {step['description'] or step['action_label']}"]
+        lines.append(f"step_{step['step_id']} = catia.{name}({args}" + (", " if args and after else "")
+                     + (f"after=[{', '.join(f'step_{s}' for s in after)}]" if after else "") + ")")
+        return "\n".join(lines)
+
+def load_backend(spec: str, **kwargs: Any):
+    """``stub`` or ``package.module:factory`` (called with ``kwargs``)."""
+    if spec == "stub":
+        return StubBackend(**kwargs)
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Backend must be 'stub' or 'module:factory', got {spec!r}")
+    return getattr(importlib.import_module(module), attr)(**kwargs)
+
+# ── Template cache ────────────────────────────────────────────────────
+# Manuals repeat operations with different values (create_point_on_plane with
+# other H/V, set_parameter on another Tension). The backend is asked for a
+# template of the step's *shape*: every parameter value becomes __pN__, every
+# dependency step_id __dN__ and the step's own id __s0__. The template is stored in codegen_cache_ultramin
+# under sha256(action_label, code_lang, parameter names and value kinds,
+# dependency count), shared across documents and runs, and instantiated by
+# substitution. A template that drops a placeholder cannot be reused safely: that
+# shape is then generated per step. A template loses the concrete description and
+# dependency code, so only backends that declare ``cacheable = True`` (code from
+# the shape alone, like StubBackend) use it; the others generate every step.
+
+PLACEHOLDER_RX = re.compile(r"""(['"]?)(__[pds]\d+__)\1""")
+
+def _kind(value: Any) -> str:
+    if isinstance(value, bool): return "bool"
+    if isinstance(value, (int, float)): return "number"
+    if isinstance(value, (list, tuple)): return "list"
+    if isinstance(value, dict): return "object"
+    return "null" if value is None else "string"
+
+def abstract_step(step: Dict[str, Any], lang: str | None) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+    """``(template_key, abstract step, {placeholder: literal})`` for one step."""
+    keys = sorted(step["params"])
+    bindings = {"__s0__": str(step["step_id"])}
+    bindings.update({f"__p{i}__": repr(step["params"][k]) for i, k in enumerate(keys)})
+    deps = sorted(set(step["dependencies"].values()))
+    bindings.update({f"__d{i}__": str(d) for i, d in enumerate(deps)})
+    shape = [step["action_label"], lang, [(k, _kind(step["params"][k])) for k in keys], len(deps)]
+    key = hashlib.sha256(json.dumps(shape, sort_keys=True).encode("utf-8")).hexdigest()
+    dep_token = {d: f"__d{i}__" for i, d in enumerate(deps)}
+    abstract = dict(step, step_id="__s0__", description=None, generated_code=None, source_doc=None,
+                    produces=[], references=[],
+                    params={k: f"__p{i}__" for i, k in enumerate(keys)},
+                    dependencies={ref: dep_token[d] for ref, d in step["dependencies"].items()})
+    return key, abstract, bindings
+
+def instantiate(template: str, bindings: Dict[str, str]) -> str:
+    """Replace every placeholder (quoted or bare) with its literal."""
+    return PLACEHOLDER_RX.sub(lambda m: bindings.get(m.group(2), m.group(0)), template)
+
+class CodeCache:
+    """codegen_cache_ultramin access; used from the scheduling thread only."""
+
+    def __init__(self, conn: sqlite3.Connection, max_entries: int=10000):
+        self.conn, self.max_entries = conn, max_entries
+        self.touched: Dict[str, int] = {}   # key -> hits this run, written back in flush()
+
+    def get(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT template FROM codegen_cache_ultramin WHERE template_key = ?", (key,)).fetchone()
+        if row is not None:
+            self.touched[key] = self.touched.get(key, 0) + 1
+        return row[0] if row else None
+
+    def put(self, key: str, action_label: str, lang: str | None, template: str):
+        now = time.time()
+        self.conn.execute("""INSERT OR REPLACE INTO codegen_cache_ultramin
+                             (template_key, action_label, code_lang, template, hits, created_at, last_used)
+                             VALUES (?,?,?,?,0,?,?)""", (key, action_label, lang, template, now, now))
+
+    def flush(self):
+        """Record hits/recency and evict the least recently used templates beyond ``max_entries``."""
+        now = time.time()
+        self.conn.executemany("UPDATE codegen_cache_ultramin SET hits = hits + ?, last_used = ? WHERE template_key = ?",
+                              [(n, now, k) for k, n in self.touched.items()])
+        self.touched.clear()
+        evicted = self.conn.execute("""DELETE FROM codegen_cache_ultramin WHERE template_key IN (
+                                         SELECT template_key FROM codegen_cache_ultramin
+                                         ORDER BY last_used DESC LIMIT -1 OFFSET ?)""", (self.max_entries,)).rowcount
+        self.conn.commit()
+        return evicted
+
+def _generate(backend: Any, step: Dict[str, Any], context: Dict[int, str], parent_id: Optional[str]) -> str:
+    with telemetry.span("codegen.step", parent_id, action=step["action_label"]):
+        return backend.generate(step, context)
+
+def generate_code(db_path: str, backend: Any, workers: int=8, max_in_flight: int | None=None,
+                  batch_size: int=50, source_doc: str | None=None, overwrite: bool=False,
+                  use_cache: bool=True, cache_max_entries: int=10000) -> Dict[str, int]:
+    """Generate code for every step without any (all steps with ``overwrite``); returns counts."""
+    conn = init_db(db_path)
+    steps = load_steps(conn, source_doc)
+    levels = dependency_levels(steps)
+    code: Dict[int, str] = {s["step_id"]: s["generated_code"] for s in steps if s["generated_code"] and not overwrite}
+    failed: set = set()
+    stats = dict(generated=0, kept=len(code), failed=0, skipped=0, levels=len(levels),
+                 backend_calls=0, cache_hits=0, deduplicated=0, evicted=0)
+    max_in_flight = max_in_flight or workers * 2
+    pending: List[Tuple[str, str, int]] = []
+    lang = getattr(backend, "lang", None)
+    cache = CodeCache(conn, cache_max_entries) if use_cache and getattr(backend, "cacheable", False) else None
+    uncacheable: set = set()   # template keys whose template dropped a placeholder
+
+    def flush():
+        if pending:
+            conn.executemany("UPDATE harvested_steps_ultramin SET generated_code = ?, code_lang = ? WHERE step_id = ?", pending)
+            conn.commit()
+            pending.clear()
+
+    def store(step: Dict[str, Any], text: str):
+        code[step["step_id"]] = text
+        pending.append((text, lang, step["step_id"]))
+        stats["generated"] += 1
+        if len(pending) >= batch_size:
+            flush()
+
+    def fail(step: Dict[str, Any], error: Exception):
+        failed.add(step["step_id"]); stats["failed"] += 1
+        log.warning("Step %s (%s) failed: %s", step["step_id"], step["action_label"], error)
+
+    parent_id = telemetry.current_span_id()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="codegen") as pool:
+        for n, level in enumerate(levels):
+            # Jobs are ("step", step) for one concrete step or ("template", key) for a shape
+            jobs: List[Tuple[str, Any]] = []
+            waiters: Dict[str, List[Tuple[Dict[str, Any], Dict[str, str]]]] = {}
+            abstract: Dict[str, Dict[str, Any]] = {}
+            for step in level:
+                if step["step_id"] in code:
+                    continue
+                if any(d in failed for d in step["dependencies"].values()):
+                    failed.add(step["step_id"]); stats["skipped"] += 1
+                    continue
+                if cache is None:
+                    jobs.append(("step", step)); continue
+                key, abs_step, bindings = abstract_step(step, lang)
+                if key in uncacheable:
+                    jobs.append(("step", step)); continue
+                template = cache.get(key)
+                if template is not None:
+                    store(step, instantiate(template, bindings)); stats["cache_hits"] += 1
+                    continue
+                if key in waiters:
+                    stats["deduplicated"] += 1   # single flight: one backend call per shape and level
+                else:
+                    waiters[key], abstract[key] = [], abs_step
+                    jobs.append(("template", key))
+                waiters[key].append((step, bindings))
+            t0 = time.perf_counter()
+            with telemetry.span("codegen.level", level=n) as s:
+                running: Dict[Any, Tuple[str, Any]] = {}
+                while True:
+                    # Backpressure: keep at most max_in_flight requests outstanding
+                    while jobs and len(running) < max_in_flight:
+                        kind, item = jobs.pop(0)
+                        if kind == "template":
+                            fut = pool.submit(_generate, backend, abstract[item], {}, parent_id)
+                        else:
+                            context = {d: code[d] for d in item["dependencies"].values() if d in code}
+                            fut = pool.submit(_generate, backend, item, context, parent_id)
+                        running[fut] = (kind, item)
+                        stats["backend_calls"] += 1
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        kind, item = running.pop(fut)
+                        if kind == "step":
+                            try: store(item, fut.result())
+                            except Exception as e: fail(item, e)
+                            continue
+                        try:
+                            template = fut.result()
+                        except Exception as e:
+                            for step, _ in waiters.pop(item): fail(step, e)
+                            continue
+                        found = {m.group(2) for m in PLACEHOLDER_RX.finditer(template)}
+                        if not found >= set(waiters[item][0][1]):
+                            # The backend hard-coded something: generate these steps one by one
+                            uncacheable.add(item)
+                            jobs.extend(("step", step) for step, _ in waiters.pop(item))
+                            continue
+                        cache.put(item, abstract[item]["action_label"], lang, template)
+                        for step, bindings in waiters.pop(item):
+                            store(step, instantiate(template, bindings))
+                flush()
+                s.add(len(level))
+            log.info("Level %d: %d steps in %.2fs", n, len(level), time.perf_counter() - t0)
+    if cache is not None:
+        stats["evicted"] = cache.flush()
+    conn.close()
+    telemetry.count("codegen.steps", stats["generated"], status="generated")
+    telemetry.count("codegen.steps", stats["failed"] + stats["skipped"], status="failed")
+    telemetry.count("codegen.cache_hits", stats["cache_hits"])
+    telemetry.count("codegen.backend_calls", stats["backend_calls"])
+    return stats
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate code for harvested steps, one dependency level at a time")
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--backend", default="stub", help="'stub' or package.module:factory")
+    ap.add_argument("--stub-latency", type=float, default=0.0, help="Seconds per step for the stub backend")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--max-in-flight", type=int, help="Outstanding requests (default 2 x workers)")
+    ap.add_argument("--batch-size", type=int, default=50, help="Rows per UPDATE transaction")
+    ap.add_argument("--doc", help="Only steps of this source_doc")
+    ap.add_argument("--overwrite", action="store_true", help="Regenerate steps that already have code")
+    ap.add_argument("--no-cache", action="store_true", help="One backend call per step, no shared templates")
+    ap.add_argument("--cache-max-entries", type=int, default=10000, help="Templates kept (least recently used go first)")
+    ap.add_argument("--log-level", default="INFO")
+    ap.add_argument("--telemetry", help="Write a JSON timing/throughput report here")
+    args = ap.parse_args()
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    if args.telemetry: telemetry.enable()
+    backend = load_backend(args.backend, **({"latency": args.stub_latency} if args.backend == "stub" else {}))
+    stats = generate_code(args.db, backend, workers=args.workers, max_in_flight=args.max_in_flight,
+                          batch_size=args.batch_size, source_doc=args.doc, overwrite=args.overwrite,
+                          use_cache=not args.no_cache, cache_max_entries=args.cache_max_entries)
+    log.info("Code generation: %s", stats)
+    telemetry.export(json_path=args.telemetry)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# dedup_ultramin.py
+from __future__ import annotations
+import re, json, zlib, random, struct, hashlib, sqlite3, argparse, logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from schema_ultra_combo import init_db
+
+log = logging.getLogger("dedup_ultramin")
+
+# Near-duplicate step texts (a manual repeating a step, page-overlapping extractions,
+# revisions of the same manual) are found with MinHash + LSH:
+#   text -> normalized (lower case, punctuation dropped) -> set of character 4-grams
+#   -> signature: the minimum of each of 64 hash functions over the 4-grams
+#   -> 16 bands of 4 values; texts sharing any band are candidates (cheap, high recall)
+#   -> duplicate if the signatures agree on >= threshold of their values (estimated
+#      Jaccard similarity) and the texts carry the same numbers: "offset of 120 mm" vs
+#      "35 mm", or Point.1 vs Point.2, are different steps however similar the wording.
+# Canonical steps keep their signature (step_fingerprints_ultramin) and band keys
+# (step_lsh_ultramin), so each new manual is matched against the whole corpus.
+# Only self-contained steps (creating and referencing no feature) are indexed and
+# collapsed: codegen and the query service resolve "Spline.2" or "Point.1" to a
+# producing row of the same manual, so a step that creates or uses a feature must
+# stay a row of that manual.
+SHINGLE = 4
+PERMS = 64
+BANDS = 16
+ROWS = PERMS // BANDS
+THRESHOLD = 0.9
+INDEXED = "self-contained"  # which steps are collapsed; part of the pdf_harvest stage fingerprint
+
+_M64 = (1 << 64) - 1
+_rnd = random.Random(0x5EED)  # fixed: stored signatures must stay comparable across runs
+_HASHES = [(_rnd.getrandbits(64) | 1, _rnd.getrandbits(64)) for _ in range(PERMS)]
+_PACK = struct.Struct(f"<{PERMS}I")
+
+class Fingerprint(NamedTuple):
+    numbers: str                  # every number in the text, in order
+    signature: Tuple[int, ...]    # PERMS 32-bit minimum hashes
+
+def normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+(?:\.[a-z0-9]+)*", (text or "").lower()))
+
+_vectorized: list = []   # [(numpy, a, b) or None]: numpy is optional and imported on first use
+
+def _numpy_hashes():
+    if not _vectorized:
+        try:
+            import numpy as np
+            _vectorized.append((np, np.array([a for a, _ in _HASHES], dtype=np.uint64)[:, None],
+                                np.array([b for _, b in _HASHES], dtype=np.uint64)[:, None]))
+        except ImportError:
+            _vectorized.append(None)
+    return _vectorized[0]
+
+def fingerprint(text: str) -> Fingerprint:
+    norm = normalize(text)
+    grams = {zlib.crc32(norm[i:i + SHINGLE].encode("utf-8")) for i in range(max(1, len(norm) - SHINGLE + 1))}
+    # Multiply-shift hashing: the high 32 bits of a*x + b (mod 2^64), one (a, b) per function.
+    # numpy's uint64 arithmetic wraps the same way, so both paths give the same signature.
+    vectorized = _numpy_hashes()
+    if vectorized is not None:
+        np, a, b = vectorized
+        sig = tuple(((a * np.fromiter(grams, np.uint64, len(grams)) + b) >> np.uint64(32)).min(axis=1).tolist())
+    else:
+        sig = tuple(min(((a * g + b) & _M64) >> 32 for g in grams) for a, b in _HASHES)
+    return Fingerprint(" ".join(re.findall(r"\d+(?:\.\d+)?", norm)), sig)
+
+def band_keys(sig: Tuple[int, ...]) -> List[int]:
+    # One key per band of ROWS values; signed 64-bit, so they fit an SQLite INTEGER
+    packed = _PACK.pack(*sig)
+    return [int.from_bytes(hashlib.blake2b(packed[4 * ROWS * b:4 * ROWS * (b + 1)], digest_size=8,
+                                           salt=bytes([b])).digest(), "big", signed=True) for b in range(BANDS)]
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / PERMS
+
+CANDIDATES_SQL = """SELECT DISTINCT f.step_id, f.numbers, f.signature FROM step_lsh_ultramin l
+  JOIN step_fingerprints_ultramin f ON f.step_id = l.step_id
+ WHERE l.band_key IN (SELECT value FROM json_each(?))"""
+
+class StepIndex:
+    """Canonical steps by fingerprint: this run's in memory, the stored corpus through ``conn``.
+
+    ``lookup(fp)`` returns ``(step_id, similarity)`` of the best canonical step at or
+    above ``threshold``, else ``(None, 0.0)``; ``add(step_id, fp)`` makes a new
+    canonical step and ``save()`` stores the fingerprints of those added.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD, conn: sqlite3.Connection | None = None):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"dedup threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.conn = conn
+        self._bands: Dict[int, List[int]] = {}
+        self._prints: Dict[int, Fingerprint] = {}
+        self._added: List[int] = []
+
+    def lookup(self, fp: Fingerprint) -> Tuple[Optional[int], float]:
+        keys = band_keys(fp.signature)
+        candidates = {sid: self._prints[sid] for k in keys for sid in self._bands.get(k, ())}
+        if self.conn is not None:
+            for sid, numbers, blob in self.conn.execute(CANDIDATES_SQL, (json.dumps(keys),)):
+                candidates.setdefault(sid, Fingerprint(numbers, _PACK.unpack(blob)))
+        best, score = None, 0.0
+        for sid, other in sorted(candidates.items()):
+            if other.numbers != fp.numbers:
+                continue
+            s = similarity(fp.signature, other.signature)
+            if s >= self.threshold and s > score:
+                best, score = sid, s
+        return best, score
+
+    def add(self, step_id: int, fp: Fingerprint):
+        self._prints[step_id] = fp
+        for k in band_keys(fp.signature):
+            self._bands.setdefault(k, []).append(step_id)
+        self._added.append(step_id)
+
+    def save(self) -> int:
+        """Store the fingerprints and band keys of the steps added since the last save."""
+        rows = [(sid, self._prints[sid].numbers, _PACK.pack(*self._prints[sid].signature)) for sid in self._added]
+        self.conn.executemany("INSERT OR REPLACE INTO step_fingerprints_ultramin(step_id, numbers, signature) "
+                              "VALUES (?, ?, ?)", rows)
+        self.conn.executemany("INSERT OR IGNORE INTO step_lsh_ultramin(band_key, step_id) VALUES (?, ?)",
+                              [(k, sid) for sid in self._added for k in band_keys(self._prints[sid].signature)])
+        self._added = []
+        return len(rows)
+
+def release_doc(conn: sqlite3.Connection, source_doc: str) -> int:
+    """Remove a manual before it is re-harvested: its occurrences go, and each canonical row it
+    owns moves to the first other manual still using it (else it is deleted). Returns rows deleted."""
+    conn.execute("DELETE FROM step_occurrences_ultramin WHERE source_doc = ?", (source_doc,))
+    conn.execute("""UPDATE harvested_steps_ultramin SET source_doc = (
+                      SELECT o.source_doc FROM step_occurrences_ultramin o
+                       WHERE o.step_id = harvested_steps_ultramin.step_id ORDER BY o.source_doc, o.position LIMIT 1)
+                    WHERE source_doc = ? AND step_id IN (SELECT step_id FROM step_occurrences_ultramin)""",
+                 (source_doc,))
+    return conn.execute("DELETE FROM harvested_steps_ultramin WHERE source_doc = ?", (source_doc,)).rowcount
+
+def dedup_stats(conn: sqlite3.Connection) -> Dict[str, float]:
+    """Harvested step occurrences vs stored rows across the corpus."""
+    occurrences, rows = conn.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT step_id) FROM step_occurrences_ultramin").fetchone()
+    return {"occurrences": occurrences, "rows": rows, "duplicates": occurrences - rows,
+            "ratio": round(1 - rows / occurrences, 4) if occurrences else 0.0}
+
+def duplicate_groups(conn: sqlite3.Connection, limit: int | None = None) -> List[Dict[str, object]]:
+    """Canonical steps with more than one occurrence, most repeated first."""
+    sql = """SELECT s.step_id, s.description, COUNT(*), MIN(o.similarity),
+                    json_group_array(o.source_doc || '#' || o.position)
+               FROM step_occurrences_ultramin o JOIN harvested_steps_ultramin s ON s.step_id = o.step_id
+              GROUP BY s.step_id HAVING COUNT(*) > 1 ORDER BY COUNT(*) DESC, s.step_id LIMIT ?"""
+    return [dict(step_id=sid, description=desc, occurrences=n, min_similarity=sim, at=json.loads(at))
+            for sid, desc, n, sim, at in conn.execute(sql, (-1 if limit is None else limit,))]
+
+def main():
+    ap = argparse.ArgumentParser(description="Report near-duplicate harvested steps")
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--groups", type=int, default=10, help="Most repeated steps to list")
+    ap.add_argument("--log-level", default="INFO")
+    args = ap.parse_args()
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    conn = init_db(args.db)
+    print(json.dumps(dedup_stats(conn)))
+    for group in duplicate_groups(conn, args.groups):
+        print(json.dumps(group, ensure_ascii=False))
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# export_ultramin.py
+from __future__ import annotations
+import os, re, json, hashlib, sqlite3, argparse, logging
+from typing import Any, Dict, Iterator, List, Tuple
+
+log = logging.getLogger("export_ultramin")
+
+# Columnar export of the knowledge corpus, one file (or .npy directory) per document:
+#   <out>/harvested_steps/<doc>.arrow|.parquet|/     keyed by source_doc
+#   <out>/doc_functions/<factory>.arrow|.parquet|/   keyed by api_factory
+#   <out>/manifest.json                              per-document fingerprints and row counts
+# Re-running only rewrites documents whose rows changed and drops removed ones.
+# params_json keys become typed param_<key> columns; JSON lists become list<string>
+# (Arrow/Parquet) or JSON text. For .npy, strings are int32 codes into <col>.vocab.json
+# so every column is a fixed-width array that np.load(..., mmap_mode="r") maps without copying.
+
+FORMATS = ("arrow", "parquet", "npy")
+
+TABLES = {
+    "harvested_steps": dict(
+        table="harvested_steps_ultramin", doc="COALESCE(source_doc, '')", order="step_id",
+        columns=[("step_id", "int"), ("action_label", "str"), ("description", "str"), ("code_lang", "str")],
+        lists=[("produces", "produces_json"), ("references", "references_json")],
+        params="params_json",
+    ),
+    "doc_functions": dict(
+        table="doc_functions_ultramin", doc="api_factory", order="function_key",
+        columns=[("function_key", "str"), ("api_factory", "str"), ("api_method", "str"),
+                 ("action_label", "str"), ("doc_url", "str")],
+        lists=[("tokens", "tokens_json")],
+        params=None,
+    ),
+}
+
+def _slug(key: str) -> str:
+    safe = re.sub(r'[^A-Za-z0-9._-]+', '_', key or "unknown").strip("._") or "doc"
+    return f"{safe[:60]}-{hashlib.sha1((key or '').encode('utf-8')).hexdigest()[:8]}"
+
+def _loads(text: str | None, default: Any) -> Any:
+    try: return json.loads(text) if text else default
+    except ValueError: return default
+
+def param_schema(conn: sqlite3.Connection, spec: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Typed columns for every params_json key in the table (numeric keys -> float, others -> str)."""
+    if not spec["params"]:
+        return []
+    rows = conn.execute(f"""
+        SELECT j.key, group_concat(DISTINCT j.type)
+        FROM {spec['table']} s, json_each(s.{spec['params']}) j
+        WHERE json_valid(s.{spec['params']}) GROUP BY j.key ORDER BY j.key;
+    """).fetchall()
+    out = []
+    for key, types in rows:
+        kinds = set((types or "").split(","))
+        out.append((f"param_{key}", "float" if kinds <= {"integer", "real", "null"} else "str"))
+    return out
+
+def table_schema(conn: sqlite3.Connection, spec: Dict[str, Any]) -> List[Tuple[str, str]]:
+    return list(spec["columns"]) + [(name, "list") for name, _ in spec["lists"]] + param_schema(conn, spec)
+
+def _select(spec: Dict[str, Any]) -> str:
+    cols = [c for c, _ in spec["columns"]] + [src for _, src in spec["lists"]]
+    if spec["params"]:
+        cols.append(spec["params"])
+    return ", ".join(cols)
+
+def document_fingerprints(conn: sqlite3.Connection, spec: Dict[str, Any]) -> Dict[str, Tuple[str, int]]:
+    """{doc_key: (sha1 of its rows, row count)} in one ordered scan."""
+    out: Dict[str, Tuple[str, int]] = {}
+    cur_key, h, n = None, None, 0
+    for row in conn.execute(f"SELECT {spec['doc']}, {_select(spec)} FROM {spec['table']} ORDER BY {spec['doc']}, {spec['order']};"):
+        if row[0] != cur_key:
+            if cur_key is not None: out[cur_key] = (h.hexdigest(), n)
+            cur_key, h, n = row[0], hashlib.sha1(), 0
+        h.update(repr(row[1:]).encode("utf-8")); n += 1
+    if cur_key is not None: out[cur_key] = (h.hexdigest(), n)
+    return out
+
+def iter_chunks(conn: sqlite3.Connection, spec: Dict[str, Any], schema: List[Tuple[str, str]],
+                doc_key: str, chunk_size: int) -> Iterator[Dict[str, list]]:
+    """Column-oriented chunks of one document's rows, JSON already flattened."""
+    n_cols, n_lists = len(spec["columns"]), len(spec["lists"])
+    params = [(name, name[len("param_"):], kind) for name, kind in schema if name.startswith("param_")]
+    cur = conn.execute(f"SELECT {_select(spec)} FROM {spec['table']} WHERE {spec['doc']} = ? ORDER BY {spec['order']};", (doc_key,))
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows: return
+        chunk: Dict[str, list] = {name: [] for name, _ in schema}
+        for row in rows:
+            for (name, _), v in zip(spec["columns"], row[:n_cols]):
+                chunk[name].append(v)
+            for (name, _), v in zip(spec["lists"], row[n_cols:n_cols + n_lists]):
+                chunk[name].append([str(x) for x in _loads(v, [])])
+            p = _loads(row[-1], {}) if spec["params"] else {}
+            for name, key, kind in params:
+                v = p.get(key)
+                if kind == "float":
+                    chunk[name].append(float(v) if isinstance(v, (int, float)) else None)
+                else:
+                    chunk[name].append(v if v is None or isinstance(v, str) else json.dumps(v, ensure_ascii=False))
+        yield chunk
+
+# ─── Writers ───────────────────────────────────────────────────────────
+
+class _ArrowWriter:
+    def __init__(self, path: str, schema: List[Tuple[str, str]], fmt: str):
+        import pyarrow as pa
+        self.pa = pa
+        types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string(), "list": pa.list_(pa.string())}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in schema])
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+            self.write = lambda batch: self.writer.write_batch(batch)
+        else:
+            self.sink = pa.OSFile(path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+            self.write = lambda batch: self.writer.write_batch(batch)
+
+    def append(self, chunk: Dict[str, list]):
+        self.write(self.pa.record_batch([chunk[f.name] for f in self.schema], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        if hasattr(self, "sink"): self.sink.close()
+
+class _NpyWriter:
+    def __init__(self, path: str, schema: List[Tuple[str, str]], n_rows: int):
+        import numpy as np
+        from numpy.lib.format import open_memmap
+        os.makedirs(path, exist_ok=True)
+        self.np, self.path, self.schema, self.pos = np, path, schema, 0
+        dtypes = {"int": np.int64, "float": np.float64, "str": np.int32, "list": np.int32}
+        self.arrays = {name: open_memmap(os.path.join(path, f"{name}.npy"), mode="w+", dtype=dtypes[kind], shape=(n_rows,))
+                       for name, kind in schema}
+        self.vocab: Dict[str, Dict[str, int]] = {name: {} for name, kind in schema if kind in ("str", "list")}
+
+    def _codes(self, name: str, values: list) -> list:
+        vocab = self.vocab[name]
+        out = []
+        for v in values:
+            if v is None: out.append(-1); continue
+            if isinstance(v, list): v = json.dumps(v, ensure_ascii=False)
+            out.append(vocab.setdefault(v, len(vocab)))
+        return out
+
+    def append(self, chunk: Dict[str, list]):
+        n = len(next(iter(chunk.values())))
+        for name, kind in self.schema:
+            values = chunk[name]
+            if kind in ("str", "list"): values = self._codes(name, values)
+            elif kind == "float": values = [self.np.nan if v is None else v for v in values]
+            self.arrays[name][self.pos:self.pos + n] = values
+        self.pos += n
+
+    def close(self):
+        for arr in self.arrays.values(): arr.flush()
+        for name, vocab in self.vocab.items():
+            with open(os.path.join(self.path, f"{name}.vocab.json"), "w", encoding="utf-8") as f:
+                json.dump(list(vocab), f, ensure_ascii=False)
+
+# ─── Export ────────────────────────────────────────────────────────────
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        for name in os.listdir(path): os.remove(os.path.join(path, name))
+        os.rmdir(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def export(db_path: str, out_dir: str, fmt: str="arrow", chunk_size: int=10000,
+           tables: List[str] | None=None, full: bool=False) -> Dict[str, Any]:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {FORMATS}")
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    manifest = _loads(open(manifest_path, encoding="utf-8").read(), {}) if os.path.exists(manifest_path) else {}
+    if manifest.get("format") != fmt:
+        manifest = {"format": fmt, "tables": {}}
+
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        for name in tables or list(TABLES):
+            spec = TABLES[name]
+            schema = table_schema(conn, spec)
+            prev = manifest["tables"].get(name, {})
+            # A new params key changes every file's columns: rewrite the whole table
+            rewrite_all = full or prev.get("schema") != [list(c) for c in schema]
+            docs_prev = {} if rewrite_all else prev.get("docs", {})
+            docs_now = document_fingerprints(conn, spec)
+            table_dir = os.path.join(out_dir, name)
+            os.makedirs(table_dir, exist_ok=True)
+            written = 0
+            docs_out = {}
+            for doc_key, (fingerprint, n_rows) in docs_now.items():
+                old = docs_prev.get(doc_key)
+                if old and old["fingerprint"] == fingerprint:
+                    docs_out[doc_key] = old; continue
+                rel = os.path.join(name, _slug(doc_key) + ("" if fmt == "npy" else f".{fmt}"))
+                path = os.path.join(out_dir, rel)
+                _remove(path)
+                writer = _NpyWriter(path, schema, n_rows) if fmt == "npy" else _ArrowWriter(path, schema, fmt)
+                try:
+                    for chunk in iter_chunks(conn, spec, schema, doc_key, chunk_size):
+                        writer.append(chunk)
+                finally:
+                    writer.close()
+                docs_out[doc_key] = dict(path=rel, fingerprint=fingerprint, rows=n_rows)
+                written += 1
+            for doc_key, old in prev.get("docs", {}).items():
+                if doc_key not in docs_out or docs_out[doc_key]["path"] != old["path"]:
+                    _remove(os.path.join(out_dir, old["path"]))
+            manifest["tables"][name] = dict(schema=[list(c) for c in schema], docs=docs_out)
+            log.info("%s: %d documents (%d rewritten, %d unchanged)", name, len(docs_out), written, len(docs_out) - written)
+    finally:
+        conn.close()
+
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, manifest_path)
+    return manifest
+
+def main():
+    ap = argparse.ArgumentParser(description="Export harvested steps and doc functions to columnar files")
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--format", choices=FORMATS, default="arrow")
+    ap.add_argument("--chunk-size", type=int, default=10000)
+    ap.add_argument("--table", action="append", choices=list(TABLES), help="Default: all tables")
+    ap.add_argument("--full", action="store_true", help="Rewrite every document")
+    ap.add_argument("--log-level", default="INFO")
+    args = ap.parse_args()
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    export(args.db, args.out, fmt=args.format, chunk_size=args.chunk_size, tables=args.table, full=args.full)
+
+if __name__ == "__main__":
+    main()
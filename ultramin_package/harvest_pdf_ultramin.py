@@ -1,11 +1,15 @@
 # harvest_pdf_ultramin.py
 from __future__ import annotations
-import re, json, argparse, sqlite3, logging
-from typing import List, Dict, Any
-from schema_ultra_combo import init_db
+import os, re, json, time, hashlib, argparse, sqlite3, logging
+from typing import List, Dict, Any, NamedTuple, Tuple
+from schema_ultra_combo import HarvestedStep, init_db, insert_sql
+from dedup_ultramin import THRESHOLD as DEDUP_THRESHOLD, Fingerprint, StepIndex, dedup_stats, fingerprint, release_doc
+from Agentic import telemetry  # importable once schema_ultra_combo has set up sys.path
+from Agentic.telemetry import traced
 
 log = logging.getLogger("harvest_pdf_ultramin")
 
+@traced("harvest.extract_pdf_text_pages", items=len)
 def extract_pdf_text_pages(pdf_path: str) -> List[str]:
     pages = []
     try:
@@ -150,7 +154,41 @@ RULES = [
 def compact_params(d: Dict[str, Any]) -> Dict[str, Any]:
     return {k:v for k,v in d.items() if v not in (None, "", [], {})}
 
-def classify_line(line: str):
+def _code_parts(code) -> list:
+    parts = [code.co_code, code.co_names]
+    for c in code.co_consts:
+        parts.extend(_code_parts(c) if hasattr(c, "co_code") else [repr(c)])
+    return parts
+
+def rules_fingerprint() -> str:
+    """Hash of RULES (keys, patterns, flags and the parser bytecode) for incremental rebuilds."""
+    h = hashlib.sha256()
+    for rule in RULES:
+        h.update(f"{rule['key']}|{rule['rx'].pattern}|{rule['rx'].flags}".encode("utf-8"))
+        for name in ("parse", "more", "produces"):
+            for part in _code_parts(rule[name].__code__):
+                h.update(part if isinstance(part, bytes) else repr(part).encode("utf-8"))
+    return h.hexdigest()
+
+class ParsedLine(NamedTuple):
+    action: str
+    params: Dict[str, Any]
+    produces: Tuple[str, ...]
+    references: Tuple[str, ...]
+
+NOTE = ParsedLine("note", {}, (), ())
+
+def classify_line(line: str) -> ParsedLine | None:
+    if not telemetry.enabled:
+        return _classify(line)
+    # Timed per outcome rule ("none" = no rule matched): shows which patterns cost the most
+    t0 = time.perf_counter()
+    parsed = _classify(line)
+    telemetry.observe("harvest.classify_line", time.perf_counter() - t0, items=1,
+                      rule=parsed.action if parsed else "none")
+    return parsed
+
+def _classify(line: str) -> ParsedLine | None:
     for rule in RULES:
         if rule["rx"].search(line):
             params = {}
@@ -158,79 +196,140 @@ def classify_line(line: str):
             except Exception: pass
             try: params.update(rule["more"](line) or {})
             except Exception: pass
-            produces = []
-            try: produces = rule["produces"](line) or []
+            produces = ()
+            try: produces = tuple(rule["produces"](line) or ())
             except Exception: pass
             refs = set(re.findall(r'(?:Point|Line|Plane|Spline|Extrude|Join|ThickSurface|Multi-?sections? Surface)\.\d+|(?:xy|yz|zx)\s*plane|[XYZ]\s*axis', line, flags=re.I))
-            for p in produces: 
-                if p in refs: refs.remove(p)
-            return dict(action=rule["key"], params=compact_params(params), produces=produces, references=sorted(refs, key=str.lower))
+            refs.difference_update(produces)
+            return ParsedLine(rule["key"], compact_params(params), produces, tuple(sorted(refs, key=str.lower)))
     return None
 
-def harvest(pdf_path: str, db_path: str, overwrite: bool=False) -> str:
-    conn = init_db(db_path, overwrite=overwrite)
-    cur = conn.cursor()
-    pages = extract_pdf_text_pages(pdf_path)
-    text = "\n".join(pages)
-    blocks = re.split(r'\bStep\s*(\d+)\b', text, flags=re.I)
-    inserts = []
-    step_id = 0
+def _step_row(step_id: int, line: str, parsed: ParsedLine, source_doc: str) -> HarvestedStep:
+    return HarvestedStep(step_id, parsed.action, line, json.dumps(parsed.params, ensure_ascii=False),
+                         json.dumps(parsed.produces, ensure_ascii=False),
+                         json.dumps(parsed.references, ensure_ascii=False), None, None, source_doc)
 
+def _step_lines(text: str) -> Tuple[List[List[str]], bool]:
+    """Candidate lines of each step, and whether they came from "Step N" blocks (else one line each)."""
+    blocks = re.split(r'\bStep\s*(\d+)\b', text, flags=re.I)
     if len(blocks) > 1:
+        out = []
         for i in range(1, len(blocks), 2):
-            content = blocks[i+1]
-            lines = [ln.strip() for ln in re.split(r'[\n\r]+', content) if len(ln.strip()) > 4]
-            if not lines: continue
-            chosen = None
-            for ln in lines:
-                parsed = classify_line(ln)
-                if parsed:
-                    chosen = (ln, parsed); break
-            if not chosen: 
-                parsed = dict(action="note", params={}, produces=[], references=[]); chosen = (lines[0], parsed)
-            step_id += 1
-            ln, parsed = chosen
-            inserts.append((
-                step_id, parsed["action"], ln,
-                json.dumps(parsed["params"], ensure_ascii=False),
-                json.dumps(parsed["produces"], ensure_ascii=False),
-                json.dumps(parsed["references"], ensure_ascii=False),
-                None, None
-            ))
-    else:
-        for ln in [ln.strip() for ln in re.split(r'[\n\r]+', text) if len(ln.strip()) > 4]:
-            parsed = classify_line(ln)
-            if not parsed: continue
+            lines = [ln.strip() for ln in re.split(r'[\n\r]+', blocks[i+1]) if len(ln.strip()) > 4]
+            if lines: out.append(lines)
+        return out, True
+    return [[ln.strip()] for ln in re.split(r'[\n\r]+', text) if len(ln.strip()) > 4], False
+
+def _parse_step(lines: List[str], block: bool) -> Tuple[str, ParsedLine] | None:
+    # The first line a rule matches; a "Step N" block without one is kept as a note
+    for ln in lines:
+        parsed = classify_line(ln)
+        if parsed: return ln, parsed
+    return (lines[0], NOTE) if block else None
+
+def parse_pdf(pdf_path: str) -> List[Tuple[str, ParsedLine]]:
+    """(line, parse) per step of the manual, in order."""
+    candidates, block = _step_lines("\n".join(extract_pdf_text_pages(pdf_path)))
+    return [step for step in (_parse_step(lines, block) for lines in candidates) if step]
+
+@traced("harvest.pdf")
+def harvest(pdf_path: str, db_path: str, overwrite: bool=False, dedup: float | None=DEDUP_THRESHOLD) -> str:
+    """Store a manual's steps. With ``dedup`` (a similarity threshold, see dedup_ultramin), a step
+    that neither creates nor references a feature and near-duplicates such a step already stored,
+    in this or any manual, is not stored again: it becomes an occurrence of that canonical row.
+    Every other step is stored, so names (Spline.2, Point.1) resolve within its own manual."""
+    from codegen_ultramin import implicit_kind
+    conn = init_db(db_path, overwrite=overwrite, timeout=30)  # doc_scrape may be writing too
+    candidates, block = _step_lines("\n".join(extract_pdf_text_pages(pdf_path)))
+    source_doc = os.path.basename(pdf_path)
+    # Classify and fingerprint before taking the write lock; the transaction only releases, matches and inserts
+    steps: List[Tuple[str, ParsedLine, Fingerprint | None]] = []
+    for lines in candidates:
+        step = _parse_step(lines, block)
+        if step is None: continue
+        line, parsed = step
+        # Only self-contained steps are shared: one that creates or references a feature
+        # depends on which step of this manual produced it
+        shared = dedup and not (parsed.produces or parsed.references or implicit_kind(parsed.action))
+        steps.append((line, parsed, fingerprint(" ".join(lines)) if shared else None))
+    with telemetry.span("harvest.insert", source_doc=source_doc) as s, conn:
+        # Re-harvesting a manual replaces its steps; new steps continue after the corpus' last step_id
+        release_doc(conn, source_doc)
+        step_id = conn.execute("SELECT COALESCE(MAX(step_id), 0) FROM harvested_steps_ultramin;").fetchone()[0]
+        index = StepIndex(dedup, conn) if dedup else None
+        inserts: List[HarvestedStep] = []
+        occurrences: List[Tuple[str, int, int, float]] = []
+        for line, parsed, fp in steps:
+            if fp is not None:
+                canonical, similarity = index.lookup(fp)
+                if canonical is not None:
+                    occurrences.append((source_doc, len(occurrences) + 1, canonical, similarity))
+                    continue
             step_id += 1
-            inserts.append((
-                step_id, parsed["action"], ln,
-                json.dumps(parsed["params"], ensure_ascii=False),
-                json.dumps(parsed["produces"], ensure_ascii=False),
-                json.dumps(parsed["references"], ensure_ascii=False),
-                None, None
-            ))
-
-    if inserts:
-        cur.executemany("""
-            INSERT INTO harvested_steps_ultramin
-            (step_id, action_label, description, params_json, produces_json, references_json, code_lang, generated_code)
-            VALUES (?,?,?,?,?,?,?,?);
-        """, inserts)
-        conn.commit()
+            inserts.append(_step_row(step_id, line, parsed, source_doc))
+            occurrences.append((source_doc, len(occurrences) + 1, step_id, 1.0))
+            if fp is not None: index.add(step_id, fp)
+        if inserts:
+            conn.executemany(insert_sql("harvested_steps_ultramin", HarvestedStep), inserts)
+        conn.executemany("INSERT INTO step_occurrences_ultramin(source_doc, position, step_id, similarity) "
+                         "VALUES (?, ?, ?, ?)", occurrences)
+        if index is not None: index.save()
+        s.add(len(inserts))
+    duplicates = len(occurrences) - len(inserts)
+    telemetry.count("harvest.steps", len(inserts), source_doc=source_doc)
+    telemetry.count("harvest.duplicates", duplicates, source_doc=source_doc)
+    if dedup:
+        log.info("🧬 %s: %d steps, %d near-duplicates -> %d new rows (%.0f%% fewer)", source_doc, len(occurrences),
+                 duplicates, len(inserts), 100.0 * duplicates / len(occurrences) if occurrences else 0.0)
     conn.close()
     return db_path
 
+@traced("harvest.pdf_sharded")
+def harvest_to_shards(pdf_path: str, shards_dir: str) -> int:
+    """Harvest one manual into its shard of a sharded corpus (see shards_ultramin)."""
+    from shards_ultramin import ShardRouter
+    source_doc = os.path.basename(pdf_path)
+    rows = [_step_row(i, ln, parsed, source_doc) for i, (ln, parsed) in enumerate(parse_pdf(pdf_path), start=1)]
+    with ShardRouter(shards_dir) as router:
+        n = router.write_steps(source_doc, rows)
+    telemetry.count("harvest.steps", n, source_doc=source_doc)
+    return n
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--pdf", required=True)
-    ap.add_argument("--db", required=True)
+    ap.add_argument("--pdf", required=True, nargs="+")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db")
+    target.add_argument("--shards", help="Sharded corpus directory; manuals are harvested in parallel")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="Harvest processes with --shards")
     ap.add_argument("--overwrite", action="store_true")
+    ap.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                    help="Similarity at which a step is stored once as a near-duplicate (--db only)")
+    ap.add_argument("--no-dedup", action="store_true", help="Store every step")
     ap.add_argument("--log-level", default="INFO")
+    ap.add_argument("--telemetry", help="Write a JSON timing/throughput report here")
     args = ap.parse_args()
-    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO),
-                        format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
-    out = harvest(args.pdf, args.db, overwrite=args.overwrite)
-    log.info("Harvested -> %s", out)
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    if args.telemetry: telemetry.enable()
+    if args.shards:
+        from concurrent.futures import ProcessPoolExecutor
+        from shards_ultramin import ShardRouter
+        with ShardRouter(args.shards) as router:  # create the layout before workers open shards
+            if args.overwrite: router.clear("steps")
+        # Manuals on different shards are written concurrently; CPU-bound parsing needs processes
+        with ProcessPoolExecutor(min(args.workers or 1, len(args.pdf))) as pool:
+            for pdf, n in zip(args.pdf, pool.map(harvest_to_shards, args.pdf, [args.shards] * len(args.pdf))):
+                log.info("Harvested %s: %d steps -> %s", pdf, n, args.shards)
+    else:
+        dedup = None if args.no_dedup else args.dedup_threshold
+        for i, pdf in enumerate(args.pdf):
+            out = harvest(pdf, args.db, overwrite=args.overwrite and i == 0, dedup=dedup)
+            log.info("Harvested -> %s", out)
+        conn = init_db(args.db)
+        log.info("Corpus dedup: %s", dedup_stats(conn))
+        conn.close()
+    telemetry.export(json_path=args.telemetry)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,99 @@
+# query_steps_ultramin.py
+from __future__ import annotations
+import re, json, sqlite3, argparse, logging
+from typing import Any, Dict, List, Tuple
+from schema_ultra_combo import PARAM_COLUMNS
+
+log = logging.getLogger("query_steps_ultramin")
+
+# Filter dict -> indexed SQL over harvested_steps_ultramin.
+#   {"thickness_mm": (">", 2)}           generated column p_thickness_mm (indexed)
+#   {"references": "Plane.3"}           step_refs_ultramin (indexed, case-insensitive)
+#   {"action_label": ("in", [...])}     plain column
+#   {"H": ("<=", 0)}                    any other params_json key (json_extract, not indexed)
+OPS = {"=": "=", "==": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "like": "LIKE", "in": "IN"}
+COLUMNS = ("step_id", "action_label", "description", "code_lang")
+REF_KINDS = ("references", "produces")
+KEY_RX = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+def _condition(expr: str, op: str, value: Any) -> Tuple[str, List[Any]]:
+    sql_op = OPS.get(str(op).lower())
+    if sql_op is None:
+        raise ValueError(f"Unsupported operator: {op!r}")
+    if sql_op == "IN":
+        values = list(value)
+        return f"{expr} IN ({','.join('?' * len(values))})", values
+    if value is None:
+        return f"{expr} IS {'NOT ' if sql_op == '!=' else ''}NULL", []
+    return f"{expr} {sql_op} ?", [value]
+
+# "+step_id" keeps the planner from scanning in rowid order to skip a sort, which it
+# otherwise prefers over a range search on the generated-column indexes
+def build_query(filters: Dict[str, Any], select: str="*", order_by: str="+step_id",
+                limit: int | None=None) -> Tuple[str, List[Any]]:
+    where, args = [], []
+    for key, spec in (filters or {}).items():
+        op, value = spec if isinstance(spec, (tuple, list)) and len(spec) == 2 and str(spec[0]).lower() in OPS else ("=", spec)
+        if key in REF_KINDS:
+            cond, vals = _condition("r.ref", op, value)
+            where.append(f"step_id IN (SELECT r.step_id FROM step_refs_ultramin r WHERE r.kind = ? AND {cond})")
+            args += [key] + vals
+            continue
+        if key in PARAM_COLUMNS:
+            expr = PARAM_COLUMNS[key][0]
+        elif key in COLUMNS:
+            expr = key
+        elif KEY_RX.match(key):
+            expr = f"(CASE WHEN json_valid(params_json) THEN json_extract(params_json, '$.{key}') END)"
+        else:
+            raise ValueError(f"Invalid filter key: {key!r}")
+        cond, vals = _condition(expr, op, value)
+        where.append(cond); args += vals
+    sql = f"SELECT {select} FROM harvested_steps_ultramin"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit is not None:
+        sql += " LIMIT ?"; args.append(int(limit))
+    return sql, args
+
+def _loads(text: str | None, default: Any) -> Any:
+    try: return json.loads(text) if text else default
+    except ValueError: return default
+
+def find_steps(conn: sqlite3.Connection, filters: Dict[str, Any], limit: int | None=None) -> List[Dict[str, Any]]:
+    sql, args = build_query(filters, select="step_id, action_label, description, params_json, produces_json, references_json", limit=limit)
+    log.debug("find_steps: %s %s", sql, args)
+    out = []
+    for step_id, action, desc, params, produces, refs in conn.execute(sql, args):
+        out.append(dict(step_id=step_id, action_label=action, description=desc,
+                        params=_loads(params, {}), produces=_loads(produces, []),
+                        references=_loads(refs, [])))
+    return out
+
+def explain(conn: sqlite3.Connection, filters: Dict[str, Any]) -> List[str]:
+    """Query plan lines, to confirm a filter is served by an index."""
+    sql, args = build_query(filters)
+    return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, args)]
+
+def main():
+    ap = argparse.ArgumentParser(description="Filter harvested steps by indexed JSON parameters")
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--filter", required=True, help='JSON, e.g. {"thickness_mm": [">", 2], "references": "Plane.3"}')
+    ap.add_argument("--limit", type=int)
+    ap.add_argument("--explain", action="store_true")
+    ap.add_argument("--log-level", default="INFO")
+    args = ap.parse_args()
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    conn = sqlite3.connect(args.db)
+    filters = json.loads(args.filter)
+    if args.explain:
+        print("\n".join(explain(conn, filters)))
+    for row in find_steps(conn, filters, limit=args.limit):
+        print(json.dumps(row, ensure_ascii=False))
+    conn.close()
+
+if __name__ == "__main__":
+    main()
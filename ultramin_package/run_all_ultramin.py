@@ -16,8 +16,8 @@ def main():
     ap.add_argument("--link-limit", type=int, default=600)
     args = ap.parse_args()
 
-    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO),
-                        format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
 
     init_db(args.db, overwrite=args.overwrite_db)
 
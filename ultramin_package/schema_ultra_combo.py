@@ -1,10 +1,19 @@
 # schema_ultra_combo.py
 from __future__ import annotations
-import os, sqlite3
+import os, sys, sqlite3, argparse, logging
+from typing import NamedTuple
 
-SCHEMA_SQL = """
-PRAGMA foreign_keys = ON;
+try:
+    from Agentic.migrations import Migration, migrate
+    from Agentic.stats import stats_migration_sql
+except ImportError:  # run from inside ultramin_package/
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from Agentic.migrations import Migration, migrate
+    from Agentic.stats import stats_migration_sql
+
+log = logging.getLogger("schema_ultra_combo")
 
+SCHEMA_SQL = """
 -- Minimal doc table for scraped CATIA documentation
 CREATE TABLE IF NOT EXISTS doc_functions_ultramin (
   function_key   TEXT PRIMARY KEY,   -- e.g., hybridshapefactory.addnewplaneoffset
@@ -28,9 +37,220 @@ CREATE TABLE IF NOT EXISTS harvested_steps_ultramin (
 );
 """
 
-def init_db(db_path: str, overwrite: bool=False) -> sqlite3.Connection:
-    if overwrite and os.path.exists(db_path):
+INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_doc_functions_action ON doc_functions_ultramin(action_label);
+CREATE INDEX IF NOT EXISTS idx_harvested_steps_action ON harvested_steps_ultramin(action_label);
+"""
+
+# Commonly filtered params_json keys -> indexed generated columns (see query_steps_ultramin)
+PARAM_COLUMNS = {
+    "offset_mm": ("p_offset_mm", "REAL"),
+    "angle_deg": ("p_angle_deg", "REAL"),
+    "thickness_mm": ("p_thickness_mm", "REAL"),
+    "target": ("p_target", "TEXT"),
+    "profile": ("p_profile", "TEXT"),
+}
+
+# Virtual columns: computed from params_json on read, materialized only in their indexes
+PARAM_COLUMNS_SQL = "".join(
+    f"ALTER TABLE harvested_steps_ultramin ADD COLUMN {col} {typ} GENERATED ALWAYS AS "
+    f"(CASE WHEN json_valid(params_json) THEN json_extract(params_json, '$.{key}') END) VIRTUAL;\n"
+    for key, (col, typ) in PARAM_COLUMNS.items()
+) + """
+-- One row per feature a step produces or references (e.g. Plane.3), kept in sync by triggers
+CREATE TABLE IF NOT EXISTS step_refs_ultramin (
+  ref      TEXT NOT NULL COLLATE NOCASE,
+  kind     TEXT NOT NULL,               -- 'produces' or 'references'
+  step_id  INTEGER NOT NULL,
+  PRIMARY KEY (ref, kind, step_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_step_refs_ins AFTER INSERT ON harvested_steps_ultramin BEGIN
+  INSERT OR IGNORE INTO step_refs_ultramin(ref, kind, step_id)
+    SELECT value, 'produces', NEW.step_id FROM json_each(CASE WHEN json_valid(NEW.produces_json) THEN NEW.produces_json ELSE '[]' END);
+  INSERT OR IGNORE INTO step_refs_ultramin(ref, kind, step_id)
+    SELECT value, 'references', NEW.step_id FROM json_each(CASE WHEN json_valid(NEW.references_json) THEN NEW.references_json ELSE '[]' END);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_step_refs_del AFTER DELETE ON harvested_steps_ultramin BEGIN
+  DELETE FROM step_refs_ultramin WHERE step_id = OLD.step_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_step_refs_upd AFTER UPDATE OF step_id, produces_json, references_json ON harvested_steps_ultramin BEGIN
+  DELETE FROM step_refs_ultramin WHERE step_id = OLD.step_id;
+  INSERT OR IGNORE INTO step_refs_ultramin(ref, kind, step_id)
+    SELECT value, 'produces', NEW.step_id FROM json_each(CASE WHEN json_valid(NEW.produces_json) THEN NEW.produces_json ELSE '[]' END);
+  INSERT OR IGNORE INTO step_refs_ultramin(ref, kind, step_id)
+    SELECT value, 'references', NEW.step_id FROM json_each(CASE WHEN json_valid(NEW.references_json) THEN NEW.references_json ELSE '[]' END);
+END;
+
+INSERT OR IGNORE INTO step_refs_ultramin(ref, kind, step_id)
+  SELECT j.value, 'produces', s.step_id FROM harvested_steps_ultramin s, json_each(s.produces_json) j
+  WHERE json_valid(s.produces_json);
+INSERT OR IGNORE INTO step_refs_ultramin(ref, kind, step_id)
+  SELECT j.value, 'references', s.step_id FROM harvested_steps_ultramin s, json_each(s.references_json) j
+  WHERE json_valid(s.references_json);
+"""
+
+PARAM_INDEX_SQL = "".join(
+    f"CREATE INDEX IF NOT EXISTS idx_harvested_steps_{col} ON harvested_steps_ultramin({col});\n"
+    for col, _ in PARAM_COLUMNS.values()
+) + "CREATE INDEX IF NOT EXISTS idx_step_refs_step ON step_refs_ultramin(step_id);\n"
+
+# Which manual a step came from, so a corpus can hold many documents
+SOURCE_DOC_SQL = """
+ALTER TABLE harvested_steps_ultramin ADD COLUMN source_doc TEXT;
+CREATE INDEX IF NOT EXISTS idx_harvested_steps_doc ON harvested_steps_ultramin(source_doc, step_id);
+CREATE INDEX IF NOT EXISTS idx_doc_functions_factory ON doc_functions_ultramin(api_factory, function_key);
+"""
+
+# Generated-code templates shared by structurally identical steps (see codegen_ultramin)
+CODEGEN_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS codegen_cache_ultramin (
+  template_key  TEXT PRIMARY KEY,        -- sha256 of action_label + code_lang + parameter/dependency shape
+  action_label  TEXT NOT NULL,
+  code_lang     TEXT,
+  template      TEXT NOT NULL,           -- code with __pN__ / __dN__ placeholders
+  hits          INTEGER NOT NULL DEFAULT 0,
+  created_at    REAL NOT NULL,
+  last_used     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_codegen_cache_used ON codegen_cache_ultramin(last_used);
+"""
+
+# Numeric parameters as (step, feature, name, value, unit) rows, kept in sync by triggers;
+# read column-wise by Agentic.param_checks. set_parameter steps store {"name": n, "value": v}.
+def _numeric_params_select(step: str, source: str="") -> str:
+    return f"""SELECT {step}.step_id,
+         CASE WHEN j.key = 'value' AND json_type({step}.params_json, '$.name') = 'text'
+              THEN json_extract({step}.params_json, '$.name') ELSE j.key END,
+         COALESCE(json_extract({step}.params_json, '$.target'),
+                  CASE WHEN json_valid({step}.produces_json) THEN json_extract({step}.produces_json, '$[0]') END,
+                  {step}.action_label),
+         j.value,
+         CASE WHEN j.key LIKE '%\\_mm' ESCAPE '\\' THEN 'mm'
+              WHEN j.key LIKE '%\\_deg' ESCAPE '\\' THEN 'deg'
+              WHEN {step}.description GLOB '*[0-9] mm*' OR {step}.description GLOB '*[0-9]mm*' THEN 'mm'
+              WHEN {step}.description GLOB '*[0-9] deg*' OR {step}.description GLOB '*[0-9]deg*' THEN 'deg' END
+    FROM {source}json_each(CASE WHEN json_valid({step}.params_json) THEN {step}.params_json ELSE '{{}}' END) j
+    WHERE j.type IN ('integer', 'real')"""
+
+NUMERIC_PARAMS_SQL = f"""
+CREATE TABLE IF NOT EXISTS step_params_ultramin (
+  step_id  INTEGER NOT NULL,
+  name     TEXT NOT NULL,               -- params_json key, or the set_parameter name
+  feature  TEXT,                        -- target, else first produced feature, else action_label
+  value    REAL NOT NULL,
+  unit     TEXT,                        -- 'mm', 'deg' or NULL (unitless)
+  PRIMARY KEY (step_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_step_params_name ON step_params_ultramin(name, value);
+
+CREATE TRIGGER IF NOT EXISTS trg_step_params_ins AFTER INSERT ON harvested_steps_ultramin BEGIN
+  INSERT OR REPLACE INTO step_params_ultramin(step_id, name, feature, value, unit)
+    {_numeric_params_select("NEW")};
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_step_params_del AFTER DELETE ON harvested_steps_ultramin BEGIN
+  DELETE FROM step_params_ultramin WHERE step_id = OLD.step_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_step_params_upd
+AFTER UPDATE OF step_id, action_label, description, params_json, produces_json ON harvested_steps_ultramin BEGIN
+  DELETE FROM step_params_ultramin WHERE step_id = OLD.step_id;
+  INSERT OR REPLACE INTO step_params_ultramin(step_id, name, feature, value, unit)
+    {_numeric_params_select("NEW")};
+END;
+
+INSERT OR REPLACE INTO step_params_ultramin(step_id, name, feature, value, unit)
+  {_numeric_params_select("s", "harvested_steps_ultramin s, ")};
+"""
+
+# Near-duplicate steps are stored once (see dedup_ultramin): every step of a manual is an
+# occurrence pointing at its canonical row; canonical rows keep a MinHash signature and LSH band keys
+DEDUP_SQL = """
+CREATE TABLE IF NOT EXISTS step_occurrences_ultramin (
+  source_doc  TEXT NOT NULL,
+  position    INTEGER NOT NULL,        -- step order within the manual
+  step_id     INTEGER NOT NULL,        -- canonical row in harvested_steps_ultramin
+  similarity  REAL NOT NULL,           -- estimated Jaccard similarity to it (1.0 = the row itself)
+  PRIMARY KEY (source_doc, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_step_occurrences_step ON step_occurrences_ultramin(step_id);
+
+CREATE TABLE IF NOT EXISTS step_fingerprints_ultramin (
+  step_id    INTEGER PRIMARY KEY,
+  numbers    TEXT NOT NULL,            -- numbers in the text; duplicates must match exactly
+  signature  BLOB NOT NULL             -- MinHash values, little-endian uint32
+);
+
+CREATE TABLE IF NOT EXISTS step_lsh_ultramin (
+  band_key  INTEGER NOT NULL,
+  step_id   INTEGER NOT NULL,
+  PRIMARY KEY (band_key, step_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_step_lsh_step ON step_lsh_ultramin(step_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_step_fingerprints_del AFTER DELETE ON harvested_steps_ultramin BEGIN
+  DELETE FROM step_fingerprints_ultramin WHERE step_id = OLD.step_id;
+  DELETE FROM step_lsh_ultramin WHERE step_id = OLD.step_id;
+END;
+"""
+
+# Ordered, append-only (see Agentic.migrations)
+MIGRATIONS = [
+    Migration(1, "initial_schema", SCHEMA_SQL),
+    Migration(2, "action_label_indexes", INDEX_SQL, online=True),
+    Migration(3, "row_count_triggers", stats_migration_sql(["doc_functions_ultramin", "harvested_steps_ultramin"])),
+    Migration(4, "json_param_columns", PARAM_COLUMNS_SQL),
+    Migration(5, "json_param_indexes", PARAM_INDEX_SQL, online=True),
+    Migration(6, "step_source_doc", SOURCE_DOC_SQL),
+    Migration(7, "codegen_cache", CODEGEN_CACHE_SQL),
+    Migration(8, "numeric_params", NUMERIC_PARAMS_SQL),
+    Migration(9, "step_dedup", DEDUP_SQL),
+]
+
+# Stored rows as tuples in column order: lists of these go straight into executemany
+class DocFunction(NamedTuple):
+    function_key: str
+    api_factory: str
+    api_method: str
+    action_label: str
+    doc_url: str | None
+    tokens_json: str
+
+class HarvestedStep(NamedTuple):
+    step_id: int
+    action_label: str
+    description: str
+    params_json: str
+    produces_json: str | None
+    references_json: str | None
+    code_lang: str | None
+    generated_code: str | None
+    source_doc: str | None
+
+def insert_sql(table: str, record: type, verb: str="INSERT") -> str:
+    cols = record._fields
+    return f"{verb} INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+
+def init_db(db_path: str, overwrite: bool=False, dry_run: bool=False, **connect_args) -> sqlite3.Connection:
+    if overwrite and os.path.exists(db_path) and not dry_run:
         os.remove(db_path)
-    conn = sqlite3.connect(db_path)
-    conn.executescript(SCHEMA_SQL)
+    conn = sqlite3.connect(db_path, **connect_args)
+    conn.execute("PRAGMA foreign_keys = ON")
+    migrate(conn, MIGRATIONS, dry_run=dry_run)
     return conn
+
+def main():
+    ap = argparse.ArgumentParser(description="Create or migrate the ultramin knowledge DB")
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--dry-run", action="store_true", help="List pending migrations only")
+    ap.add_argument("--log-level", default="INFO")
+    args = ap.parse_args()
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    init_db(args.db, dry_run=args.dry_run).close()
+
+if __name__ == "__main__":
+    main()
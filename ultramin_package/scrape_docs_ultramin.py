@@ -2,14 +2,25 @@
 from __future__ import annotations
 import re, argparse, logging, time, json, sqlite3
 from urllib.parse import urljoin, urlparse, urlunparse, urldefrag
-from typing import List, Tuple, Set
-import requests
-from bs4 import BeautifulSoup
-from schema_ultra_combo import init_db
+from typing import List, Tuple, Set, TYPE_CHECKING
+from schema_ultra_combo import DocFunction, init_db, insert_sql
+from Agentic import telemetry  # importable once schema_ultra_combo has set up sys.path
+from Agentic.telemetry import traced
+if TYPE_CHECKING:
+    import requests
 
 log = logging.getLogger("scrape_docs_ultramin")
 UA = {"User-Agent": "Mozilla/5.0 (ultramin-scraper/1.0)"}
 
+# requests and bs4+lxml cost ~150 ms to import; load them only when a scrape runs
+def _requests():
+    import requests
+    return requests
+
+def _soup(html: str):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "lxml")
+
 FACTORY_RX = re.compile(r'\b(HybridShapeFactory|ShapeFactory|SurfaceFactory|Sketch\w+|HybridShape\w+|Part)\b')
 METHOD_RX  = re.compile(r'\bAddNew[A-Za-z0-9_]+\b')
 
@@ -36,6 +47,7 @@ def _norm_url(u: str) -> str:
     p = urlparse(u)
     return urlunparse((p.scheme, p.netloc, p.path, "", "", ""))
 
+@traced("scrape.discover_links", items=len)
 def discover_links(master_url: str, session: requests.Session, limit: int = 600) -> List[str]:
     base = urlparse(master_url)
     seen: Set[Tuple[str,str,str]] = set()
@@ -53,10 +65,12 @@ def discover_links(master_url: str, session: requests.Session, limit: int = 600)
             r = session.get(url, headers=UA, timeout=25)
             r.raise_for_status()
         except Exception as e:
+            if not out:
+                raise RuntimeError(f"Master index fetch failed: {url} ({e})") from e
             log.warning("Fetch failed: %s (%s)", url, e)
             continue
         out.append(url)
-        soup = BeautifulSoup(r.text, "lxml")
+        soup = _soup(r.text)
         for a in soup.find_all("a", href=True):
             nxt = urljoin(url, a["href"])
             nxtn = _norm_url(nxt)
@@ -68,8 +82,9 @@ def discover_links(master_url: str, session: requests.Session, limit: int = 600)
     log.info("Discovered %d unique pages", len(out))
     return out
 
+@traced("scrape.scrape_methods_from_page", items=len)
 def scrape_methods_from_page(url: str, html: str) -> List[Tuple[str,str,str]]:
-    soup = BeautifulSoup(html, "lxml")
+    soup = _soup(html)
     factories = set(FACTORY_RX.findall(html))
     for hx in soup.find_all(["h1","h2","h3","title"]):
         m = FACTORY_RX.search(hx.get_text(" ", strip=True) or "")
@@ -92,55 +107,81 @@ def scrape_methods_from_page(url: str, html: str) -> List[Tuple[str,str,str]]:
         factories = {"HybridShapeFactory"}
     return [(f, m, url) for f in factories for m in methods]
 
-def insert_docs(conn: sqlite3.Connection, items: List[Tuple[str,str,str]]):
-    cur = conn.cursor()
-    rows = []
-    for factory, method, doc_url in items:
-        key = normalize_key(factory, method)
-        action = action_from_method(method)
-        tokens = tokens_for(factory, method)
-        rows.append((key, factory, method, action, doc_url, json.dumps(tokens, ensure_ascii=False)))
-    cur.executemany("""
-        INSERT OR IGNORE INTO doc_functions_ultramin
-        (function_key, api_factory, api_method, action_label, doc_url, tokens_json)
-        VALUES (?,?,?,?,?,?);
-    """, rows)
-    conn.commit()
+def doc_rows(items: List[Tuple[str,str,str]]) -> List[DocFunction]:
+    return [DocFunction(normalize_key(factory, method), factory, method, action_from_method(method), doc_url,
+                        json.dumps(tokens_for(factory, method), ensure_ascii=False))
+            for factory, method, doc_url in items]
+
+@traced("scrape.insert_docs", items=lambda n: n)
+def insert_docs(conn: sqlite3.Connection, items: List[Tuple[str,str,str]], replace: bool=False):
+    rows = doc_rows(items)
+    with conn:  # with replace, the old rows go in the same transaction the new ones arrive in
+        if replace: conn.execute("DELETE FROM doc_functions_ultramin")
+        conn.executemany(insert_sql("doc_functions_ultramin", DocFunction, verb="INSERT OR IGNORE"), rows)
     return len(rows)
 
+def doc_validators(master_url: str, timeout: float = 5) -> str | None:
+    """HTTP cache validators (ETag/Last-Modified/Content-Length) of the master index,
+    or None when the server gives none; used to skip unchanged scrapes."""
+    try:
+        r = _requests().head(master_url, headers=UA, timeout=timeout, allow_redirects=True)
+        r.raise_for_status()
+    except Exception as e:
+        log.debug("HEAD failed: %s (%s)", master_url, e)
+        return None
+    parts = [r.headers.get(h, "") for h in ("ETag", "Last-Modified", "Content-Length")]
+    return "|".join(parts) if any(parts[:2]) else None
+
 def scrape(master_url: str, db_path: str, overwrite_docs: bool=False, link_limit: int=600) -> int:
-    conn = init_db(db_path, overwrite=False)
-    if overwrite_docs:
-        conn.execute("DELETE FROM doc_functions_ultramin;"); conn.commit()
-    session = requests.Session()
+    """Scrape into ``db_path``: a knowledge.db, or a sharded corpus directory (see shards_ultramin).
+
+    The whole crawl is collected before anything is written, so with ``overwrite_docs``
+    the old rows are only replaced by a finished crawl. Raises RuntimeError when the
+    master index cannot be fetched or yields no pages.
+    """
+    from shards_ultramin import ShardRouter
+    session = _requests().Session()
     links = discover_links(master_url, session, limit=link_limit)
-    total_new = 0
+    if not links:
+        raise RuntimeError(f"No documentation pages found from {master_url}")
+    triples: List[Tuple[str,str,str]] = []
     for i, url in enumerate(links, start=1):
         try:
-            r = session.get(url, headers=UA, timeout=25); r.raise_for_status()
-            triples = scrape_methods_from_page(url, r.text)
-            if triples:
-                total_new += insert_docs(conn, triples)
+            with telemetry.span("scrape.fetch") as s:
+                r = session.get(url, headers=UA, timeout=25); r.raise_for_status()
+                s.add(len(r.content))
+            triples += scrape_methods_from_page(url, r.text)
             if i % 25 == 0:
                 log.debug("Progress: %d/%d pages", i, len(links))
         except Exception as e:
+            telemetry.count("scrape.page_errors")
             log.warning("Parse failed: %s (%s)", url, e)
         time.sleep(0.02)
-    conn.close()
-    return total_new
+    if ShardRouter.is_sharded(db_path):
+        with ShardRouter(db_path) as router:
+            return router.write_docs(doc_rows(triples), replace=overwrite_docs)
+    # pdf_harvest may be writing the same staging file; wait for its transactions
+    store = init_db(db_path, overwrite=False, timeout=30)
+    try:
+        return insert_docs(store, triples, replace=overwrite_docs)
+    finally:
+        store.close()
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--db", required=True)
+    ap.add_argument("--db", required=True, help="knowledge.db, or a shard directory created by shards_ultramin")
     ap.add_argument("--master", required=True, help="e.g., http://catiadoc.free.fr/online/interfaces/CAAMasterIdx.htm")
     ap.add_argument("--overwrite-docs", action="store_true")
     ap.add_argument("--link-limit", type=int, default=600)
     ap.add_argument("--log-level", default="INFO")
+    ap.add_argument("--telemetry", help="Write a JSON timing/throughput report here")
     args = ap.parse_args()
-    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO),
-                        format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    if args.telemetry: telemetry.enable()
     n = scrape(args.master, args.db, overwrite_docs=args.overwrite_docs, link_limit=args.link_limit)
     log.info("Scraped (attempted inserts) ~%d", n)
+    telemetry.export(json_path=args.telemetry)
 
 if __name__ == "__main__":
     main()
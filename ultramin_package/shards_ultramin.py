@@ -0,0 +1,262 @@
+# shards_ultramin.py
+from __future__ import annotations
+import os, json, heapq, shutil, hashlib, sqlite3, argparse, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, TypeVar
+from schema_ultra_combo import DocFunction, HarvestedStep, init_db, insert_sql
+from Agentic import telemetry  # importable once schema_ultra_combo has set up sys.path
+from Agentic.stats import schema_stats
+
+log = logging.getLogger("shards_ultramin")
+T = TypeVar("T")
+
+# A sharded corpus is a directory of ordinary ultramin databases plus shards.json:
+#   steps-00.db .. steps-07.db   harvested_steps_ultramin, bucketed by source_doc
+#   docs-00.db  .. docs-03.db    doc_functions_ultramin, bucketed by api_factory
+# Every shard has the full schema (step_refs/step_params triggers included), so the
+# single-file tools (query_steps, param_checks, codegen) also work on one shard.
+# Shard k of N only hands out step ids = k+1 (mod N): ids stay unique across the
+# corpus, and consolidate() merges the shards into one knowledge.db without renumbering.
+LAYOUT = "shards.json"
+TABLES = {"steps": ("harvested_steps_ultramin", HarvestedStep), "docs": ("doc_functions_ultramin", DocFunction)}
+
+def bucket(key: str | None, n: int) -> int:
+    # A stable digest, not hash() (randomized per process) or crc32 (names like
+    # manual1.pdf .. manual9.pdf share their low bits and would pile onto one shard)
+    digest = hashlib.blake2b((key or "").encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % n
+
+class ShardRouter:
+    """Connection map over a sharded corpus: writes go to the owning shard, reads fan out.
+
+    One connection per shard (WAL, so readers do not wait for a writer); a per-shard
+    lock serializes its use between threads. Writers in different processes or
+    threads only contend when they own the same shard.
+    """
+
+    def __init__(self, root: str, steps: int = 8, docs: int = 4, workers: int | None = None):
+        self.root = root
+        self.counts = self._layout(steps, docs)
+        self._conns: Dict[str, sqlite3.Connection] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self._pool: ThreadPoolExecutor | None = None
+        self.workers = workers or max(self.counts.values())
+
+    # ─── Layout ─────────────────────────────────────────────────────────
+
+    def _layout(self, steps: int, docs: int) -> Dict[str, int]:
+        path = os.path.join(self.root, LAYOUT)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                counts = json.load(f)
+            if counts != {"steps": steps, "docs": docs}:
+                log.debug("Using existing layout %s of %s", counts, self.root)
+            return counts
+        if steps < 1 or docs < 1:
+            raise ValueError("shard counts must be >= 1")
+        os.makedirs(self.root, exist_ok=True)
+        counts = {"steps": steps, "docs": docs}
+        # Create every shard up front so concurrent writers never race on a schema migration;
+        # the schema is applied once and the empty database copied
+        template = self._path("steps", 0)
+        init_db(template, overwrite=True).close()
+        for kind, n in counts.items():
+            for i in range(n):
+                if self._path(kind, i) != template:
+                    shutil.copyfile(template, self._path(kind, i))
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(counts, f)
+        os.replace(tmp, path)
+        log.info("🧩 Created %s steps + %s docs shards in %s", steps, docs, self.root)
+        return counts
+
+    @staticmethod
+    def is_sharded(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, LAYOUT))
+
+    def _path(self, kind: str, i: int) -> str:
+        return os.path.join(self.root, f"{kind}-{i:02d}.db")
+
+    def paths(self, kind: str) -> List[str]:
+        return [self._path(kind, i) for i in range(self.counts[kind])]
+
+    def shard_for(self, kind: str, key: str | None) -> int:
+        return bucket(key, self.counts[kind])
+
+    # ─── Connections ────────────────────────────────────────────────────
+
+    @contextmanager
+    def shard(self, kind: str, i: int) -> Iterator[sqlite3.Connection]:
+        """Exclusive use of shard ``i``'s connection for the duration of the block."""
+        path = self._path(kind, i)
+        with self._guard:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            conn = self._conns.get(path)
+            if conn is None:
+                conn = init_db(path, check_same_thread=False, timeout=30)
+                conn.execute("PRAGMA journal_mode = WAL")
+                self._conns[path] = conn
+            yield conn
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._guard:
+            for conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+
+    def __enter__(self) -> "ShardRouter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─── Writes ─────────────────────────────────────────────────────────
+
+    def write_steps(self, source_doc: str, rows: Sequence[HarvestedStep], replace: bool = True) -> int:
+        """Store one document's steps on its shard, in order, replacing its previous harvest.
+
+        The ``step_id`` of ``rows`` is ignored; ids are allocated on the shard.
+        """
+        i = self.shard_for("steps", source_doc)
+        n = self.counts["steps"]
+        with self.shard("steps", i) as conn, telemetry.span("shards.write_steps", shard=i) as s:
+            with conn:
+                if replace:
+                    conn.execute("DELETE FROM harvested_steps_ultramin WHERE source_doc = ?", (source_doc,))
+                last = conn.execute("SELECT MAX(step_id) FROM harvested_steps_ultramin").fetchone()[0]
+                first = i + 1 if last is None else last + n
+                conn.executemany(insert_sql("harvested_steps_ultramin", HarvestedStep),
+                                 [r._replace(step_id=first + j * n, source_doc=source_doc) for j, r in enumerate(rows)])
+            s.add(len(rows))
+        return len(rows)
+
+    def write_docs(self, rows: Iterable[DocFunction], replace: bool = False) -> int:
+        """INSERT OR IGNORE doc functions, each on the shard of its ``api_factory``.
+
+        With ``replace`` every docs shard is emptied in the transaction that writes its rows.
+        """
+        by_shard: Dict[int, List[DocFunction]] = {}
+        for r in rows:
+            by_shard.setdefault(self.shard_for("docs", r.api_factory), []).append(r)
+        sql = insert_sql("doc_functions_ultramin", DocFunction, verb="INSERT OR IGNORE")
+        for i in range(self.counts["docs"]) if replace else by_shard:
+            with self.shard("docs", i) as conn, conn:
+                if replace:
+                    conn.execute("DELETE FROM doc_functions_ultramin")
+                conn.executemany(sql, by_shard.get(i, []))
+        return sum(len(p) for p in by_shard.values())
+
+    def clear(self, kind: str):
+        table = TABLES[kind][0]
+
+        def delete(conn: sqlite3.Connection):
+            with conn:
+                conn.execute(f"DELETE FROM {table}")
+
+        self.fan_out(kind, delete)
+
+    # ─── Reads ──────────────────────────────────────────────────────────
+
+    def fan_out(self, kind: str, fn: Callable[[sqlite3.Connection], T]) -> List[T]:
+        """``fn(conn)`` on every shard of ``kind`` in parallel, results in shard order.
+
+        sqlite3 releases the GIL while a statement runs, so the shards are read
+        concurrently by the router's thread pool.
+        """
+        def run(i: int) -> T:
+            with self.shard(kind, i) as conn:
+                return fn(conn)
+
+        n = self.counts[kind]
+        if n == 1:
+            return [run(0)]
+        with self._guard:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="shard")
+        return list(self._pool.map(run, range(n)))
+
+    def query(self, kind: str, sql: str, args: Sequence[Any] = (), key: Callable[[Any], Any] | None = None,
+              limit: int | None = None) -> List[Any]:
+        """Rows of ``sql`` from every shard. With ``key``, each shard's rows must already
+        be sorted by it (ORDER BY in ``sql``) and are merged in order; ``limit`` applies
+        to the merged rows."""
+        with telemetry.span("shards.query", kind=kind) as s:
+            parts = self.fan_out(kind, lambda conn: conn.execute(sql, args).fetchall())
+            rows = heapq.merge(*parts, key=key) if key else (r for p in parts for r in p)
+            out = list(islice(rows, limit)) if limit is not None else list(rows)
+            s.add(len(out))
+        return out
+
+    def find_steps(self, filters: Dict[str, Any], limit: int | None = None) -> List[Dict[str, Any]]:
+        """``query_steps_ultramin.find_steps`` across all steps shards, merged by step_id."""
+        from query_steps_ultramin import find_steps
+        parts = self.fan_out("steps", lambda conn: find_steps(conn, filters, limit=limit))
+        rows = heapq.merge(*parts, key=lambda r: r["step_id"])
+        return list(islice(rows, limit)) if limit is not None else list(rows)
+
+    def row_counts(self) -> Dict[str, List[int]]:
+        """Rows per shard, read from each shard's table_stats counters rather than counted."""
+        return {kind: self.fan_out(kind, lambda conn, t=table: schema_stats(conn)["tables"][t]["rows"])
+                for kind, (table, _) in TABLES.items()}
+
+    # ─── Consolidation ──────────────────────────────────────────────────
+
+    def consolidate(self, db_path: str) -> Dict[str, int]:
+        """Rebuild ``db_path`` as a single knowledge.db holding every shard's rows.
+
+        Each shard is ATTACHed in turn and copied with INSERT .. SELECT, so the
+        derived tables (step refs, numeric params, row counts) are filled by the
+        target's own triggers.
+        """
+        conn = init_db(db_path, overwrite=True)
+        copied = {}
+        try:
+            with telemetry.span("shards.consolidate"):
+                for kind, (table, record) in TABLES.items():
+                    cols = ", ".join(record._fields)
+                    copied[table] = 0
+                    for path in self.paths(kind):
+                        conn.execute("ATTACH DATABASE ? AS shard", (path,))
+                        try:
+                            with conn:
+                                cur = conn.execute(f"INSERT OR IGNORE INTO main.{table} ({cols}) "
+                                                   f"SELECT {cols} FROM shard.{table} ORDER BY 1")
+                                copied[table] += cur.rowcount
+                        finally:
+                            conn.execute("DETACH DATABASE shard")
+        finally:
+            conn.close()
+        log.info("✅ Consolidated %s into %s: %s", self.root, db_path, copied)
+        return copied
+
+def main():
+    ap = argparse.ArgumentParser(description="Create, inspect, query or consolidate a sharded ultramin corpus")
+    ap.add_argument("--shards", required=True, help="Shard directory (created if missing)")
+    ap.add_argument("--steps", type=int, default=8, help="Steps shards for a new corpus")
+    ap.add_argument("--docs", type=int, default=4, help="Doc-function shards for a new corpus")
+    ap.add_argument("--filter", help='Fan out a query_steps filter, e.g. {"thickness_mm": [">", 2]}')
+    ap.add_argument("--limit", type=int)
+    ap.add_argument("--consolidate", metavar="DB", help="Merge all shards into this knowledge.db")
+    ap.add_argument("--log-level", default="INFO")
+    args = ap.parse_args()
+    from Agentic.logs import start_logging
+    start_logging(args.log_level, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    with ShardRouter(args.shards, steps=args.steps, docs=args.docs) as router:
+        if args.filter:
+            for row in router.find_steps(json.loads(args.filter), limit=args.limit):
+                print(json.dumps(row, ensure_ascii=False))
+        if args.consolidate:
+            router.consolidate(args.consolidate)
+        if not (args.filter or args.consolidate):
+            print(json.dumps({"root": router.root, "shards": router.counts, "rows": router.row_counts()}))
+
+if __name__ == "__main__":
+    main()
@@ -16,9 +16,11 @@ import sys
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
 import json
+import time
+
+from build_graph import Stage, file_hash, hash_parts, load_manifest, log_summary, run_graph, save_manifest
+from Agentic import telemetry
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("UNIFIED_DB_POPULATOR")
 
 class UnifiedDatabasePopulator:
@@ -27,7 +29,28 @@ class UnifiedDatabasePopulator:
     def __init__(self):
         self.agentic_db_path = "agentic.db"
         self.knowledge_db_path = "knowledge.db"
-        self.backup_suffix = ".backup"
+        self.backup_dir = None  # defaults to backups/ next to each database
+        self.backup_keep = 24
+        self.pdf_path = "Flying-Wing-Instructions.pdf"
+        self.master_url = "http://catiadoc.free.fr/online/interfaces/CAAMasterIdx.htm"
+        self.link_limit = 100
+        self.max_threads = 4
+        self.max_processes = 2
+        self.harvest_kind = "process"  # "thread" avoids process start-up for tiny PDFs
+        self.dedup_threshold = 0.9  # near-duplicate PDF steps are stored once (None stores every step)
+        self.build_manifest_path = "build_manifest.json"  # None rebuilds every stage
+        self.force = []  # stage names to rebuild regardless of fingerprints, or ["all"]
+        self.scrape_ttl_hours = 24  # how often to ask the docs server whether its index changed
+        self._validators = None  # this run's answer, see _scrape_validators
+        self.max_shrink = 0.5  # refuse to publish a knowledge.db that lost more than half a table
+        self.snapshot_keep = 3  # read-only snapshots kept per database for agent workers
+        self.verify_tier = "fast"  # "deep" adds integrity_check, full JSON scans and counter drift
+        self.verify_report_path = "verification_report.json"
+        # Telemetry exports (any of them enables collection): JSON report, Prometheus textfile, OTLP/JSON spans
+        self.telemetry_json = None
+        self.telemetry_prometheus = None
+        self.telemetry_otel = None
+        self.stage_results = {}
         
         # Import existing modules
         self._import_existing_modules()
@@ -38,74 +61,82 @@ class UnifiedDatabasePopulator:
             # Import ultramin package for PDF harvesting
             import sys
             sys.path.insert(0, 'ultramin_package')
-            from schema_ultra_combo import init_db as init_ultramin_db
-            from harvest_pdf_ultramin import harvest as harvest_pdf_ultramin
-            from scrape_docs_ultramin import scrape as scrape_docs_ultramin
+            from schema_ultra_combo import init_db as init_ultramin_db, MIGRATIONS as ultramin_migrations
+            from harvest_pdf_ultramin import harvest as harvest_pdf_ultramin, rules_fingerprint
+            from dedup_ultramin import INDEXED as dedup_indexed
+            from scrape_docs_ultramin import scrape as scrape_docs_ultramin, doc_validators
             self.init_ultramin_db = init_ultramin_db
+            self.ultramin_migrations = ultramin_migrations
             self.harvest_pdf_ultramin = harvest_pdf_ultramin
+            self.rules_fingerprint = rules_fingerprint
+            self.dedup_indexed = dedup_indexed
             self.scrape_docs_ultramin = scrape_docs_ultramin
+            self.doc_validators = doc_validators
             
             # Import Agentic templates directly (avoid connection issues)
             sys.path.insert(0, 'Agentic')
-            from templates import populate_template_libraries
+            from templates import populate_template_libraries, template_fingerprint
             self.populate_template_libraries = populate_template_libraries
+            self.template_fingerprint = template_fingerprint
             
-            # Import Agentic schema SQL (extract from existing module)
-            self._import_agentic_schema_sql()
+            # Import the versioned Agentic schema migrations
+            from Agentic.migrations import migrate
+            from Agentic.schema import MIGRATIONS as agentic_migrations
+            self.migrate = migrate
+            self.agentic_migrations = agentic_migrations
+            from Agentic.stats import collect_stats
+            self.collect_stats = collect_stats
+            from Agentic.verification import log_report, verify, write_report
+            self.verify = verify
+            self.log_verify_report = log_report
+            self.write_verify_report = write_report
+            from Agentic.backup import backup_database
+            self.backup_database = backup_database
+            from Agentic.hotswap import prepare_staging, publish, read_generation, staging_path
+            self.prepare_staging = prepare_staging
+            self.publish = publish
+            self.read_generation = read_generation
+            self.staging_path = staging_path
+            from Agentic.snapshots import LIBRARY_TABLES, SnapshotPolicy, current_snapshot, publish_snapshot
+            self.library_tables = LIBRARY_TABLES
+            self.snapshot_policy = SnapshotPolicy
+            self.current_snapshot = current_snapshot
+            self.publish_snapshot = publish_snapshot
+            from Agentic.matcher import build_index, corpus_fingerprint, index_path
+            self.build_matcher_index = build_index
+            self.matcher_corpus_fingerprint = corpus_fingerprint
+            self.matcher_index_path = index_path
             
             logger.info("✅ Successfully imported existing modules from Agentic and ultramin")
             
         except ImportError as e:
-            logger.error(f"❌ Failed to import existing modules: {e}")
+            logger.error("❌ Failed to import existing modules: %s", e)
             logger.error("Make sure Agentic and ultramin_package modules are available")
             raise
     
-    def _import_agentic_schema_sql(self):
-        """Import the agentic schema SQL from the existing Agentic.schema module."""
-        # Extract the SQL directly from the existing Agentic.schema module
-        with open('Agentic/schema.py', 'r') as f:
-            schema_content = f.read()
-        
-        # Extract the SQL from the existing schema module using regex
-        import re
-        sql_match = re.search(r'cur\.executescript\(\s*"""\s*(.*?)\s*"""\s*\)', schema_content, re.DOTALL)
-        if sql_match:
-            self.agentic_schema_sql = sql_match.group(1)
-        else:
-            # If regex extraction fails, raise an error - we should always use existing modules
-            raise ImportError("Could not extract schema SQL from existing Agentic.schema module. This should not happen if the module exists.")
-    
     def backup_existing_databases(self):
-        """Create backups of existing databases if they exist."""
+        """Create a new backup generation of each existing database (online, checksummed)."""
         logger.info("🔄 Checking existing databases...")
         
         for db_path in [self.agentic_db_path, self.knowledge_db_path]:
-            if os.path.exists(db_path):
-                backup_path = f"{db_path}{self.backup_suffix}"
-                try:
-                    import shutil
-                    shutil.copy2(db_path, backup_path)
-                    logger.info(f"✅ Backed up existing {db_path} to {backup_path}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not backup {db_path}: {e}")
-            else:
-                logger.info(f"📝 No existing {db_path} found - will create from scratch")
+            try:
+                self.backup_database(db_path, self.backup_dir, keep=self.backup_keep)
+            except Exception as e:
+                logger.warning("⚠️ Could not backup %s: %s", db_path, e)
     
     def create_agentic_database(self):
         """Create and populate the agentic database using existing Agentic functions."""
         logger.info("🚀 Setting up agentic database using existing Agentic module...")
         
-        # Always remove existing database for fresh population (testing mode)
         if os.path.exists(self.agentic_db_path):
-            os.remove(self.agentic_db_path)
-            logger.info("🗑️ Removed existing agentic.db for fresh population")
+            logger.info("🔄 Migrating existing agentic.db in place (runtime history is kept)")
         else:
             logger.info("📝 Creating new agentic.db from scratch")
         
         try:
-            # Create agentic database schema using existing Agentic schema
+            # Create or upgrade the agentic schema using the Agentic migrations
             self._create_agentic_schema()
-            logger.info("✅ Agentic database schema created using existing Agentic schema")
+            logger.info("✅ Agentic database schema migrated using Agentic.schema migrations")
             
             # Use existing Agentic template population
             self.populate_template_libraries()
@@ -114,61 +145,208 @@ class UnifiedDatabasePopulator:
             return True
             
         except Exception as e:
-            logger.error(f"❌ Error creating agentic database: {e}")
+            logger.error("❌ Error creating agentic database: %s", e)
             return False
     
-    def _create_agentic_schema(self):
-        """Create agentic database schema using existing Agentic schema definition."""
+    def _create_agentic_schema(self, dry_run=False):
+        """Apply pending Agentic.schema migrations to the agentic database."""
         conn = sqlite3.connect(self.agentic_db_path)
-        cursor = conn.cursor()
-        
-        # Use the existing Agentic schema SQL (imported from Agentic/schema.py)
-        cursor.executescript(self.agentic_schema_sql)
-        
-        conn.commit()
-        conn.close()
+        try:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")  # no-op unless the file is new
+            return self.migrate(conn, self.agentic_migrations, dry_run=dry_run)
+        finally:
+            conn.close()
     
     def create_knowledge_database(self):
         """Create and populate the knowledge database using ultramin functions."""
         logger.info("🚀 Setting up knowledge database using ultramin module...")
         
-        # Always remove existing database for fresh population (testing mode)
-        if os.path.exists(self.knowledge_db_path):
-            os.remove(self.knowledge_db_path)
-            logger.info("🗑️ Removed existing knowledge.db for fresh population")
-        else:
-            logger.info("📝 Creating new knowledge.db from scratch")
-        
         try:
-            # Create knowledge database using ultramin schema
-            self.init_ultramin_db(self.knowledge_db_path, overwrite=True)
-            logger.info("✅ Knowledge database schema created using ultramin module")
+            # Build next to knowledge.db; readers keep the live file until the swap
+            staging = self.prepare_staging(self.knowledge_db_path, copy_live=False)
+            self.create_knowledge_schema(staging)
             
             # Run ultramin PDF harvesting to populate harvested steps from PDF
             logger.info("🔄 Running ultramin PDF harvesting...")
-            pdf_path = "Flying-Wing-Instructions.pdf"
-            if os.path.exists(pdf_path):
+            if os.path.exists(self.pdf_path):
                 # Harvest PDF using ultramin directly into knowledge database
-                harvest_result = self.harvest_pdf_ultramin(pdf_path, self.knowledge_db_path, overwrite=False)
-                logger.info(f"✅ Ultramin PDF harvesting completed: {harvest_result}")
+                harvest_result = self.harvest_pdf_ultramin(self.pdf_path, staging, overwrite=False)
+                logger.info("✅ Ultramin PDF harvesting completed: %s", harvest_result)
             else:
-                logger.warning(f"⚠️ PDF file {pdf_path} not found, skipping ultramin harvesting")
+                logger.warning("⚠️ PDF file %s not found, skipping ultramin harvesting", self.pdf_path)
             
             # Run ultramin CATIA documentation scraping
-            logger.info("🔄 Running ultramin CATIA documentation scraping...")
-            master_url = "http://catiadoc.free.fr/online/interfaces/CAAMasterIdx.htm"
             try:
-                scrape_result = self.scrape_docs_ultramin(master_url, self.knowledge_db_path, overwrite_docs=True, link_limit=100)
-                logger.info(f"✅ Ultramin CATIA documentation scraping completed: {scrape_result} methods")
+                self.scrape_documentation(staging)
             except Exception as e:
-                logger.warning(f"⚠️ CATIA documentation scraping failed: {e}")
+                logger.warning("⚠️ CATIA documentation scraping failed: %s", e)
             
+            self.publish_knowledge()
             return True
             
         except Exception as e:
-            logger.error(f"❌ Error creating knowledge database: {e}")
+            logger.error("❌ Error creating knowledge database: %s", e)
             return False
     
+    def create_knowledge_schema(self, db_path=None):
+        """Recreate the knowledge build (the staging file by default) with the ultramin schema."""
+        db_path = db_path or self.staging_path(self.knowledge_db_path)
+        # Always start the build from an empty file; the live knowledge.db is untouched
+        if os.path.exists(db_path):
+            os.remove(db_path)
+            logger.info("🗑️ Removed existing %s for fresh population", db_path)
+        else:
+            logger.info("📝 Creating new %s from scratch", db_path)
+        self.init_ultramin_db(db_path, overwrite=True).close()
+        logger.info("✅ Knowledge database schema created using ultramin module")
+    
+    def scrape_documentation(self, db_path=None):
+        """Scrape CATIA documentation into the knowledge build (the staging file by default)."""
+        logger.info("🔄 Running ultramin CATIA documentation scraping...")
+        db_path = db_path or self.staging_path(self.knowledge_db_path)
+        scrape_result = self.scrape_docs_ultramin(self.master_url, db_path, overwrite_docs=True, link_limit=self.link_limit)
+        logger.info("✅ Ultramin CATIA documentation scraping completed: %s methods", scrape_result)
+        return scrape_result
+    
+    def publish_knowledge(self):
+        """Verify the staged knowledge build and atomically swap it in for knowledge.db."""
+        min_rows = {"harvested_steps_ultramin": 1} if os.path.exists(self.pdf_path) else {}
+        return self.publish(self.knowledge_db_path, min_rows=min_rows, max_shrink=self.max_shrink)
+    
+    # ─── Stage fingerprints (incremental rebuilds) ──────────────────────
+    
+    @staticmethod
+    def _schema_state(db_path):
+        """user_version of ``db_path``, or None if it does not exist."""
+        if not os.path.exists(db_path):
+            return None
+        conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def _agentic_schema_fingerprint(self):
+        return hash_parts([m.checksum for m in self.agentic_migrations], self._schema_state(self.agentic_db_path))
+    
+    def _knowledge_schema_fingerprint(self):
+        return hash_parts([m.checksum for m in self.ultramin_migrations], self._schema_state(self.knowledge_db_path))
+    
+    def _pdf_fingerprint(self):
+        return hash_parts(file_hash(self.pdf_path), self.rules_fingerprint(), self.dedup_threshold, self.dedup_indexed)
+    
+    def _matcher_fingerprint(self):
+        if not os.path.exists(self.agentic_db_path):
+            return None
+        index = self.matcher_index_path(self.agentic_db_path)
+        return hash_parts(self.matcher_corpus_fingerprint(self.agentic_db_path), os.path.exists(index))
+    
+    def _knowledge_snapshot_fingerprint(self):
+        return hash_parts(self.read_generation(self.knowledge_db_path).get("generation"),
+                          self.current_snapshot(self.knowledge_db_path))
+    
+    def _agentic_snapshot_fingerprint(self):
+        return hash_parts(self.template_fingerprint(), self.current_snapshot(self.agentic_db_path))
+    
+    def _scrape_validators(self):
+        """The docs server's validators, asked for (HTTP HEAD) at most once per ``scrape_ttl_hours``.
+        
+        The last answer is cached in the build manifest; ``--force doc_scrape`` asks again.
+        """
+        if self._validators is None:
+            now = time.time()
+            cached = load_manifest(self.build_manifest_path).get("validators", {}).get(self.master_url)
+            forced = "all" in self.force or "doc_scrape" in self.force
+            if cached and not forced and now - cached["checked"] < self.scrape_ttl_hours * 3600:
+                self._validators = dict(cached, fresh=False)
+            else:
+                # Without ETag/Last-Modified there is no cheap change check: re-scrape once per TTL window
+                value = self.doc_validators(self.master_url) or f"ttl:{int(now // (self.scrape_ttl_hours * 3600))}"
+                self._validators = {"value": value, "checked": now, "fresh": True}
+        return self._validators["value"]
+    
+    def _save_validators(self, results):
+        # A failed scrape keeps the old answer, so the next run asks the server again
+        scraped = "doc_scrape" in results and results["doc_scrape"].status in ("ok", "cached")
+        if self.build_manifest_path and self._validators and self._validators["fresh"] and scraped:
+            manifest = load_manifest(self.build_manifest_path)
+            manifest.setdefault("validators", {})[self.master_url] = {
+                "value": self._validators["value"], "checked": self._validators["checked"]}
+            save_manifest(self.build_manifest_path, manifest)
+    
+    def _scrape_fingerprint(self):
+        return hash_parts(self.master_url, self.link_limit, self._scrape_validators())
+    
+    def build_stages(self):
+        """Describe the population as a dependency graph of stages.
+        
+        agentic.db and knowledge.db share nothing, so their chains run side by side;
+        PDF harvest (CPU) and doc scrape (network) write different tables and also
+        run concurrently. They share the staging file, so both wait up to 30s for
+        the other's short write transactions, and a scrape that still finds it
+        locked fails rather than skipping pages. Resources are named ``<db>:<part>``.
+        
+        Fingerprinted stages are skipped when their inputs are unchanged since the
+        last successful build; backups only run ahead of a stage that rewrites
+        their database, and verify always runs.
+        
+        knowledge.db is built in a staging file (a copy of the live database, so a
+        partial rebuild keeps the unchanged tables) and swapped in atomically by
+        ``publish_knowledge``. agentic.db also holds runtime history written by
+        agents, so it is migrated in place with online migrations instead.
+        """
+        agentic, knowledge = self.agentic_db_path, self.knowledge_db_path
+        staging = self.staging_path(knowledge)
+        stages = [
+            Stage("backup_agentic", self.backup_database, outputs=[f"{agentic}:backup"], required=False,
+                  args=(agentic, self.backup_dir), kwargs=dict(keep=self.backup_keep), when_needed=True),
+            Stage("backup_knowledge", self.backup_database, outputs=[f"{knowledge}:backup"], required=False,
+                  args=(knowledge, self.backup_dir), kwargs=dict(keep=self.backup_keep), when_needed=True),
+            Stage("agentic_schema", self._create_agentic_schema,
+                  inputs=[f"{agentic}:backup"], outputs=[f"{agentic}:schema"],
+                  fingerprint=self._agentic_schema_fingerprint),
+            Stage("agentic_templates", self.populate_template_libraries, args=(agentic,),
+                  inputs=[f"{agentic}:schema", f"{agentic}:backup"], outputs=[f"{agentic}:templates"],
+                  fingerprint=self.template_fingerprint),
+            # Needs numpy/scipy; without them only goal matching is unavailable
+            Stage("matcher_index", self.build_matcher_index, args=(agentic,), required=False,
+                  inputs=[f"{agentic}:templates"], outputs=[f"{agentic}:matcher"],
+                  fingerprint=self._matcher_fingerprint),
+            Stage("knowledge_staging", self.prepare_staging, args=(knowledge,),
+                  inputs=[f"{knowledge}:backup"], outputs=[f"{knowledge}:staging"], when_needed=True),
+            Stage("knowledge_schema", self.create_knowledge_schema,
+                  inputs=[f"{knowledge}:staging"], outputs=[f"{knowledge}:schema"],
+                  fingerprint=self._knowledge_schema_fingerprint),
+            Stage("doc_scrape", self.scrape_documentation, required=False,
+                  inputs=[f"{knowledge}:schema", f"{knowledge}:staging"], outputs=[f"{knowledge}:doc_functions"],
+                  fingerprint=self._scrape_fingerprint),
+        ]
+        if os.path.exists(self.pdf_path):
+            stages.append(Stage("pdf_harvest", self.harvest_pdf_ultramin, kind=self.harvest_kind,
+                                inputs=[f"{knowledge}:schema", f"{knowledge}:staging", self.pdf_path],
+                                outputs=[f"{knowledge}:harvested_steps"],
+                                args=(self.pdf_path, staging),
+                                kwargs=dict(overwrite=False, dedup=self.dedup_threshold),
+                                fingerprint=self._pdf_fingerprint))
+        else:
+            logger.warning("⚠️ PDF file %s not found, skipping ultramin harvesting", self.pdf_path)
+        built = [o for st in stages if st.name in ("knowledge_schema", "doc_scrape", "pdf_harvest") for o in st.outputs]
+        stages.append(Stage("publish_knowledge", self.publish_knowledge, inputs=built,
+                            outputs=[f"{knowledge}:live"], after_changes=True))
+        # Read-only snapshots for agent workers: the agentic.db library and all of knowledge.db
+        policy = self.snapshot_policy(keep=self.snapshot_keep)
+        stages.append(Stage("snapshot_agentic", self.publish_snapshot, args=(agentic,),
+                            kwargs=dict(tables=self.library_tables, policy=policy),
+                            inputs=[f"{agentic}:templates"], outputs=[f"{agentic}:snapshot"],
+                            fingerprint=self._agentic_snapshot_fingerprint))
+        stages.append(Stage("snapshot_knowledge", self.publish_snapshot, args=(knowledge,),
+                            kwargs=dict(policy=policy), inputs=[f"{knowledge}:live"],
+                            outputs=[f"{knowledge}:snapshot"], fingerprint=self._knowledge_snapshot_fingerprint))
+        produced = [f"{agentic}:templates", f"{knowledge}:live"]
+        stages.append(Stage("verify", self.verify_databases, inputs=produced))
+        return stages
+    
+    @telemetry.traced("populator.verify_databases")
     def verify_databases(self):
         """Verify that both databases are properly created and populated."""
         logger.info("🔍 Verifying database creation...")
@@ -180,33 +358,14 @@ class UnifiedDatabasePopulator:
             'knowledge_tables': {}
         }
         
-        # Verify agentic database
-        if os.path.exists(self.agentic_db_path):
-            with sqlite3.connect(self.agentic_db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = [row[0] for row in cursor.fetchall()]
-                
-                for table in tables:
-                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                    count = cursor.fetchone()[0]
-                    verification_results['agentic_tables'][table] = count
-                
-                verification_results['agentic_db'] = True
-        
-        # Verify knowledge database
-        if os.path.exists(self.knowledge_db_path):
-            with sqlite3.connect(self.knowledge_db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = [row[0] for row in cursor.fetchall()]
-                
-                for table in tables:
-                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                    count = cursor.fetchone()[0]
-                    verification_results['knowledge_tables'][table] = count
-                
-                verification_results['knowledge_db'] = True
+        # Read counters for both databases in one pass (no per-table COUNT(*) scans)
+        stats = self.collect_stats({"agentic": self.agentic_db_path, "knowledge": self.knowledge_db_path})
+        for name in ("agentic", "knowledge"):
+            if stats[name] is not None:
+                verification_results[f'{name}_tables'] = {
+                    table: info["rows"] for table, info in stats[name]["tables"].items()
+                }
+                verification_results[f'{name}_db'] = True
         
         # Display verification results
         logger.info("\n📊 DATABASE VERIFICATION RESULTS:")
@@ -215,42 +374,55 @@ class UnifiedDatabasePopulator:
         if verification_results['agentic_db']:
             logger.info("✅ Agentic Database:")
             for table, count in verification_results['agentic_tables'].items():
-                logger.info(f"   {table}: {count} records")
+                logger.info("   %s: %s records", table, count)
         else:
             logger.error("❌ Agentic database verification failed")
         
         if verification_results['knowledge_db']:
             logger.info("✅ Knowledge Database:")
             for table, count in verification_results['knowledge_tables'].items():
-                logger.info(f"   {table}: {count} records")
+                logger.info("   %s: %s records", table, count)
         else:
             logger.error("❌ Knowledge database verification failed")
         
-        return verification_results['agentic_db'] and verification_results['knowledge_db']
+        # Integrity, foreign keys, JSON and template cardinality checks, both databases concurrently
+        report = self.verify({"agentic": self.agentic_db_path, "knowledge": self.knowledge_db_path},
+                             tier=self.verify_tier)
+        self.log_verify_report(report)
+        if self.verify_report_path:
+            self.write_verify_report(report, self.verify_report_path)
+        
+        return verification_results['agentic_db'] and verification_results['knowledge_db'] and report["ok"]
     
     def run_complete_population(self):
         """Run the complete database population process using existing modules."""
         logger.info("🚀 UNIFIED DATABASE POPULATION SYSTEM")
         logger.info("=" * 60)
         logger.info("Using existing Agentic and ultramin modules for efficiency")
-        logger.info("🔄 TESTING MODE: Always repopulate databases for fresh testing")
+        if self.build_manifest_path and self.force:
+            logger.info("🔄 Incremental build; forcing: %s", ', '.join(self.force))
+        elif self.build_manifest_path:
+            logger.info("🔄 Incremental build: only stages with changed inputs run")
         
+        exports = (self.telemetry_json, self.telemetry_prometheus, self.telemetry_otel)
+        if any(exports) and not telemetry.enabled:
+            telemetry.enable()
         try:
-            # Step 1: Check and backup existing databases
-            self.backup_existing_databases()
-            
-            # Step 2: Create/repopulate agentic database using existing Agentic functions
-            if not self.create_agentic_database():
-                logger.error("❌ Failed to create/repopulate agentic database")
-                return False
+            t0 = time.perf_counter()
+            stages = self.build_stages()
+            with telemetry.span("populator.build"):
+                results = run_graph(stages, max_threads=self.max_threads, max_processes=self.max_processes,
+                                    manifest_path=self.build_manifest_path, force=self.force)
+            self._save_validators(results)
+            log_summary(stages, results, time.perf_counter() - t0)
+            telemetry.export(*exports)
+            self.stage_results = results
             
-            # Step 3: Create/repopulate knowledge database using ultramin functions
-            if not self.create_knowledge_database():
-                logger.error("❌ Failed to create/repopulate knowledge database")
+            failed = [s.name for s in stages if s.required and results[s.name].status not in ("ok", "cached")]
+            if failed:
+                logger.error("❌ Database population failed in: %s", ', '.join(failed))
                 return False
-            
-            # Step 4: Verify both databases
-            if not self.verify_databases():
+            if not results["verify"].value:
                 logger.error("❌ Database verification failed")
                 return False
             
@@ -265,13 +437,34 @@ class UnifiedDatabasePopulator:
             return True
             
         except Exception as e:
-            logger.error(f"❌ Error during database population: {e}")
+            logger.error("❌ Error during database population: %s", e)
             return False
 
 def main():
     """Main function to run the unified database population system."""
+    import argparse
+    ap = argparse.ArgumentParser(description="Populate agentic.db and knowledge.db")
+    ap.add_argument("--force", action="append", default=[], metavar="STAGE",
+                    help="Rebuild STAGE even if its inputs are unchanged (repeatable; 'all' for every stage)")
+    ap.add_argument("--no-manifest", action="store_true", help="Ignore the build manifest and run every stage")
+    ap.add_argument("--telemetry", metavar="PATH", help="Write a JSON timing/throughput report")
+    ap.add_argument("--prometheus", metavar="PATH", help="Write metrics for the node_exporter textfile collector")
+    ap.add_argument("--otel", metavar="PATH", help="Append spans as OTLP/JSON lines")
+    ap.add_argument("--verify-tier", choices=("fast", "deep"), default="fast",
+                    help="Verification depth: fast on every run, deep for nightly builds")
+    args = ap.parse_args()
+    from Agentic.logs import start_logging
+
+    start_logging(logging.INFO, fmt="%(asctime)s - %(levelname)s - %(message)s")
     try:
         populator = UnifiedDatabasePopulator()
+        populator.force = args.force
+        populator.verify_tier = args.verify_tier
+        populator.telemetry_json = args.telemetry
+        populator.telemetry_prometheus = args.prometheus
+        populator.telemetry_otel = args.otel
+        if args.no_manifest:
+            populator.build_manifest_path = None
         success = populator.run_complete_population()
         
         if success: